@@ -2,8 +2,9 @@ import logging
 import os
 import random
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Set, Tuple, Iterable
+from typing import List, Optional, Set, Tuple, Iterable, Dict
 
 import typer
 
@@ -12,19 +13,44 @@ from binaryrts.parser.coverage import (
     CoverageParser,
     FunctionLookupTable,
     TestFunctionTraces,
+    CompactTestFunctionTraces,
     CoveredFunction,
+    CoveredLine,
     TestFileTraces,
     call_symbol_resolver,
+    get_test_id,
     FUNCTION_LOOKUP_FILE,
     TEST_FUNCTION_TRACES_FILE,
     TEST_LOOKUP_FILE,
     TEST_FILE_TRACES_FILE,
+    TEST_FUNCTION_INDEX_FILE,
     PICKLE_TEST_FUNCTION_TRACES_FILE,
     PICKLE_FUNCTION_LOOKUP_FILE,
     PICKLE_TEST_FILE_TRACES_FILE,
+    PICKLE_TEST_FUNCTION_INDEX_FILE,
 )
+from binaryrts.parser import mapped, database
+from binaryrts.parser.database import (
+    SQLITE_FUNCTION_TRACES_FILE,
+    SQLITE_FILE_TRACES_FILE,
+)
+from binaryrts.parser.mapped import (
+    BINARY_FUNCTION_LOOKUP_FILE,
+    BINARY_TEST_FUNCTION_TRACES_FILE,
+)
+from binaryrts.parser.incremental import (
+    update_function_lookup_table,
+    remap_test_function_traces,
+)
+from binaryrts.parser.storage import (
+    load_function_lookup_table,
+    load_test_function_traces,
+    get_test_function_traces_fingerprint,
+)
+from binaryrts.util.cache import DiskCache, DEFAULT_MAX_CACHE_SIZE
 from binaryrts.util.fs import delete_files
-from binaryrts.util.mp import run_with_multi_threading
+from binaryrts.util.mp import run_with_multi_threading, imap_with_multi_processing
+from binaryrts.vcs.git import GitClient, is_git_repo
 
 app = typer.Typer()
 
@@ -40,6 +66,9 @@ class ConvertCommonOptions:
     clean: bool
     n_processes: int
     binary_output: bool
+    mapped_output: bool = field(default=False)
+    sqlite_output: bool = field(default=False)
+    disk_cache: Optional[DiskCache] = field(default=None)
     repo_root_dir: Optional[Path] = field(default=None)
 
 
@@ -95,10 +124,41 @@ def convert(
         "--pickle",
         help="Enables binary output using Python's (unsafe) pickle format.",
     ),
+    mapped_output: bool = typer.Option(
+        False,
+        "--mmap",
+        help="Enables binary output in a versioned, memory-mappable format, "
+        "which is loaded lazily during test selection (only supported for C++ function traces).",
+    ),
+    sqlite_output: bool = typer.Option(
+        False,
+        "--sqlite",
+        help="Enables output as a single SQLite database with indexed tables for functions, tests, "
+        "and their dependencies, which are queried directly during test selection.",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache",
+        writable=True,
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+        help="Directory of a persistent cache for parsed source files, which is shared across runs.",
+    ),
+    cache_size: int = typer.Option(
+        DEFAULT_MAX_CACHE_SIZE // (1024 * 1024),
+        "--cache-size",
+        help="Maximum size of the persistent cache in MiB; least recently used entries are evicted first.",
+    ),
 ):
     """
     Convert test traces
     """
+    if sum([binary_output, mapped_output, sqlite_output]) > 1:
+        raise typer.BadParameter(
+            "Options --binary, --mmap, and --sqlite are mutually exclusive."
+        )
     output_dir.mkdir(parents=True, exist_ok=True)
     ctx.obj = ConvertCommonOptions(
         input_dir=input_dir,
@@ -109,6 +169,11 @@ def convert(
         n_processes=n_processes,
         repo_root_dir=repo_root_dir,
         binary_output=binary_output,
+        mapped_output=mapped_output,
+        sqlite_output=sqlite_output,
+        disk_cache=DiskCache(root=cache_dir, max_size=cache_size * 1024 * 1024)
+        if cache_dir is not None
+        else None,
     )
 
 
@@ -131,20 +196,102 @@ def _filter_and_sort_coverage_files(
     )
 
 
+# parser of the current worker process, set once per worker to avoid sending it along with each coverage file
+_worker_parser: Optional[CoverageParser] = None
+
+# number of coverage files sent to a worker at once
+PARSE_CHUNK_SIZE: int = 8
+
+
+def _init_parser_worker(parser: CoverageParser) -> None:
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _parse_coverage_file(
+    file: Path, parse_syscalls: bool = False, parser: Optional[CoverageParser] = None
+) -> Tuple[Path, Optional[TestCoverage]]:
+    parser = parser or _worker_parser
+    if parse_syscalls:
+        return file, parser.parse_syscalls(syscalls_file=file)
+    return file, parser.parse_coverage(coverage_file=file)
+
+
 def _parse_coverage_files(
-    coverage_files: List[Path], parser: CoverageParser, parse_syscalls: bool = False
+    coverage_files: List[Path],
+    parser: CoverageParser,
+    parse_syscalls: bool = False,
+    n_processes: int = 1,
 ) -> Iterable[TestCoverage]:
-    for file in coverage_files:
-        if parse_syscalls:
-            coverage: Optional[TestCoverage] = parser.parse_syscalls(syscalls_file=file)
-        else:
-            coverage: Optional[TestCoverage] = parser.parse_coverage(coverage_file=file)
+    """
+    Parses the coverage files, in parallel if multiple processes are given.
+    Coverages are always yielded in the order of the coverage files,
+    such that the subsequent assignment of function IDs is deterministic.
+    """
+    parsed_coverages: Iterable[Tuple[Path, Optional[TestCoverage]]]
+    if n_processes > 1 and len(coverage_files) > 1:
+        parsed_coverages = imap_with_multi_processing(
+            func=partial(_parse_coverage_file, parse_syscalls=parse_syscalls),
+            iterable=coverage_files,
+            n_cpu=n_processes,
+            chunksize=PARSE_CHUNK_SIZE,
+            initializer=_init_parser_worker,
+            initargs=(parser,),
+        )
+    else:
+        parsed_coverages = (
+            _parse_coverage_file(file, parse_syscalls=parse_syscalls, parser=parser)
+            for file in coverage_files
+        )
+    for file, coverage in parsed_coverages:
         if coverage:
             yield coverage
         else:
             logging.debug(f"Failed to parse coverage from {file}")
 
 
+def _load_previous_conversion(
+    opts: ConvertCommonOptions,
+    previous_function_lookup_file: Path,
+    previous_test_function_traces_file: Optional[Path],
+    previous_revision: Optional[str],
+) -> Tuple[FunctionLookupTable, TestFunctionTraces]:
+    if previous_test_function_traces_file is None or previous_revision is None:
+        raise Exception(
+            "Incremental conversion requires the previous lookup table, traces, and revision."
+        )
+    if opts.repo_root_dir is None or not is_git_repo(opts.repo_root_dir):
+        raise Exception(
+            "Incremental conversion requires the repository root directory (--repo) to be a git repository."
+        )
+    logging.info(f"Loading previous function table from {previous_function_lookup_file}")
+    previous_function_lookup_table: FunctionLookupTable = load_function_lookup_table(
+        previous_function_lookup_file, root_dir=opts.repo_root_dir
+    )
+    logging.info(
+        f"Loading previous test function traces from {previous_test_function_traces_file}"
+    )
+    previous_test_function_traces: TestFunctionTraces = load_test_function_traces(
+        previous_test_function_traces_file
+    )
+    # covered files that git does not track are parsed again, as git cannot tell whether they changed
+    changed_files: Set[Path] = GitClient(root=opts.repo_root_dir).get_changed_files(
+        revision=previous_revision,
+        files=[Path(file_key) for file_key in previous_function_lookup_table.table],
+    )
+    logging.info(f"Found {len(changed_files)} changed files since {previous_revision}.")
+    function_lookup_table, id_mapping = update_function_lookup_table(
+        previous_function_lookup_table=previous_function_lookup_table,
+        changed_files=changed_files,
+        root_dir=opts.repo_root_dir,
+        disk_cache=opts.disk_cache,
+    )
+    return function_lookup_table, remap_test_function_traces(
+        previous_test_function_traces=previous_test_function_traces,
+        id_mapping=id_mapping,
+    )
+
+
 @app.command()
 def cpp(
     ctx: typer.Context,
@@ -181,6 +328,42 @@ def cpp(
         "--extractor",
         help="If enabled, readily extracted symbol information are used (as obtained from BinaryRTS extractor).",
     ),
+    previous_function_lookup_file: Optional[Path] = typer.Option(
+        None,
+        "--previous-lookup",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True,
+        help="Function lookup table of a previous conversion; if provided, together with --previous-traces "
+        "and --previous-revision, only files changed since the previous revision are parsed again.",
+    ),
+    previous_test_function_traces_file: Optional[Path] = typer.Option(
+        None,
+        "--previous-traces",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True,
+        help="Test function traces of a previous conversion; traces of tests without new coverage files are kept.",
+    ),
+    previous_revision: Optional[str] = typer.Option(
+        None,
+        "--previous-revision",
+        help="Git revision of the repository (see --repo) at which the previous conversion was done.",
+    ),
+    create_index: bool = typer.Option(
+        True,
+        "--index",
+        help="Whether to create an inverted index (function -> tests) next to the test traces (by default, "
+        "one will be created), which speeds up test selection.",
+    ),
+    compact: bool = typer.Option(
+        False,
+        "--compact",
+        help="Whether to store the function IDs of each test as compact integer arrays instead of sets, "
+        "which considerably reduces memory consumption and loading time of (pickled) test traces.",
+    ),
 ):
     """
     Convert raw BB coverage into structured test traces and function lookup tables.
@@ -254,12 +437,27 @@ def cpp(
             )
         logging.info("Done with symbol resolving, starting to create test traces.")
     # create function test traces and function lookups
-    function_lookup_table: FunctionLookupTable = FunctionLookupTable(
-        root_dir=opts.repo_root_dir
-    )
-    test_function_traces: TestFunctionTraces = TestFunctionTraces()
+    function_lookup_table: FunctionLookupTable
+    test_function_traces: TestFunctionTraces
+    if previous_function_lookup_file is not None:
+        function_lookup_table, test_function_traces = _load_previous_conversion(
+            opts=opts,
+            previous_function_lookup_file=previous_function_lookup_file,
+            previous_test_function_traces_file=previous_test_function_traces_file,
+            previous_revision=previous_revision,
+        )
+    else:
+        function_lookup_table = FunctionLookupTable(
+            root_dir=opts.repo_root_dir, disk_cache=opts.disk_cache
+        )
+        test_function_traces = TestFunctionTraces()
+    # tests that are covered in this conversion, whose previous traces (if any) are replaced
+    converted_tests: Set[str] = set()
     for test_coverage in _parse_coverage_files(
-        coverage_files=all_coverage_files, parser=parser, parse_syscalls=False
+        coverage_files=all_coverage_files,
+        parser=parser,
+        parse_syscalls=False,
+        n_processes=opts.n_processes,
     ):
         logging.debug(
             f"Adding coverage: "
@@ -267,14 +465,45 @@ def cpp(
             f"{test_coverage.test_suite}:"
             f"{test_coverage.test_case}"
         )
+        test_id: str = get_test_id(
+            test_coverage.test_module, test_coverage.test_suite, test_coverage.test_case
+        )
+        if test_id not in converted_tests:
+            converted_tests.add(test_id)
+            test_function_traces.remove_test(test_id)
         # TODO: we could check here, if the test result was PASSED and only add the trace then.
+        # resolve all covered lines of a file at once; files are visited in sorted order,
+        # such that function IDs do not depend on the (hash-based) iteration order of the covered lines
+        covered_lines_by_file: Dict[Path, List[CoveredLine]] = {}
         for covered_line in test_coverage.covered_lines:
+            if covered_line.file not in covered_lines_by_file:
+                covered_lines_by_file[covered_line.file] = []
+            covered_lines_by_file[covered_line.file].append(covered_line)
+        # files that have not been seen before are parsed at once
+        function_lookup_table.prefetch_functions(files=covered_lines_by_file.keys())
+        for file in sorted(covered_lines_by_file.keys()):
+            covered_lines: List[CoveredLine] = covered_lines_by_file[file]
             try:
-                functions: List[
-                    CoveredFunction
-                ] = function_lookup_table.find_or_add_functions(
-                    file=covered_line.file, line=covered_line.line
+                functions_by_line: Dict[
+                    int, List[CoveredFunction]
+                ] = function_lookup_table.find_or_add_functions_for_lines(
+                    file=file, lines=[covered_line.line for covered_line in covered_lines]
+                )
+            except Exception as e:
+                logging.debug(e)
+                logging.debug(
+                    f"Exception when looking up {len(covered_lines)} covered lines of {file} in "
+                    f"{test_coverage.test_module}:{test_coverage.test_suite}:{test_coverage.test_case}"
                 )
+                continue
+            for covered_line in covered_lines:
+                functions: List[CoveredFunction] = functions_by_line[covered_line.line]
+                if len(functions) == 0:
+                    logging.debug(
+                        f"Covered line outside of defined functions found: "
+                        f"{covered_line.file}->{covered_line.symbol_name}->{covered_line.line} in "
+                        f"{test_coverage.test_module}:{test_coverage.test_suite}:{test_coverage.test_case}"
+                    )
                 for func in functions:
                     test_function_traces.add_test_function_dependency(
                         test_module=test_coverage.test_module,
@@ -282,18 +511,42 @@ def cpp(
                         test_case=test_coverage.test_case,
                         function=func,
                     )
-            except Exception as e:
-                logging.debug(e)
-                logging.debug(
-                    f"Exception when looking up {covered_line.file}->{covered_line.symbol_name}->{covered_line.line} in "
-                    f"{test_coverage.test_module}:{test_coverage.test_suite}:{test_coverage.test_case}"
-                )
 
-    if opts.binary_output:
+    if compact:
+        test_function_traces = CompactTestFunctionTraces.from_test_function_traces(
+            test_function_traces
+        )
+
+    if opts.mapped_output:
+        # the memory-mapped traces always embed their inverted index
+        mapped.save_function_lookup_table(
+            opts.output_dir / BINARY_FUNCTION_LOOKUP_FILE, function_lookup_table
+        )
+        mapped.save_test_function_traces(
+            opts.output_dir / BINARY_TEST_FUNCTION_TRACES_FILE, test_function_traces
+        )
+    elif opts.sqlite_output:
+        database.save_function_lookup_table(
+            opts.output_dir / SQLITE_FUNCTION_TRACES_FILE, function_lookup_table
+        )
+        database.save_test_function_traces(
+            opts.output_dir / SQLITE_FUNCTION_TRACES_FILE, test_function_traces
+        )
+    elif opts.binary_output:
         function_lookup_table.to_pickle(opts.output_dir / PICKLE_FUNCTION_LOOKUP_FILE)
         test_function_traces.to_pickle(
             opts.output_dir / PICKLE_TEST_FUNCTION_TRACES_FILE
         )
+        if create_index:
+            # the index is only used along with the very traces it was built from
+            test_function_traces.get_index().traces_fingerprint = (
+                get_test_function_traces_fingerprint(
+                    opts.output_dir / PICKLE_TEST_FUNCTION_TRACES_FILE
+                )
+            )
+            test_function_traces.get_index().to_pickle(
+                opts.output_dir / PICKLE_TEST_FUNCTION_INDEX_FILE
+            )
     else:
         function_lookup_table.to_csv(opts.output_dir / FUNCTION_LOOKUP_FILE)
         test_function_traces.to_csv(
@@ -302,6 +555,16 @@ def cpp(
             if create_test_lookup
             else None,
         )
+        if create_index:
+            # the index is only used along with the very traces it was built from
+            test_function_traces.get_index().traces_fingerprint = (
+                get_test_function_traces_fingerprint(
+                    opts.output_dir / TEST_FUNCTION_TRACES_FILE
+                )
+            )
+            test_function_traces.get_index().to_csv(
+                opts.output_dir / TEST_FUNCTION_INDEX_FILE
+            )
 
     # clean files
     if opts.clean:
@@ -319,6 +582,10 @@ def syscalls(
     Convert raw opened files traced via syscall analysis into structured test traces and file lookup tables.
     """
     opts: ConvertCommonOptions = ctx.obj
+    if opts.mapped_output:
+        raise Exception(
+            "Memory-mapped output is only supported for C++ function traces, use --binary instead."
+        )
     parser: CoverageParser = CoverageParser(
         regex=opts.regex,
         extension=extension,
@@ -332,11 +599,18 @@ def syscalls(
     # create file-level per-test traces
     test_file_traces: TestFileTraces = TestFileTraces(root_dir=opts.repo_root_dir)
     for coverage in _parse_coverage_files(
-        coverage_files=all_coverage_files, parser=parser, parse_syscalls=True
+        coverage_files=all_coverage_files,
+        parser=parser,
+        parse_syscalls=True,
+        n_processes=opts.n_processes,
     ):
         test_file_traces.add_coverage(coverage)
 
-    if opts.binary_output:
+    if opts.sqlite_output:
+        database.save_test_file_traces(
+            opts.output_dir / SQLITE_FILE_TRACES_FILE, test_file_traces
+        )
+    elif opts.binary_output:
         test_file_traces.to_pickle(opts.output_dir / PICKLE_TEST_FILE_TRACES_FILE)
     else:
         test_file_traces.to_csv(opts.output_dir / TEST_FILE_TRACES_FILE)
@@ -1,9 +1,14 @@
 import json
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple, Callable
 
 import typer
 
@@ -11,16 +16,22 @@ from binaryrts.parser.coverage import (
     FunctionLookupTable,
     TestFunctionTraces,
     TestFileTraces,
-    TEST_LOOKUP_FILE,
+)
+from binaryrts.parser.storage import (
+    load_function_lookup_table,
+    load_test_function_traces,
+    load_test_file_traces,
 )
 from binaryrts.rts.base import RTSAlgo, SelectionCause
 from binaryrts.rts.cpp import (
     CppFunctionLevelRTS,
     CppFileLevelRTS,
+    ChangeAnalysis,
 )
 from binaryrts.rts.syscall import SyscallFileLevelRTS
-from binaryrts.util.fs import has_ext
+from binaryrts.util.cache import DiskCache, DEFAULT_MAX_CACHE_SIZE
 from binaryrts.util.logging import LogEvent
+from binaryrts.util.mp import map_with_fork
 from binaryrts.vcs.git import is_git_repo, GitClient
 
 app = typer.Typer()
@@ -31,6 +42,8 @@ SELECTION_CAUSES_FILE: str = "selection-causes.txt"
 EVENT_LOG: str = "event.log"
 RTS_START_EVENT: str = "START_BINARY_RTS_SELECTION"
 RTS_END_EVENT: str = "END_BINARY_RTS_SELECTION"
+ANALYSIS_START_EVENT: str = "START_BINARY_RTS_CHANGE_ANALYSIS"
+ANALYSIS_END_EVENT: str = "END_BINARY_RTS_CHANGE_ANALYSIS"
 
 
 @dataclass
@@ -41,6 +54,8 @@ class SelectCommonOptions:
     to_revision: str
     includes_regex: str
     excludes_regex: str
+    disk_cache: Optional[DiskCache] = field(default=None)
+    n_processes: int = field(default=1)
 
 
 @dataclass
@@ -55,6 +70,27 @@ class RTSConfiguration:
     non_functional_analysis_depth: int = field(default=1)
 
 
+def read_revision_ranges(file: Path) -> List[Tuple[str, str]]:
+    """
+    Reads revision ranges from a file with one `from..to` (or `from...to`) pair per line,
+    skipping empty lines and comments starting with `#`.
+    """
+    revision_ranges: List[Tuple[str, str]] = []
+    for line in file.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+        revisions: List[str] = re.split(r"\.{2,3}", line, maxsplit=1)
+        if len(revisions) != 2 or "" in revisions:
+            raise Exception(f"Invalid revision range {line} in {file}.")
+        revision_ranges.append((revisions[0], revisions[1]))
+    return revision_ranges
+
+
+def get_revision_range_dir_name(from_revision: str, to_revision: str) -> str:
+    return re.sub(r"[^\w.-]", "_", f"{from_revision}..{to_revision}")
+
+
 def _repo_callback(value: Path) -> Path:
     if not is_git_repo(path=value):
         raise typer.BadParameter("Only git directories are allowed as repo root.")
@@ -94,17 +130,44 @@ def select(
         "--excludes",
         help="Regular expression to exclude certain files or directories from selection.",
     ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache",
+        writable=True,
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+        help="Directory of a persistent cache for parsed source files and git results, which is shared across runs.",
+    ),
+    cache_size: int = typer.Option(
+        DEFAULT_MAX_CACHE_SIZE // (1024 * 1024),
+        "--cache-size",
+        help="Maximum size of the persistent cache in MiB; least recently used entries are evicted first.",
+    ),
+    n_processes: int = typer.Option(
+        1,
+        "--processes",
+        help="Number of processes for parallelization.",
+    ),
 ):
     """
     Select tests
     """
+    disk_cache: Optional[DiskCache] = (
+        DiskCache(root=cache_dir, max_size=cache_size * 1024 * 1024)
+        if cache_dir is not None
+        else None
+    )
     ctx.obj = SelectCommonOptions(
-        git_client=GitClient(root=repo_root),
+        git_client=GitClient(root=repo_root, disk_cache=disk_cache),
         output=output,
         from_revision=from_revision,
         to_revision=to_revision,
         includes_regex=includes_regex,
         excludes_regex=excludes_regex,
+        disk_cache=disk_cache,
+        n_processes=n_processes,
     )
     output.mkdir(parents=True, exist_ok=True)
 
@@ -213,6 +276,17 @@ def cpp(
         help="Will use `java` prefix instead of `cpp` for output directories when using `--evaluation`. "
         "Has no effect without `--evaluation`.",
     ),
+    batch_file: Optional[Path] = typer.Option(
+        None,
+        "--batch",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True,
+        help="A file of `from..to` revision ranges (one per line) to select tests for, instead of `--from` and `--to`. "
+        "The outputs of every range are written to a subdirectory named by the range. "
+        "With `--processes`, ranges are spread over forked processes.",
+    ),
 ):
     """
     Select C++ tests for GoogleTesting framework.
@@ -220,43 +294,64 @@ def cpp(
     opts: SelectCommonOptions = ctx.obj
 
     logging.info(f"Loading function table from {function_lookup_file}")
-    function_lookup_table: FunctionLookupTable
-    if has_ext(function_lookup_file, exts=[".csv"]):
-        function_lookup_table = FunctionLookupTable.from_csv(
-            function_lookup_file, root_dir=opts.git_client.root
-        )
-    elif has_ext(function_lookup_file, exts=[".pkl"]):
-        function_lookup_table = FunctionLookupTable.from_pickle(function_lookup_file)
-        function_lookup_table.root_dir = opts.git_client.root
-    else:
-        raise Exception(
-            f"Provided invalid function lookup file format, only .csv and .pkl are currently supported."
-        )
+    function_lookup_table: FunctionLookupTable = load_function_lookup_table(
+        function_lookup_file, root_dir=opts.git_client.root
+    )
 
     logging.info(f"Loading test function traces from {test_function_traces_file}")
-    test_function_traces: TestFunctionTraces
-    if has_ext(test_function_traces_file, exts=[".csv"]):
-        test_function_traces = TestFunctionTraces.from_csv(
-            test_function_traces_file,
-            (test_function_traces_file.parent / TEST_LOOKUP_FILE)
-            if (test_function_traces_file.parent / TEST_LOOKUP_FILE).exists()
-            else None,
-        )
-    elif has_ext(test_function_traces_file, exts=[".pkl"]):
-        test_function_traces = TestFunctionTraces.from_pickle(test_function_traces_file)
-    else:
-        raise Exception(
-            f"Provided invalid test traces file format, only .csv and .pkl are currently supported."
+    test_function_traces: TestFunctionTraces = load_test_function_traces(
+        test_function_traces_file, load_index=True
+    )
+
+    def _create_function_level_rts(
+        config: RTSConfiguration, output_dir: Path, n_processes: int
+    ) -> CppFunctionLevelRTS:
+        return CppFunctionLevelRTS(
+            git_client=opts.git_client,
+            function_lookup_table=function_lookup_table,
+            test_function_traces=test_function_traces,
+            output_dir=output_dir,
+            non_functional_analysis=config.non_functional_analysis,
+            non_functional_analysis_depth=config.non_functional_analysis_depth,
+            non_functional_retest_all=config.non_functional_retest_all,
+            virtual_analysis=config.virtual_analysis,
+            includes_regex=opts.includes_regex,
+            excludes_regex=opts.excludes_regex,
+            scope_analysis=config.scope_analysis,
+            overload_analysis=config.overload_analysis,
+            generated_code_regex=generated_code_regex,
+            generated_code_exts=generated_code_exts,
+            retest_all_regex=retest_all_regex,
+            file_level_regex=file_level_regex,
+            use_cscope=use_cscope,
+            disk_cache=opts.disk_cache,
+            n_processes=n_processes,
         )
 
-    def _run_rts(config: RTSConfiguration):
+    def _run_rts(
+        config: RTSConfiguration,
+        from_revision: str,
+        to_revision: str,
+        output: Path,
+        n_processes: int,
+        change_analysis: Optional[ChangeAnalysis] = None,
+        analysis_duration: timedelta = timedelta(),
+    ):
         rts_algo: RTSAlgo
-        output_dir: Path = opts.output / config.name
+        output_dir: Path = output / config.name
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        LogEvent(name=f"{RTS_START_EVENT}_{config.name or 'default'}").append(
-            log_file=output_dir / EVENT_LOG
-        )
+        # The time of a shared change analysis is attributed to each function-level configuration using it,
+        # such that the timings are comparable to configurations that analyze changes on their own.
+        LogEvent(
+            name=f"{RTS_START_EVENT}_{config.name or 'default'}",
+            timestamp=datetime.now()
+            - (
+                analysis_duration
+                if change_analysis is not None and not config.file_level
+                else timedelta()
+            ),
+        ).append(log_file=output_dir / EVENT_LOG)
         try:
             if config.file_level:
                 rts_algo = CppFileLevelRTS(
@@ -271,33 +366,30 @@ def cpp(
                     retest_all_regex=retest_all_regex,
                 )
             else:
-                rts_algo = CppFunctionLevelRTS(
-                    git_client=opts.git_client,
-                    function_lookup_table=function_lookup_table,
-                    test_function_traces=test_function_traces,
-                    output_dir=output_dir,
-                    non_functional_analysis=config.non_functional_analysis,
-                    non_functional_analysis_depth=config.non_functional_analysis_depth,
-                    non_functional_retest_all=config.non_functional_retest_all,
-                    virtual_analysis=config.virtual_analysis,
-                    includes_regex=opts.includes_regex,
-                    excludes_regex=opts.excludes_regex,
-                    scope_analysis=config.scope_analysis,
-                    overload_analysis=config.overload_analysis,
-                    generated_code_regex=generated_code_regex,
-                    generated_code_exts=generated_code_exts,
-                    retest_all_regex=retest_all_regex,
-                    file_level_regex=file_level_regex,
-                    use_cscope=use_cscope,
+                rts_algo = _create_function_level_rts(
+                    config=config, output_dir=output_dir, n_processes=n_processes
                 )
 
             logging.info(
-                f"Running test selection for {opts.from_revision}..{opts.to_revision} for config {config}"
-            )
-            included_tests, excluded_tests, selection_causes = rts_algo.select_tests(
-                from_revision=opts.from_revision,
-                to_revision=opts.to_revision,
+                f"Running test selection for {from_revision}..{to_revision} for config {config}"
             )
+            if change_analysis is not None and isinstance(
+                rts_algo, CppFunctionLevelRTS
+            ):
+                (
+                    included_tests,
+                    excluded_tests,
+                    selection_causes,
+                ) = rts_algo.select_tests_from_analysis(change_analysis=change_analysis)
+            else:
+                (
+                    included_tests,
+                    excluded_tests,
+                    selection_causes,
+                ) = rts_algo.select_tests(
+                    from_revision=from_revision,
+                    to_revision=to_revision,
+                )
 
             (output_dir / INCLUDED_TESTS_FILE).write_text(
                 "\n".join(included_tests), encoding="utf-8"
@@ -318,99 +410,187 @@ def cpp(
             log_file=output_dir / EVENT_LOG
         )
 
-    if evaluation:
-        for c in [
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func",
-                file_level=False,
-                scope_analysis=False,
-                overload_analysis=False,
-                virtual_analysis=False,
-                non_functional_analysis=False,
-                non_functional_retest_all=False,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func-macro",
-                file_level=False,
-                scope_analysis=False,
-                overload_analysis=False,
-                virtual_analysis=False,
-                non_functional_analysis=True,
-                non_functional_retest_all=False,
-                non_functional_analysis_depth=non_functional_analysis_depth,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func-macro-retest-all",
-                file_level=False,
-                scope_analysis=False,
-                virtual_analysis=False,
-                overload_analysis=False,
-                non_functional_analysis=False,
-                non_functional_retest_all=True,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func-scope",
-                file_level=False,
-                scope_analysis=True,
-                overload_analysis=False,
-                virtual_analysis=False,
-                non_functional_analysis=False,
-                non_functional_retest_all=False,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func-overload",
-                file_level=False,
-                scope_analysis=False,
-                overload_analysis=True,
-                virtual_analysis=False,
-                non_functional_analysis=False,
-                non_functional_retest_all=False,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func-virtual",
-                file_level=False,
-                scope_analysis=False,
-                overload_analysis=False,
-                virtual_analysis=True,
-                non_functional_analysis=False,
-                non_functional_retest_all=False,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-func-all",
-                file_level=False,
-                scope_analysis=True,
-                overload_analysis=True,
-                virtual_analysis=True,
-                non_functional_analysis=True,
-                non_functional_retest_all=False,
-                non_functional_analysis_depth=non_functional_analysis_depth,
-            ),
-            RTSConfiguration(
-                name=f"{'java' if java else 'cpp'}-file",
-                file_level=True,
-                scope_analysis=False,
-                overload_analysis=False,
-                virtual_analysis=False,
-                non_functional_analysis=False,
-                non_functional_retest_all=False,
-            ),
-        ]:
-            _run_rts(config=c)
-    else:
-        # in the default case, we simply use the provided CLI options
-        _run_rts(
-            config=RTSConfiguration(
-                name="",
-                file_level=file_level,
-                scope_analysis=scope_analysis,
-                overload_analysis=overload_analysis,
-                virtual_analysis=virtual_analysis,
-                non_functional_analysis=non_functional_analysis,
-                non_functional_retest_all=non_functional_retest_all,
-                non_functional_analysis_depth=non_functional_analysis_depth,
+    def _select(
+        from_revision: str, to_revision: str, output: Path, n_processes: int
+    ) -> None:
+        output.mkdir(parents=True, exist_ok=True)
+        if evaluation:
+            configs: List[RTSConfiguration] = [
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func",
+                    file_level=False,
+                    scope_analysis=False,
+                    overload_analysis=False,
+                    virtual_analysis=False,
+                    non_functional_analysis=False,
+                    non_functional_retest_all=False,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func-macro",
+                    file_level=False,
+                    scope_analysis=False,
+                    overload_analysis=False,
+                    virtual_analysis=False,
+                    non_functional_analysis=True,
+                    non_functional_retest_all=False,
+                    non_functional_analysis_depth=non_functional_analysis_depth,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func-macro-retest-all",
+                    file_level=False,
+                    scope_analysis=False,
+                    virtual_analysis=False,
+                    overload_analysis=False,
+                    non_functional_analysis=False,
+                    non_functional_retest_all=True,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func-scope",
+                    file_level=False,
+                    scope_analysis=True,
+                    overload_analysis=False,
+                    virtual_analysis=False,
+                    non_functional_analysis=False,
+                    non_functional_retest_all=False,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func-overload",
+                    file_level=False,
+                    scope_analysis=False,
+                    overload_analysis=True,
+                    virtual_analysis=False,
+                    non_functional_analysis=False,
+                    non_functional_retest_all=False,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func-virtual",
+                    file_level=False,
+                    scope_analysis=False,
+                    overload_analysis=False,
+                    virtual_analysis=True,
+                    non_functional_analysis=False,
+                    non_functional_retest_all=False,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-func-all",
+                    file_level=False,
+                    scope_analysis=True,
+                    overload_analysis=True,
+                    virtual_analysis=True,
+                    non_functional_analysis=True,
+                    non_functional_retest_all=False,
+                    non_functional_analysis_depth=non_functional_analysis_depth,
+                ),
+                RTSConfiguration(
+                    name=f"{'java' if java else 'cpp'}-file",
+                    file_level=True,
+                    scope_analysis=False,
+                    overload_analysis=False,
+                    virtual_analysis=False,
+                    non_functional_analysis=False,
+                    non_functional_retest_all=False,
+                ),
+            ]
+            with ExitStack() as stack:
+                # All function-level configurations are derived from a single analysis of the changes,
+                # which is valid until the stack is closed; configurations are selected concurrently if configured.
+                change_analysis: Optional[ChangeAnalysis] = None
+                analysis_start_event: LogEvent = LogEvent(name=ANALYSIS_START_EVENT)
+                analysis_start_event.append(log_file=output / EVENT_LOG)
+                try:
+                    change_analysis = stack.enter_context(
+                        _create_function_level_rts(
+                            config=configs[0],
+                            output_dir=output,
+                            n_processes=n_processes,
+                        ).analyze_changes(
+                            from_revision=from_revision,
+                            to_revision=to_revision,
+                            include_non_functionals=True,
+                        )
+                    )
+                except Exception as e:
+                    logging.error(
+                        f"Error occurred in change analysis, analyzing every configuration on its own: {e}"
+                    )
+                analysis_end_event: LogEvent = LogEvent(name=ANALYSIS_END_EVENT)
+                analysis_end_event.append(log_file=output / EVENT_LOG)
+                run_config: Callable[[RTSConfiguration], None] = partial(
+                    _run_rts,
+                    from_revision=from_revision,
+                    to_revision=to_revision,
+                    output=output,
+                    n_processes=n_processes,
+                    change_analysis=change_analysis,
+                    analysis_duration=LogEvent.get_time_diff(
+                        analysis_end_event, analysis_start_event
+                    ),
+                )
+                # Only selections from the shared analysis run in threads; configurations analyzing changes
+                # on their own (i.e., file-level ones or all if the shared analysis failed) run sequentially,
+                # as they start processes, which must not be forked from threads.
+                threaded_configs: List[RTSConfiguration] = (
+                    [c for c in configs if not c.file_level]
+                    if change_analysis is not None and n_processes > 1
+                    else []
+                )
+                if len(threaded_configs) > 0:
+                    with ThreadPoolExecutor(max_workers=n_processes) as executor:
+                        list(executor.map(run_config, threaded_configs))
+                for c in configs:
+                    if not any(c is t for t in threaded_configs):
+                        run_config(c)
+        else:
+            # in the default case, we simply use the provided CLI options
+            _run_rts(
+                from_revision=from_revision,
+                to_revision=to_revision,
+                output=output,
+                n_processes=n_processes,
+                config=RTSConfiguration(
+                    name="",
+                    file_level=file_level,
+                    scope_analysis=scope_analysis,
+                    overload_analysis=overload_analysis,
+                    virtual_analysis=virtual_analysis,
+                    non_functional_analysis=non_functional_analysis,
+                    non_functional_retest_all=non_functional_retest_all,
+                    non_functional_analysis_depth=non_functional_analysis_depth,
+                ),
             )
+
+    if batch_file is None:
+        _select(
+            from_revision=opts.from_revision,
+            to_revision=opts.to_revision,
+            output=opts.output,
+            n_processes=opts.n_processes,
+        )
+        return
+
+    revision_ranges: List[Tuple[str, str]] = read_revision_ranges(file=batch_file)
+    logging.info(
+        f"Running test selection for {len(revision_ranges)} revision ranges from {batch_file}"
+    )
+    # Revision ranges are spread over forked processes, which share the loaded traces copy-on-write
+    # and parse in their own process only; otherwise, the configured processes are used within each range.
+    spread_ranges: bool = opts.n_processes > 1 and len(revision_ranges) > 1
+
+    def _select_revision_range(revision_range: Tuple[str, str]) -> None:
+        from_revision, to_revision = revision_range
+        _select(
+            from_revision=from_revision,
+            to_revision=to_revision,
+            output=opts.output / get_revision_range_dir_name(*revision_range),
+            n_processes=1 if spread_ranges else opts.n_processes,
         )
 
+    map_with_fork(
+        func=_select_revision_range,
+        iterable=revision_ranges,
+        n_cpu=opts.n_processes if spread_ranges else 1,
+    )
+
 
 @app.command()
 def syscalls(
@@ -431,15 +611,7 @@ def syscalls(
 
     LogEvent(name=f"{RTS_START_EVENT}_syscall").append(log_file=opts.output / EVENT_LOG)
 
-    test_file_traces: TestFileTraces
-    if has_ext(test_file_traces_file, exts=[".csv"]):
-        test_file_traces = TestFileTraces.from_csv(test_file_traces_file)
-    elif has_ext(test_file_traces_file, exts=[".pkl"]):
-        test_file_traces = TestFileTraces.from_pickle(test_file_traces_file)
-    else:
-        raise Exception(
-            f"Provided invalid test file traces file format, only .csv and .pkl are currently supported."
-        )
+    test_file_traces: TestFileTraces = load_test_file_traces(test_file_traces_file)
 
     rts_algo: RTSAlgo = SyscallFileLevelRTS(
         git_client=opts.git_client,
@@ -0,0 +1,459 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Set, Callable
+
+import typer
+
+from binaryrts.commands.select import (
+    INCLUDED_TESTS_FILE,
+    EXCLUDED_TESTS_FILE,
+    SELECTION_CAUSES_FILE,
+)
+from binaryrts.parser.coverage import (
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TestFileTraces,
+    TEST_LOOKUP_FILE,
+)
+from binaryrts.parser.storage import (
+    load_function_lookup_table,
+    load_test_function_traces,
+    load_test_file_traces,
+)
+from binaryrts.parser.symbols import SymbolIndex
+from binaryrts.rts.base import RTSAlgo
+from binaryrts.rts.cpp import CppFunctionLevelRTS, CppFileLevelRTS
+from binaryrts.rts.syscall import SyscallFileLevelRTS
+from binaryrts.util.cache import DiskCache, DEFAULT_MAX_CACHE_SIZE
+from binaryrts.vcs.git import is_git_repo, GitClient
+
+app = typer.Typer()
+
+# file contents cached by the git client in memory before the cache is cleared
+MAX_CACHED_GIT_OBJECTS: int = 100_000
+
+Selection = Tuple[Set[str], Set[str], Dict[str, List[Any]]]
+
+
+class SelectionService:
+    """
+    Answers test selection requests with the lookup table, traces, and git client kept in memory.
+    Traces are reloaded once their files change on disk.
+    Revisions are resolved to commit SHAs first, such that cached git results stay valid for moving refs.
+    Requests are answered concurrently in threads, hence selections use threads rather than processes.
+    """
+
+    def __init__(
+        self,
+        repo_root: Path,
+        function_lookup_file: Optional[Path] = None,
+        test_function_traces_file: Optional[Path] = None,
+        test_file_traces_file: Optional[Path] = None,
+        disk_cache: Optional[DiskCache] = None,
+        n_processes: int = 1,
+    ) -> None:
+        if (function_lookup_file is None) != (test_function_traces_file is None):
+            raise Exception(
+                "Function lookup table and test function traces must be provided together."
+            )
+        self.function_lookup_file = function_lookup_file
+        self.test_function_traces_file = test_function_traces_file
+        self.test_file_traces_file = test_file_traces_file
+        self.disk_cache = disk_cache
+        self.n_processes = n_processes
+        self.git_client: GitClient = GitClient(root=repo_root, disk_cache=disk_cache)
+        self.function_lookup_table: Optional[FunctionLookupTable] = None
+        self.test_function_traces: Optional[TestFunctionTraces] = None
+        self.test_file_traces: Optional[TestFileTraces] = None
+        # modification times and sizes of the loaded trace files
+        self.trace_file_stats: Optional[List[Optional[Tuple[int, int]]]] = None
+        # modification times and sizes of trace files that failed to load
+        self.failed_trace_file_stats: Optional[List[Optional[Tuple[int, int]]]] = None
+        self.reload_lock: threading.Lock = threading.Lock()
+        # symbol indices of the non-functional analysis, which are updated incrementally across requests
+        self.symbol_indices: Dict[Path, SymbolIndex] = {}
+        self.reload_if_changed()
+
+    def _get_trace_files(self) -> List[Path]:
+        files: List[Path] = [
+            file
+            for file in [
+                self.function_lookup_file,
+                self.test_function_traces_file,
+                self.test_file_traces_file,
+            ]
+            if file is not None
+        ]
+        if self.test_function_traces_file is not None:
+            # CSV traces are loaded along with the test lookup file next to them
+            files.append(self.test_function_traces_file.parent / TEST_LOOKUP_FILE)
+        return files
+
+    def _get_trace_file_stats(self) -> List[Optional[Tuple[int, int]]]:
+        stats: List[Optional[Tuple[int, int]]] = []
+        for file in self._get_trace_files():
+            try:
+                stat: os.stat_result = file.stat()
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append(None)
+        return stats
+
+    def reload_if_changed(self) -> bool:
+        """
+        (Re-)loads the traces if their files changed since they were loaded last.
+        Only one thread loads at a time, concurrent requests keep using the previous traces meanwhile.
+        If loading fails (e.g., for a partially written file), the previous traces are kept as well.
+        """
+        stats: List[Optional[Tuple[int, int]]] = self._get_trace_file_stats()
+        if stats == self.trace_file_stats or stats == self.failed_trace_file_stats:
+            return False
+        # without any traces loaded yet, there is nothing to serve meanwhile
+        if not self.reload_lock.acquire(blocking=self.trace_file_stats is None):
+            return False
+        try:
+            stats = self._get_trace_file_stats()
+            if stats == self.trace_file_stats:
+                return False
+            logging.info("Loading traces")
+            function_lookup_table: Optional[FunctionLookupTable] = None
+            test_function_traces: Optional[TestFunctionTraces] = None
+            test_file_traces: Optional[TestFileTraces] = None
+            try:
+                if self.function_lookup_file is not None:
+                    function_lookup_table = load_function_lookup_table(
+                        self.function_lookup_file, root_dir=self.git_client.root
+                    )
+                    test_function_traces = load_test_function_traces(
+                        self.test_function_traces_file, load_index=True
+                    )
+                if self.test_file_traces_file is not None:
+                    test_file_traces = load_test_file_traces(self.test_file_traces_file)
+            except Exception as e:
+                if self.trace_file_stats is None:
+                    raise
+                logging.error(
+                    f"Failed to reload traces, keeping the previous ones: {e}"
+                )
+                # files are only reloaded once they change again
+                self.failed_trace_file_stats = stats
+                return False
+            self.function_lookup_table, self.test_function_traces = (
+                function_lookup_table,
+                test_function_traces,
+            )
+            self.test_file_traces = test_file_traces
+            self.trace_file_stats = stats
+            return True
+        finally:
+            self.reload_lock.release()
+
+    def _resolve_revisions(self, request: Dict[str, Any]) -> Tuple[str, str]:
+        return self.git_client.rev_parse(
+            revision=request.get("from", "main")
+        ), self.git_client.rev_parse(revision=request.get("to", "HEAD"))
+
+    def _select(self, rts_algo: RTSAlgo, request: Dict[str, Any]) -> Selection:
+        from_revision, to_revision = self._resolve_revisions(request)
+        selection: Selection = rts_algo.select_tests(
+            from_revision=from_revision, to_revision=to_revision
+        )
+        if len(self.git_client.show_cache) > MAX_CACHED_GIT_OBJECTS:
+            self.git_client.show_cache.clear()
+        return selection
+
+    def select_cpp(self, request: Dict[str, Any]) -> Selection:
+        """
+        Selects tests based on function traces, where the request holds the same options as `select cpp`
+        in snake case (e.g., `from`, `to`, `file_level`, `non_functional_analysis`, `includes`).
+        """
+        self.reload_if_changed()
+        function_lookup_table: Optional[FunctionLookupTable] = self.function_lookup_table
+        test_function_traces: Optional[TestFunctionTraces] = self.test_function_traces
+        if function_lookup_table is None or test_function_traces is None:
+            raise Exception("No function lookup table and test function traces loaded.")
+        output_dir: Path = Path(request.get("output", self.git_client.root))
+        rts_algo: RTSAlgo
+        if request.get("file_level", False):
+            rts_algo = CppFileLevelRTS(
+                git_client=self.git_client,
+                function_lookup_table=function_lookup_table,
+                test_function_traces=test_function_traces,
+                output_dir=output_dir,
+                includes_regex=request.get("includes", ".*"),
+                excludes_regex=request.get("excludes", ""),
+                generated_code_regex=request.get("generated_code"),
+                generated_code_exts=request.get("generated_exts", []),
+                retest_all_regex=request.get("retest_all"),
+            )
+        else:
+            rts_algo = CppFunctionLevelRTS(
+                git_client=self.git_client,
+                function_lookup_table=function_lookup_table,
+                test_function_traces=test_function_traces,
+                output_dir=output_dir,
+                non_functional_analysis=request.get("non_functional_analysis", False),
+                non_functional_analysis_depth=request.get(
+                    "non_functional_analysis_depth", 2
+                ),
+                non_functional_retest_all=request.get(
+                    "non_functional_retest_all", False
+                ),
+                virtual_analysis=request.get("virtual_analysis", False),
+                scope_analysis=request.get("scope_analysis", False),
+                overload_analysis=request.get("overload_analysis", False),
+                use_cscope=request.get("cscope", False),
+                includes_regex=request.get("includes", ".*"),
+                excludes_regex=request.get("excludes", ""),
+                generated_code_regex=request.get("generated_code"),
+                generated_code_exts=request.get("generated_exts", []),
+                retest_all_regex=request.get("retest_all"),
+                file_level_regex=request.get("file_level_regex"),
+                disk_cache=self.disk_cache,
+                n_processes=self.n_processes,
+                symbol_indices=self.symbol_indices,
+            )
+        return self._select(rts_algo=rts_algo, request=request)
+
+    def select_syscalls(self, request: Dict[str, Any]) -> Selection:
+        """
+        Selects tests based on opened files, where the request holds `from`, `to`, `includes`, and `excludes`.
+        """
+        self.reload_if_changed()
+        test_file_traces: Optional[TestFileTraces] = self.test_file_traces
+        if test_file_traces is None:
+            raise Exception("No test file traces loaded.")
+        return self._select(
+            rts_algo=SyscallFileLevelRTS(
+                git_client=self.git_client,
+                test_file_traces=test_file_traces,
+                output_dir=Path(request.get("output", self.git_client.root)),
+                includes_regex=request.get("includes", ".*"),
+                excludes_regex=request.get("excludes", ""),
+            ),
+            request=request,
+        )
+
+
+def _write_selection(output_dir: Path, selection: Selection) -> None:
+    included_tests, excluded_tests, selection_causes = selection
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / INCLUDED_TESTS_FILE).write_text(
+        "\n".join(included_tests), encoding="utf-8"
+    )
+    (output_dir / EXCLUDED_TESTS_FILE).write_text(
+        "\n".join(excluded_tests), encoding="utf-8"
+    )
+    with (output_dir / SELECTION_CAUSES_FILE).open("w+") as fp:
+        json.dump(selection_causes, fp)
+
+
+def create_request_handler(service: SelectionService) -> type:
+    routes: Dict[str, Callable[[Dict[str, Any]], Selection]] = {
+        "/select/cpp": service.select_cpp,
+        "/select/syscalls": service.select_syscalls,
+    }
+
+    class SelectionRequestHandler(BaseHTTPRequestHandler):
+        """
+        Handles `POST /select/cpp` and `POST /select/syscalls` with a JSON object of options,
+        answering with the included and excluded tests and the selection causes.
+        If the request holds an `output` directory, the selection is also written there like by `select`.
+        """
+
+        def _send_json(self, status: int, body: Any) -> None:
+            content: bytes = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self) -> None:
+            if self.path not in routes:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                length: int = int(self.headers.get("Content-Length", 0))
+                request: Dict[str, Any] = (
+                    json.loads(self.rfile.read(length)) if length > 0 else {}
+                )
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object.")
+            except ValueError as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+                return
+            try:
+                selection: Selection = routes[self.path](request)
+                if "output" in request:
+                    _write_selection(
+                        output_dir=Path(request["output"]), selection=selection
+                    )
+            except Exception as e:
+                logging.error(f"Error occurred in RTS: {e}")
+                self._send_json(500, {"error": str(e)})
+                return
+            included_tests, excluded_tests, selection_causes = selection
+            self._send_json(
+                200,
+                {
+                    "included": sorted(included_tests),
+                    "excluded": sorted(excluded_tests),
+                    "causes": selection_causes,
+                },
+            )
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # the client address is empty for Unix sockets
+            logging.debug(f"{self.command} {self.path}: {format % args}")
+
+    return SelectionRequestHandler
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class ThreadingUnixHTTPServer(
+        socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+    ):
+        daemon_threads = True
+
+        def server_bind(self) -> None:
+            socketserver.UnixStreamServer.server_bind(self)
+            # attributes expected by `BaseHTTPRequestHandler`
+            self.server_name = "localhost"
+            self.server_port = 0
+
+
+def create_server(
+    service: SelectionService,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    socket_path: Optional[Path] = None,
+) -> socketserver.BaseServer:
+    """
+    Creates an HTTP server for the selection service on a Unix socket if given, otherwise on the host and port.
+    """
+    handler: type = create_request_handler(service=service)
+    if socket_path is not None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise Exception("Unix sockets are not supported on this platform.")
+        # a socket file left over from a previous run would fail binding
+        socket_path.unlink(missing_ok=True)
+        return ThreadingUnixHTTPServer(str(socket_path), handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def _repo_callback(value: Path) -> Path:
+    if not is_git_repo(path=value):
+        raise typer.BadParameter("Only git directories are allowed as repo root.")
+    return value
+
+
+@app.callback(invoke_without_command=True)
+def serve(
+    repo_root: Path = typer.Option(
+        lambda: Path(os.getcwd()),
+        "--repo",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+        callback=_repo_callback,
+    ),
+    function_lookup_file: Optional[Path] = typer.Option(
+        None,
+        "--lookup",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True,
+    ),
+    test_function_traces_file: Optional[Path] = typer.Option(
+        None,
+        "--traces",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True,
+    ),
+    test_file_traces_file: Optional[Path] = typer.Option(
+        None,
+        "--file-traces",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True,
+        help="Test file traces for syscall-based selection.",
+    ),
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8642, "--port"),
+    socket_path: Optional[Path] = typer.Option(
+        None,
+        "--socket",
+        resolve_path=True,
+        help="Serve on a Unix socket rather than on host and port.",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache",
+        writable=True,
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+        help="Directory of a persistent cache for parsed source files and git results, which is shared across runs.",
+    ),
+    cache_size: int = typer.Option(
+        DEFAULT_MAX_CACHE_SIZE // (1024 * 1024),
+        "--cache-size",
+        help="Maximum size of the persistent cache in MiB; least recently used entries are evicted first.",
+    ),
+    n_processes: int = typer.Option(
+        1,
+        "--processes",
+        help="Number of threads for parallelization within a selection.",
+    ),
+):
+    """
+    Serve test selection requests over HTTP, keeping traces and caches in memory.
+    """
+    if function_lookup_file is None and test_file_traces_file is None:
+        raise typer.BadParameter(
+            "Either function lookup table and traces or file traces are required."
+        )
+    service: SelectionService = SelectionService(
+        repo_root=repo_root,
+        function_lookup_file=function_lookup_file,
+        test_function_traces_file=test_function_traces_file,
+        test_file_traces_file=test_file_traces_file,
+        disk_cache=DiskCache(root=cache_dir, max_size=cache_size * 1024 * 1024)
+        if cache_dir is not None
+        else None,
+        n_processes=n_processes,
+    )
+    server: socketserver.BaseServer = create_server(
+        service=service, host=host, port=port, socket_path=socket_path
+    )
+    logging.info(
+        f"Serving test selection on {socket_path if socket_path is not None else f'http://{host}:{port}'}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
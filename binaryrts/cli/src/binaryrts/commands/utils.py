@@ -13,9 +13,11 @@ from binaryrts.parser.conversion.sonar import SonarCoverageConverter
 from binaryrts.parser.coverage import (
     FunctionLookupTable,
     TestFunctionTraces,
-    TEST_LOOKUP_FILE,
 )
-from binaryrts.util.fs import has_ext
+from binaryrts.parser.storage import (
+    load_function_lookup_table,
+    load_test_function_traces,
+)
 
 app = typer.Typer()
 
@@ -118,34 +120,14 @@ def coverage(
     Convert the test traces into a coverage format to be used by a coverage conversion tool.
     """
     logging.info(f"Loading function table from {function_lookup_file}")
-    function_lookup_table: FunctionLookupTable
-    if has_ext(function_lookup_file, exts=[".csv"]):
-        function_lookup_table = FunctionLookupTable.from_csv(
-            function_lookup_file, root_dir=root_dir
-        )
-    elif has_ext(function_lookup_file, exts=[".pkl"]):
-        function_lookup_table = FunctionLookupTable.from_pickle(function_lookup_file)
-        function_lookup_table.root_dir = root_dir
-    else:
-        raise Exception(
-            "Provided invalid function lookup file format, only .csv and .pkl are currently supported."
-        )
+    function_lookup_table: FunctionLookupTable = load_function_lookup_table(
+        function_lookup_file, root_dir=root_dir
+    )
 
     logging.info(f"Loading test function traces from {test_function_traces_file}")
-    test_function_traces: TestFunctionTraces
-    if has_ext(test_function_traces_file, exts=[".csv"]):
-        test_function_traces = TestFunctionTraces.from_csv(
-            test_function_traces_file,
-            (test_function_traces_file.parent / TEST_LOOKUP_FILE)
-            if (test_function_traces_file.parent / TEST_LOOKUP_FILE).exists()
-            else None,
-        )
-    elif has_ext(test_function_traces_file, exts=[".pkl"]):
-        test_function_traces = TestFunctionTraces.from_pickle(test_function_traces_file)
-    else:
-        raise Exception(
-            "Provided invalid test traces file format, only .csv and .pkl are currently supported."
-        )
+    test_function_traces: TestFunctionTraces = load_test_function_traces(
+        test_function_traces_file
+    )
 
     logging.info(f"Starting to convert coverage to format {coverage_format}.")
     converter: CoverageConverter
@@ -211,65 +193,19 @@ def compare_traces(
     ),
 ):
     """Compare two test traces and lookup files."""
-    old_function_lookup_table: FunctionLookupTable
-    if has_ext(old_function_lookup_file, exts=[".csv"]):
-        old_function_lookup_table = FunctionLookupTable.from_csv(
-            old_function_lookup_file
-        )
-    elif has_ext(old_function_lookup_file, exts=[".pkl"]):
-        old_function_lookup_table = FunctionLookupTable.from_pickle(
-            old_function_lookup_file
-        )
-    else:
-        raise Exception(
-            "Provided invalid function lookup file format, only .csv and .pkl are currently supported."
-        )
-    new_function_lookup_table: FunctionLookupTable
-    if has_ext(new_function_lookup_file, exts=[".csv"]):
-        new_function_lookup_table = FunctionLookupTable.from_csv(
-            new_function_lookup_file
-        )
-    elif has_ext(new_function_lookup_file, exts=[".pkl"]):
-        new_function_lookup_table = FunctionLookupTable.from_pickle(
-            new_function_lookup_file
-        )
-    else:
-        raise Exception(
-            "Provided invalid function lookup file format, only .csv and .pkl are currently supported."
-        )
+    old_function_lookup_table: FunctionLookupTable = load_function_lookup_table(
+        old_function_lookup_file
+    )
+    new_function_lookup_table: FunctionLookupTable = load_function_lookup_table(
+        new_function_lookup_file
+    )
 
-    old_test_function_traces: TestFunctionTraces
-    if has_ext(old_test_function_traces_file, exts=[".csv"]):
-        old_test_function_traces = TestFunctionTraces.from_csv(
-            old_test_function_traces_file,
-            (old_test_function_traces_file.parent / TEST_LOOKUP_FILE)
-            if (old_test_function_traces_file.parent / TEST_LOOKUP_FILE).exists()
-            else None,
-        )
-    elif has_ext(old_test_function_traces_file, exts=[".pkl"]):
-        old_test_function_traces = TestFunctionTraces.from_pickle(
-            old_test_function_traces_file
-        )
-    else:
-        raise Exception(
-            "Provided invalid test traces file format, only .csv and .pkl are currently supported."
-        )
-    new_test_function_traces: TestFunctionTraces
-    if has_ext(new_test_function_traces_file, exts=[".csv"]):
-        new_test_function_traces = TestFunctionTraces.from_csv(
-            new_test_function_traces_file,
-            (new_test_function_traces_file.parent / TEST_LOOKUP_FILE)
-            if (new_test_function_traces_file.parent / TEST_LOOKUP_FILE).exists()
-            else None,
-        )
-    elif has_ext(new_test_function_traces_file, exts=[".pkl"]):
-        new_test_function_traces = TestFunctionTraces.from_pickle(
-            new_test_function_traces_file
-        )
-    else:
-        raise Exception(
-            "Provided invalid test traces file format, only .csv and .pkl are currently supported."
-        )
+    old_test_function_traces: TestFunctionTraces = load_test_function_traces(
+        old_test_function_traces_file
+    )
+    new_test_function_traces: TestFunctionTraces = load_test_function_traces(
+        new_test_function_traces_file
+    )
 
     missing_functions: Dict[str, List[str]] = defaultdict(list)
     total_old_func_names: Set[str] = set()
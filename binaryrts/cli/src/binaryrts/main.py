@@ -2,7 +2,7 @@ import logging
 import sys
 
 import typer
-from binaryrts.commands import select, convert, utils
+from binaryrts.commands import select, convert, utils, serve
 
 logging.basicConfig(
     format="[%(process)d] %(asctime)s: %(filename)s - %(levelname)s: %(message)s",
@@ -14,6 +14,7 @@ app = typer.Typer()
 app.add_typer(select.app, name="select")
 app.add_typer(convert.app, name="convert")
 app.add_typer(utils.app, name="utils")
+app.add_typer(serve.app, name="serve")
 
 
 @app.callback()
@@ -20,7 +20,7 @@ class LCOVCoverageConverter(CoverageConverter):
         lines: List[str] = []
         covered_function_ids: Set[int] = set()
         for covered_funcs in self.test_traces.table.values():
-            covered_function_ids |= covered_funcs
+            covered_function_ids.update(covered_funcs)
 
         for file, funcs in self.lookup.table.items():
             # SF:<filepath>
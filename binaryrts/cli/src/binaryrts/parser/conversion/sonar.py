@@ -22,7 +22,7 @@ class SonarCoverageConverter(CoverageConverter):
         lines: List[str] = []
         covered_function_ids: Set[int] = set()
         for covered_funcs in self.test_traces.table.values():
-            covered_function_ids |= covered_funcs
+            covered_function_ids.update(covered_funcs)
         lines.append('<coverage version="1">')
         for file, funcs in self.lookup.table.items():
             # <file path="<filepath>">
@@ -1,10 +1,24 @@
+import heapq
 import logging
 import re
 import subprocess as sb
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Set, List, Pattern, Tuple, Dict, Any
+from typing import (
+    Optional,
+    Set,
+    List,
+    Pattern,
+    Tuple,
+    Dict,
+    Any,
+    Callable,
+    Iterable,
+    Sequence,
+)
 
 from binaryrts.parser.sourcecode import (
     CSourceCodeParser,
@@ -12,6 +26,7 @@ from binaryrts.parser.sourcecode import (
     PROTOTYPE_PREFIX,
 )
 from binaryrts.util import dict_equals
+from binaryrts.util.cache import DiskCache
 from binaryrts.util.fs import is_relative_to
 from binaryrts.util.process import check_executable_exists
 from binaryrts.util.serialization import SerializerMixin
@@ -22,11 +37,13 @@ FUNCTION_LOOKUP_FILE: str = "function-lookup.csv"
 TEST_LOOKUP_FILE: str = "test-lookup.csv"
 TEST_FUNCTION_TRACES_FILE: str = "test-function-traces.csv"
 TEST_FILE_TRACES_FILE: str = "test-file-traces.csv"
+TEST_FUNCTION_INDEX_FILE: str = "test-function-index.csv"
 
 # pickle-based output
 PICKLE_TEST_FUNCTION_TRACES_FILE: str = "test-function-traces.pkl"
 PICKLE_FUNCTION_LOOKUP_FILE: str = "function-lookup.pkl"
 PICKLE_TEST_FILE_TRACES_FILE: str = "test-file-traces.pkl"
+PICKLE_TEST_FUNCTION_INDEX_FILE: str = "test-function-index.pkl"
 
 # constants
 CSV_SEP: str = ";"
@@ -35,6 +52,8 @@ TEST_RESULT_SEP: str = "___"
 TEST_SUITE_CASE_SEP: str = "."
 TEST_ID_SEP: str = "!!!"
 GLOBAL_TEST_SETUP: str = "GLOBAL_TEST_SETUP"
+FUNCTION_ID_TYPECODE: str = "I"  # unsigned int (4 bytes on all relevant platforms)
+TEST_INDEX_TYPECODE: str = "I"
 
 
 @dataclass()
@@ -142,6 +161,96 @@ def from_test_id(test_id: str) -> Tuple[str, Optional[str], Optional[str]]:
     return test_module, test_suite, test_case
 
 
+class FunctionLineIndex:
+    """
+    The function line index stores the line intervals of a file's functions sorted by their start line,
+    together with the maximum end line of all preceding intervals.
+    This allows to find all (possibly nested) functions enclosing a line in logarithmic time,
+    by scanning backwards from the last function starting before the line
+    until no preceding function can reach the line anymore.
+    """
+
+    def __init__(self, functions: List[CoveredFunction]) -> None:
+        # keep the position of each function, such that results retain the order of the lookup table
+        self.entries: List[Tuple[int, int, CoveredFunction]] = sorted(
+            ((func.start, pos, func) for pos, func in enumerate(functions)),
+            key=lambda entry: (entry[0], entry[1]),
+        )
+        self.starts: List[int] = [start for start, _, _ in self.entries]
+        self.max_ends: List[int] = []
+        max_end: int = -1
+        for _, _, func in self.entries:
+            max_end = max(max_end, func.end)
+            self.max_ends.append(max_end)
+
+    def find_functions(self, line: int) -> List[CoveredFunction]:
+        matches: List[Tuple[int, CoveredFunction]] = []
+        idx: int = bisect_right(self.starts, line) - 1
+        while idx >= 0 and self.max_ends[idx] >= line:
+            _, pos, func = self.entries[idx]
+            if func.end >= line:
+                matches.append((pos, func))
+            idx -= 1
+        return [func for _, func in sorted(matches, key=lambda match: match[0])]
+
+    def find_functions_by_lines(
+        self, lines: Iterable[int]
+    ) -> Dict[int, List[CoveredFunction]]:
+        """
+        Sweeps once over the sorted lines and function intervals, keeping track of the active intervals.
+        """
+        functions_by_line: Dict[int, List[CoveredFunction]] = {}
+        active: List[Tuple[int, int, CoveredFunction]] = []  # heap by end line
+        idx: int = 0
+        for line in sorted(set(lines)):
+            while idx < len(self.entries) and self.entries[idx][0] <= line:
+                _, pos, func = self.entries[idx]
+                heapq.heappush(active, (func.end, pos, func))
+                idx += 1
+            while len(active) > 0 and active[0][0] < line:
+                heapq.heappop(active)
+            functions_by_line[line] = [
+                func for _, _, func in sorted(active, key=lambda entry: entry[1])
+            ]
+        return functions_by_line
+
+
+def _compile_function_predicate(
+    signature: Optional[str] = None,
+    namespace: Optional[str] = None,
+    class_name: Optional[str] = None,
+) -> Optional[Callable[[CoveredFunction], bool]]:
+    """
+    Compiles a query on functions into a single predicate, where `*` matches any non-empty value,
+    an empty string only matches missing values, and a signature ending with `*` matches by substring.
+    Returns `None` if the query does not restrict functions at all.
+    """
+    conditions: List[Callable[[CoveredFunction], bool]] = []
+    if signature is not None and signature.endswith("*"):
+        raw_function_name: str = signature[:-1]
+        conditions.append(lambda func: raw_function_name in func.signature)
+    elif signature is not None:
+        conditions.append(lambda func: func.signature == signature)
+    if namespace == "*":
+        conditions.append(lambda func: func.namespace is not None)
+    elif namespace == "":
+        conditions.append(lambda func: func.namespace is None)
+    elif namespace is not None:
+        conditions.append(lambda func: func.namespace == namespace)
+    if class_name == "*":
+        conditions.append(lambda func: func.class_name is not None)
+    elif class_name == "":
+        conditions.append(lambda func: func.class_name is None)
+    elif class_name is not None:
+        conditions.append(lambda func: func.class_name == class_name)
+
+    if len(conditions) == 0:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return lambda func: all(condition(func) for condition in conditions)
+
+
 class FunctionLookupTable(SerializerMixin):
     """
     The function lookup table is a hashtable which uses the functions' files as keys:
@@ -157,6 +266,7 @@ class FunctionLookupTable(SerializerMixin):
         table: Optional[Dict[str, List[CoveredFunction]]] = None,
         root_dir: Optional[Path] = None,
         all_functions: Optional[List[CoveredFunction]] = None,
+        disk_cache: Optional[DiskCache] = None,
         *args,
         **kwargs,
     ) -> None:
@@ -166,6 +276,10 @@ class FunctionLookupTable(SerializerMixin):
         else:
             self.table: Dict[str, List[CoveredFunction]] = {}
         self.root_dir = root_dir
+        # persistent cache for parsing functions of added files
+        self.disk_cache = disk_cache
+        # parser for added files, created on first use
+        self.parser: Optional[CSourceCodeParser] = None
         self.all_functions_ordered_by_id: List[CoveredFunction]
         if all_functions is not None:
             self.all_functions_ordered_by_id = sorted(
@@ -175,18 +289,36 @@ class FunctionLookupTable(SerializerMixin):
             self.all_functions_ordered_by_id = sorted(
                 sum(self.table.values(), []), key=lambda x: x.identifier
             )
-        # cache lookup table by function name
+        # sorted line intervals of functions per file, created on first lookup
+        self.line_index: Dict[str, FunctionLineIndex] = {}
+        # cache lookup table by function name, and secondary indices by namespace and class name
         self.function_cache: Dict[str, List[CoveredFunction]] = {}
+        self.namespace_index: Optional[Dict[Optional[str], List[CoveredFunction]]] = {}
+        self.class_name_index: Optional[Dict[Optional[str], List[CoveredFunction]]] = {}
         self.update_function_cache()
 
         self.max_id: int = (
             0  # 0-indexed, so we can comfortably perform constant-time lookups by id
         )
         if len(self.all_functions_ordered_by_id) > 0:
-            self.max_id = self.all_functions_ordered_by_id[-1].identifier
+            self.max_id = self.all_functions_ordered_by_id[-1].identifier + 1
+
+    def __getstate__(self):
+        # the function cache and secondary indices are re-created when deserializing, no need to store them
+        state = self.__dict__.copy()
+        state["function_cache"] = {}
+        state["namespace_index"] = {}
+        state["class_name_index"] = {}
+        state["line_index"] = {}
+        state["disk_cache"] = None
+        state["parser"] = None
+        return state
 
     def __setstate__(self, state):
         self.__dict__ = state
+        self.line_index = {}
+        self.disk_cache = None
+        self.parser = None
         # we remove the root_dir attribute when deserializing, to make read-only scenarios faster,
         # that would otherwise always have to check for relative paths
         self.root_dir = None
@@ -201,10 +333,21 @@ class FunctionLookupTable(SerializerMixin):
         return file_key
 
     def update_function_cache(self):
+        self.function_cache = {}
+        self.namespace_index = {}
+        self.class_name_index = {}
         for func in self.all_functions_ordered_by_id:
-            if func.signature not in self.function_cache:
-                self.function_cache[func.signature] = []
-            self.function_cache[func.signature].append(func)
+            self._index_function(func)
+
+    def _index_function(self, func: CoveredFunction) -> None:
+        for index, key in [
+            (self.function_cache, func.signature),
+            (self.namespace_index, func.namespace),
+            (self.class_name_index, func.class_name),
+        ]:
+            if key not in index:
+                index[key] = []
+            index[key].append(func)
 
     def to_csv(self, file: Path):
         with file.open("w+") as csv_file:
@@ -266,6 +409,8 @@ class FunctionLookupTable(SerializerMixin):
         function_name_has_wildcard: bool = signature is not None and signature.endswith(
             "*"
         )
+        # whether the candidates are already known to match the queried signature
+        matched_by_signature: bool = False
 
         if file is not None:
             file_key: str = self._relativize_filepath_to_key(filepath=file)
@@ -276,65 +421,96 @@ class FunctionLookupTable(SerializerMixin):
                     f"Did not find any functions for {file} in lookup table, skip further querying"
                 )
                 return functions
-        else:
-            if (
-                signature is not None
-                and signature not in self.function_cache
-                and not function_name_has_wildcard
-            ):
+        elif signature is not None and not function_name_has_wildcard:
+            if signature not in self.function_cache:
                 logging.debug(
                     f"Did not find function {signature} in lookup table, skip further querying"
                 )
                 return functions
-            elif signature is not None and not function_name_has_wildcard:
-                functions = self.function_cache[signature]
-                logging.debug(
-                    f"Found {signature} in lookup table, only querying across {len(functions)} functions"
-                )
-            else:
-                functions = self.all_functions_ordered_by_id
-                logging.debug(
-                    f"Not able to narrow down considered functions, querying across all {len(functions)} functions"
-                )
-
-        query_parts: List[str] = []
-        if function_name_has_wildcard:
-            # in the case of a wildcard, we strip the wildcard character and match by substring
+            functions = self.function_cache[signature]
+            matched_by_signature = True
+            logging.debug(
+                f"Found {signature} in lookup table, only querying across {len(functions)} functions"
+            )
+        elif function_name_has_wildcard:
+            # in the case of a wildcard, we match by substring across the distinct signatures only
             raw_function_name: str = signature[:-1]
-            query_parts.append(f"'{raw_function_name}' in func.signature")
-        elif signature is not None:
-            query_parts.append(f"func.signature == '{signature}'")
-        if namespace is not None:
-            if namespace == "*":
-                query_parts.append("func.namespace is not None")
-            elif namespace == "":
-                query_parts.append("func.namespace is None")
-            else:
-                query_parts.append(f"func.namespace == '{namespace}'")
-        if class_name is not None:
-            if class_name == "*":
-                query_parts.append("func.class_name is not None")
-            elif class_name == "":
-                query_parts.append("func.class_name is None")
-            else:
-                query_parts.append(f"func.class_name == '{class_name}'")
-        if len(query_parts) > 0:
-            query = " and ".join(query_parts)
-            logging.debug(f"Search query to find function: {query}")
-            functions = list(filter(lambda func: eval(query), functions))
+            functions = sorted(
+                (
+                    func
+                    for function_signature, signature_functions in self.function_cache.items()
+                    if raw_function_name in function_signature
+                    for func in signature_functions
+                ),
+                key=lambda func: func.identifier,
+            )
+            matched_by_signature = True
+            logging.debug(
+                f"Found {len(functions)} functions matching {signature} in lookup table"
+            )
+        else:
+            functions = self._find_candidates_by_scope(
+                namespace=namespace, class_name=class_name
+            )
+
+        predicate: Optional[
+            Callable[[CoveredFunction], bool]
+        ] = _compile_function_predicate(
+            signature=None if matched_by_signature else signature,
+            namespace=namespace,
+            class_name=class_name,
+        )
+        if predicate is not None:
+            functions = [func for func in functions if predicate(func)]
         return functions.copy()
 
+    def _find_candidates_by_scope(
+        self, namespace: Optional[str] = None, class_name: Optional[str] = None
+    ) -> List[CoveredFunction]:
+        """
+        Returns the smallest list of functions (ordered by ID) from the secondary indices
+        that can contain matches for the given namespace and class name.
+        """
+        candidates: List[CoveredFunction] = self.all_functions_ordered_by_id
+        for index, key in [
+            (self.namespace_index, namespace),
+            (self.class_name_index, class_name),
+        ]:
+            if index is None or key is None or key == "*":
+                continue
+            key_candidates: List[CoveredFunction] = index.get(
+                None if key == "" else key, []
+            )
+            if len(key_candidates) < len(candidates):
+                candidates = key_candidates
+        logging.debug(
+            f"Narrowed down considered functions by scope to {len(candidates)} functions"
+        )
+        return candidates
+
+    def _get_line_index(self, file_key: str) -> "FunctionLineIndex":
+        if file_key not in self.line_index:
+            self.line_index[file_key] = FunctionLineIndex(self.table[file_key])
+        return self.line_index[file_key]
+
     def find_functions_by_line(
         self, file: Path, line: int
     ) -> Optional[List[CoveredFunction]]:
         file_key: str = self._relativize_filepath_to_key(file)
         if file_key not in self.table:
             return None
-        enclosing_funcs: List[CoveredFunction] = []
-        for func in self.table[file_key]:
-            if func.start <= line <= func.end:
-                enclosing_funcs.append(func)
-        return enclosing_funcs
+        return self._get_line_index(file_key).find_functions(line=line)
+
+    def find_functions_by_lines(
+        self, file: Path, lines: Iterable[int]
+    ) -> Optional[Dict[int, List[CoveredFunction]]]:
+        """
+        Resolves the enclosing functions of all given lines of a file at once.
+        """
+        file_key: str = self._relativize_filepath_to_key(file)
+        if file_key not in self.table:
+            return None
+        return self._get_line_index(file_key).find_functions_by_lines(lines=lines)
 
     def get_function_by_identifier(self, identifier: int) -> CoveredFunction:
         return self.all_functions_ordered_by_id[identifier]
@@ -347,6 +523,14 @@ class FunctionLookupTable(SerializerMixin):
             return functions
         return self.add_functions_for_line(file=file, line=line)
 
+    def find_or_add_functions_for_lines(
+        self, file: Path, lines: Iterable[int]
+    ) -> Dict[int, List[CoveredFunction]]:
+        file_key: str = self._relativize_filepath_to_key(file)
+        if file_key not in self.table:
+            self.add_functions(file=file)
+        return self.find_functions_by_lines(file=file, lines=lines)
+
     def add_functions_for_line(self, file: Path, line: int) -> List[CoveredFunction]:
         file_key: str = self._relativize_filepath_to_key(file)
         if file_key not in self.table:
@@ -360,13 +544,32 @@ class FunctionLookupTable(SerializerMixin):
             )
         return functions
 
+    def _get_parser(self) -> CSourceCodeParser:
+        if self.parser is None:
+            self.parser = CSourceCodeParser(disk_cache=self.disk_cache)
+        return self.parser
+
+    def prefetch_functions(self, files: Iterable[Path]) -> None:
+        """
+        Parses all files that are not yet part of the lookup table with a single ctags process,
+        such that adding their functions afterwards does not spawn a process per file.
+        """
+        self._get_parser().prefetch(
+            files=[
+                file
+                for file in files
+                if self._relativize_filepath_to_key(file) not in self.table
+            ]
+        )
+
     def add_functions(self, file: Path) -> List[CoveredFunction]:
         file_key: str = self._relativize_filepath_to_key(file)
         assert (
             file_key not in self.table
         ), "File key already in function lookup table, should never add functions again"
-        parser = CSourceCodeParser()
-        functions: List[FunctionDefinition] = parser.get_functions(file=file)
+        functions: List[FunctionDefinition] = self._get_parser().get_functions(
+            file=file
+        )
         covered_functions: List[CoveredFunction] = []
 
         for function in functions:
@@ -387,6 +590,8 @@ class FunctionLookupTable(SerializerMixin):
 
         self.table[file_key] = covered_functions.copy()
         self.all_functions_ordered_by_id += covered_functions
+        for func in covered_functions:
+            self._index_function(func)
 
         return covered_functions
 
@@ -394,13 +599,225 @@ class FunctionLookupTable(SerializerMixin):
         return dict_equals(self.table, other.table)
 
 
+class TestTraceIndex(SerializerMixin):
+    """
+    The test trace index is the inverse of a test trace table, mapping entities to the tests that depend on them:
+
+    {
+        1: array("I", [0, 2]),
+        4: array("I", [1, 2]),
+        ...
+    }
+
+    Tests are referenced by their position in `test_ids`.
+    Test cases are additionally grouped by test module (global test setup) and test suite (test suite setup),
+    such that the cost of selecting tests only depends on the number of affected entities.
+    A persisted index carries the fingerprint of the traces it was built from, such that stale indices are detected.
+    """
+
+    def __init__(
+        self,
+        test_ids: Optional[List[str]] = None,
+        entity_to_tests: Optional[Dict[Any, Sequence[int]]] = None,
+        traces_fingerprint: Optional[str] = None,
+        *args,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.test_ids: List[str] = test_ids if test_ids is not None else []
+        self.entity_to_tests: Dict[Any, Sequence[int]] = (
+            entity_to_tests if entity_to_tests is not None else {}
+        )
+        self.traces_fingerprint = traces_fingerprint
+        self.update_test_groups()
+
+    def __getstate__(self):
+        # the test groups are cheap to re-create from the test identifiers, no need to store them
+        state = self.__dict__.copy()
+        del state["all_tests"]
+        del state["module_tests"]
+        del state["suite_tests"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__ = state
+        if "traces_fingerprint" not in state:
+            self.traces_fingerprint = None
+        self.update_test_groups()
+
+    def update_test_groups(self) -> None:
+        self.all_tests: Set[str] = set()
+        # test module -> tests that are affected by the global test setup
+        self.module_tests: Dict[str, List[int]] = {}
+        # test module and suite -> test cases that are affected by the test suite setup
+        self.suite_tests: Dict[str, List[int]] = {}
+        for test_idx, test_id in enumerate(self.test_ids):
+            test_module, test_suite, test_case = from_test_id(test_id)
+            if test_suite is None or test_case is None:
+                continue
+            if test_module == "*" and test_case == "*":
+                self.all_tests.add(test_id)
+                continue
+            if test_suite not in [GLOBAL_TEST_SETUP, "*"] and test_case != "*":
+                self.all_tests.add(test_id)
+            if test_suite == GLOBAL_TEST_SETUP:
+                continue
+            if test_module not in self.module_tests:
+                self.module_tests[test_module] = []
+            self.module_tests[test_module].append(test_idx)
+            if test_case != "*":
+                suite_key: str = f"{test_module}{TEST_ID_SEP}{test_suite}"
+                if suite_key not in self.suite_tests:
+                    self.suite_tests[suite_key] = []
+                self.suite_tests[suite_key].append(test_idx)
+
+    @classmethod
+    def from_table(cls, table: Dict[str, Iterable]) -> "TestTraceIndex":
+        test_ids: List[str] = []
+        entity_to_tests: Dict[Any, array] = {}
+        for test_idx, (test_id, entities) in enumerate(table.items()):
+            test_ids.append(test_id)
+            for entity in entities:
+                if entity not in entity_to_tests:
+                    entity_to_tests[entity] = array(TEST_INDEX_TYPECODE)
+                entity_to_tests[entity].append(test_idx)
+        return cls(test_ids=test_ids, entity_to_tests=entity_to_tests)
+
+    def to_csv(self, file: Path) -> None:
+        """
+        Writes the fingerprint of the traces (if any) as `;;<fingerprint>`, every test in order as `;<test ID>`
+        (such that tests without any entities are kept), and every entity-test pair as `<entity>;<test ID>`.
+        """
+        with file.open("w+") as csv_file:
+            if self.traces_fingerprint is not None:
+                csv_file.write(f"{CSV_SEP}{CSV_SEP}{self.traces_fingerprint}\n")
+            for test_id in self.test_ids:
+                csv_file.write(f"{CSV_SEP}{test_id}\n")
+            for entity, test_indices in self.entity_to_tests.items():
+                for test_idx in test_indices:
+                    csv_file.write(f"{entity}{CSV_SEP}{self.test_ids[test_idx]}\n")
+
+    @classmethod
+    def from_csv(
+        cls, file: Path, entity_type: Callable[[str], Any] = int
+    ) -> "TestTraceIndex":
+        test_ids: Dict[str, int] = {}
+        entity_to_tests: Dict[Any, array] = {}
+        traces_fingerprint: Optional[str] = None
+        with file.open("r") as csv_file:
+            for line in csv_file:
+                fields: List[str] = line.rstrip("\n").split(CSV_SEP)
+                if len(fields) == 3:
+                    traces_fingerprint = fields[2]
+                    continue
+                entity, test_id = fields
+                if test_id not in test_ids:
+                    test_ids[test_id] = len(test_ids)
+                if entity == "":
+                    continue
+                entity = entity_type(entity)
+                if entity not in entity_to_tests:
+                    entity_to_tests[entity] = array(TEST_INDEX_TYPECODE)
+                entity_to_tests[entity].append(test_ids[test_id])
+        return cls(
+            test_ids=list(test_ids.keys()),
+            entity_to_tests=entity_to_tests,
+            traces_fingerprint=traces_fingerprint,
+        )
+
+    def find_affected_tests(self, affected_entity_ids: Set) -> Dict[int, Set]:
+        """
+        Returns the tests (by their index) that directly depend on any of the affected entities,
+        together with the entities they depend on.
+        """
+        affected_tests: Dict[int, Set] = {}
+        for entity in affected_entity_ids:
+            for test_idx in self.entity_to_tests.get(entity, []):
+                if test_idx not in affected_tests:
+                    affected_tests[test_idx] = set()
+                affected_tests[test_idx].add(entity)
+        return affected_tests
+
+    def select_tests(
+        self, affected_entity_ids: Set
+    ) -> Tuple[Set[str], Set[str], Dict[str, List[Any]]]:
+        included_tests: Set[str] = set()
+        selection_causes: Dict[str, List[Any]] = dict()
+        affected_modules: Set[str] = set()
+        affected_suite_setups: Set[int] = set()
+        affected_suites: Set[str] = set()
+        for test_idx, affected_entities in self.find_affected_tests(
+            affected_entity_ids
+        ).items():
+            test_id: str = self.test_ids[test_idx]
+            test_module, test_suite, test_case = from_test_id(test_id)
+            if test_suite is None or test_case is None:
+                continue
+            # For java, we only have test_ids of the format *!!!test_suite_name!!!*,
+            # which makes selection way simpler: we only select test suites that are affected.
+            if test_module == "*" and test_case == "*":
+                included_tests.add(test_id)
+            # For GoogleTest, we have test_ids for global and test suite setup as well.
+            # Here, we need to distinguish and select tests that are directly or indirectly affected.
+            # Global test setup
+            elif test_suite == GLOBAL_TEST_SETUP:
+                affected_modules.add(test_module)
+            # Test suite setup
+            elif test_case == "*":
+                affected_suite_setups.add(test_idx)
+                affected_suites.add(f"{test_module}{TEST_ID_SEP}{test_suite}")
+            # Test case that is directly affected
+            else:
+                included_tests.add(test_id)
+            selection_causes[test_id] = list(affected_entities)
+
+        # Test cases that are affected by global test setup or suite setup
+        indirectly_affected_tests: List[int] = []
+        for test_module in affected_modules:
+            indirectly_affected_tests += [
+                test_idx
+                for test_idx in self.module_tests.get(test_module, [])
+                if test_idx not in affected_suite_setups
+            ]
+        for test_suite in affected_suites:
+            indirectly_affected_tests += self.suite_tests.get(test_suite, [])
+        for test_idx in indirectly_affected_tests:
+            test_id: str = self.test_ids[test_idx]
+            included_tests.add(test_id)
+            # Note that this can lead to empty lists for test cases which are selected
+            # due to global/test suite setup changes
+            if test_id not in selection_causes:
+                selection_causes[test_id] = []
+
+        excluded_tests: Set[str] = self.all_tests - included_tests
+        return included_tests, excluded_tests, selection_causes
+
+
 class AbstractTestTrace(ABC, SerializerMixin):
-    def __init__(self, table: Optional[Dict[str, Set]] = None, *args, **kwargs) -> None:
+    def __init__(
+        self,
+        table: Optional[Dict[str, Set]] = None,
+        index: Optional[TestTraceIndex] = None,
+        *args,
+        **kwargs,
+    ) -> None:
         super().__init__(*args, **kwargs)
         if table is not None:
             self.table: Dict[str, Set] = table
         else:
             self.table: Dict[str, Set] = {}
+        self.index: Optional[TestTraceIndex] = index
+
+    def __getstate__(self):
+        # the index is stored separately (if at all), as it would double the size of the traces
+        state = self.__dict__.copy()
+        state["index"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__ = state
+        if "index" not in state:
+            self.index = None
 
     def __eq__(self, other) -> bool:
         return dict_equals(self.table, other.table)
@@ -414,66 +831,23 @@ class AbstractTestTrace(ABC, SerializerMixin):
     def from_csv(cls, file: Path, **kwargs):
         pass
 
+    def remove_test(self, test_id: str) -> None:
+        if test_id in self.table:
+            del self.table[test_id]
+            self.index = None
+
+    def get_index(self) -> TestTraceIndex:
+        """
+        Returns the inverted index of the test traces, which is built on first use if it has not been loaded.
+        """
+        if self.index is None:
+            self.index = TestTraceIndex.from_table(self.table)
+        return self.index
+
     def select_tests(
         self, affected_entity_ids: Set
     ) -> Tuple[Set[str], Set[str], Dict[str, List[Any]]]:
-        all_tests: Set[str] = set()
-        included_tests: Set[str] = set()
-        last_found_affected_module: str = ""
-        last_found_affected_suite: str = ""
-        selection_causes: Dict[str, List[Any]] = dict()
-        for test_id in sorted(
-            self.table.keys(),
-            key=lambda t: t.replace(GLOBAL_TEST_SETUP, "*"),
-        ):
-            entities: Set = self.table[test_id]
-            test_module, test_suite, test_case = from_test_id(test_id)
-            if test_suite is not None and test_case is not None:
-                if test_suite not in [GLOBAL_TEST_SETUP, "*"] and test_case != "*":
-                    all_tests.add(test_id)
-                affected_entities = affected_entity_ids & entities
-                is_affected = len(affected_entities) > 0
-
-                # For java, we only have test_ids of the format *!!!test_suite_name!!!*,
-                # which makes selection way simpler: we only select test suites that are affected.
-                if test_module == "*" and test_case == "*":
-                    if is_affected:
-                        included_tests.add(test_id)
-                        selection_causes[test_id] = list(affected_entities)
-                    all_tests.add(test_id)
-                    continue
-
-                # For GoogleTest, we have test_ids for global and test suite setup as well.
-                # Here, we need to distinguish and select tests that are directly or indirectly affected.
-                # Global test setup
-                if is_affected and test_suite == GLOBAL_TEST_SETUP:
-                    last_found_affected_module = test_module
-                # Test suite setup
-                elif is_affected and test_case == "*":
-                    last_found_affected_suite = (
-                        f"{test_module}{TEST_ID_SEP}{test_suite}"
-                    )
-                # Test case that is either
-                # (1) directly affected
-                # (2) affected by global test setup
-                # (3) affected by suite setup
-                elif (
-                    is_affected
-                    or (test_module == last_found_affected_module)
-                    or (
-                        f"{test_module}{TEST_ID_SEP}{test_suite}"
-                        == last_found_affected_suite
-                    )
-                ):
-                    included_tests.add(test_id)
-                else:
-                    continue
-                # Note that this can lead to empty lists for test cases which are selected
-                # due to global/test suite setup changes
-                selection_causes[test_id] = list(affected_entities)
-
-        excluded_tests: Set[str] = all_tests - included_tests
-        return included_tests, excluded_tests, selection_causes
+        return self.get_index().select_tests(affected_entity_ids=affected_entity_ids)
 
 
 class TestFileTraces(AbstractTestTrace):
@@ -535,6 +909,7 @@ class TestFileTraces(AbstractTestTrace):
         )
         if test_id not in self.table:
             self.table[test_id] = set()
+        self.index = None
         for file in coverage.covered_files:
             self.table[test_id].add(file.name.__str__().lower())
 
@@ -631,6 +1006,61 @@ class TestFunctionTraces(AbstractTestTrace):
             self.table[test_id] = set()
         if function.identifier not in self.table[test_id]:
             self.table[test_id].add(function.identifier)
+            self.index = None
+
+
+class CompactTestFunctionTraces(TestFunctionTraces):
+    """
+    The compact test function traces store the function IDs of each test as a sorted array of
+    unsigned integers rather than a set of Python integers, which reduces memory consumption and
+    (un-)pickling time by about an order of magnitude for large traces:
+
+    {
+        "testmodule": array("I", [1, 4]),
+        "testmodule!!TestSuite": array("I", [4]),
+        "testmodule!!TestSuite!!TestCase": array("I", [1, 2, 3, 4]),
+        ...
+    }
+    """
+
+    def __init__(
+        self, table: Optional[Dict[str, Iterable[int]]] = None, *args, **kwargs
+    ) -> None:
+        if table is not None:
+            table = {
+                test_id: self.to_array(function_ids)
+                for test_id, function_ids in table.items()
+            }
+        super().__init__(table, *args, **kwargs)
+
+    @classmethod
+    def to_array(cls, function_ids: Iterable[int]) -> array:
+        if isinstance(function_ids, array):
+            return function_ids
+        return array(FUNCTION_ID_TYPECODE, sorted(set(function_ids)))
+
+    @classmethod
+    def from_test_function_traces(
+        cls, test_function_traces: TestFunctionTraces
+    ) -> "CompactTestFunctionTraces":
+        return cls(table=test_function_traces.table, index=test_function_traces.index)
+
+    def add_test_function_dependency(
+        self,
+        test_module: str,
+        test_suite: str,
+        function: CoveredFunction,
+        test_case: str = "",
+    ) -> None:
+        test_id: str = get_test_id(test_module, test_suite, test_case)
+        if test_id not in self.table:
+            self.table[test_id] = array(FUNCTION_ID_TYPECODE)
+        function_ids: array = self.table[test_id]
+        # keep the array sorted, such that lookups can be done via binary search
+        pos: int = bisect_left(function_ids, function.identifier)
+        if pos == len(function_ids) or function_ids[pos] != function.identifier:
+            function_ids.insert(pos, function.identifier)
+            self.index = None
 
 
 class CoverageParser:
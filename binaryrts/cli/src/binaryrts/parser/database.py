@@ -0,0 +1,549 @@
+"""
+Module containing a SQLite-backed store for function lookup tables and test traces.
+
+Instead of loading all functions and traces into Python dictionaries first, queries like `find_functions`,
+`find_functions_by_file_regex`, or the join between affected functions and tests during selection
+are pushed down into indexed SQL queries.
+A single database file holds the functions, the tests, and the edges between both.
+"""
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+    Dict,
+    Set,
+    Any,
+    Iterator,
+    Mapping,
+    Sequence,
+    Tuple,
+    Pattern,
+    Union,
+    Iterable,
+)
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TestFileTraces,
+    TestTraceIndex,
+    AbstractTestTrace,
+)
+from binaryrts.parser.sourcecode import PROTOTYPE_PREFIX
+from binaryrts.util.string import remove_prefix
+
+SQLITE_FUNCTION_TRACES_FILE: str = "function-traces.db"
+SQLITE_FILE_TRACES_FILE: str = "file-traces.db"
+
+SCHEMA_VERSION: int = 1
+# stay well below SQLite's limit of host parameters per statement
+MAX_QUERY_PARAMETERS: int = 500
+
+FUNCTIONS_TABLE: str = "functions"
+TESTS_TABLE: str = "tests"
+TEST_FUNCTIONS_TABLE: str = "test_functions"
+TEST_FILES_TABLE: str = "test_files"
+
+SCHEMA: List[str] = [
+    f"CREATE TABLE IF NOT EXISTS {FUNCTIONS_TABLE} ("
+    "id INTEGER PRIMARY KEY, file TEXT NOT NULL, signature TEXT NOT NULL, start_line INTEGER NOT NULL, "
+    "end_line INTEGER NOT NULL, properties TEXT, namespace TEXT, class_name TEXT)",
+    f"CREATE TABLE IF NOT EXISTS {TESTS_TABLE} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+    f"CREATE TABLE IF NOT EXISTS {TEST_FUNCTIONS_TABLE} ("
+    "function_id INTEGER NOT NULL, test_id INTEGER NOT NULL, PRIMARY KEY (function_id, test_id)) WITHOUT ROWID",
+    f"CREATE TABLE IF NOT EXISTS {TEST_FILES_TABLE} ("
+    "file TEXT NOT NULL, test_id INTEGER NOT NULL, PRIMARY KEY (file, test_id)) WITHOUT ROWID",
+]
+INDICES: Dict[str, List[str]] = {
+    FUNCTIONS_TABLE: [
+        f"CREATE INDEX IF NOT EXISTS functions_file ON {FUNCTIONS_TABLE} (file, start_line, end_line)",
+        f"CREATE INDEX IF NOT EXISTS functions_signature ON {FUNCTIONS_TABLE} (signature)",
+        f"CREATE INDEX IF NOT EXISTS functions_namespace ON {FUNCTIONS_TABLE} (namespace)",
+        f"CREATE INDEX IF NOT EXISTS functions_class_name ON {FUNCTIONS_TABLE} (class_name)",
+    ],
+    TEST_FUNCTIONS_TABLE: [
+        f"CREATE INDEX IF NOT EXISTS test_functions_test ON {TEST_FUNCTIONS_TABLE} (test_id)",
+    ],
+    TEST_FILES_TABLE: [
+        f"CREATE INDEX IF NOT EXISTS test_files_test ON {TEST_FILES_TABLE} (test_id)",
+    ],
+}
+
+FUNCTION_COLUMNS: str = (
+    "id, file, signature, start_line, end_line, properties, namespace, class_name"
+)
+
+
+def _chunks(items: List[Any], size: int = MAX_QUERY_PARAMETERS) -> Iterator[List[Any]]:
+    for idx in range(0, len(items), size):
+        yield items[idx : idx + size]
+
+
+def _to_function(row: Tuple) -> CoveredFunction:
+    identifier, file, signature, start, end, properties, namespace, class_name = row
+    return CoveredFunction(
+        identifier=identifier,
+        file=file,
+        signature=signature,
+        start=start,
+        end=end,
+        properties=properties,
+        namespace=namespace,
+        class_name=class_name,
+    )
+
+
+class SQLiteConnection:
+    """
+    Read-only connection to a trace database, which can be shared between the threads of a selection.
+    Processes forked from the owning process open their own connection on first use.
+    """
+
+    def __init__(self, filepath: Path) -> None:
+        self.filepath = filepath
+        self._connect()
+        version: int = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            raise Exception(
+                f"Database {filepath} has unsupported schema version {version}, expected {SCHEMA_VERSION}."
+            )
+
+    def _connect(self) -> None:
+        # the process that opened the connection, as forked children must neither share it nor its lock
+        self.pid: int = os.getpid()
+        self.connection: sqlite3.Connection = sqlite3.connect(
+            f"{self.filepath.as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+        self.connection.create_function("REGEXP", 2, _regexp)
+        self.lock: threading.Lock = threading.Lock()
+
+    def query(self, sql: str, parameters: Sequence[Any] = ()) -> List[Tuple]:
+        if self.pid != os.getpid():
+            self._connect()
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+
+_REGEX_CACHE: Dict[str, Pattern] = {}
+
+
+def _regexp(pattern: str, value: str) -> bool:
+    # mirrors `re.match` (anchored at the beginning) as used by the in-memory lookup table
+    if pattern not in _REGEX_CACHE:
+        _REGEX_CACHE[pattern] = re.compile(pattern, re.IGNORECASE)
+    return _REGEX_CACHE[pattern].match(value) is not None
+
+
+class _SQLiteFunctions(Sequence):
+    def __init__(self, db: SQLiteConnection) -> None:
+        self.db = db
+
+    def __len__(self) -> int:
+        return self.db.query(f"SELECT COUNT(*) FROM {FUNCTIONS_TABLE}")[0][0]
+
+    def __getitem__(
+        self, identifier: Union[int, slice]
+    ) -> Union[CoveredFunction, List[CoveredFunction]]:
+        if isinstance(identifier, slice):
+            return list(self)[identifier]
+        rows: List[Tuple] = self.db.query(
+            f"SELECT {FUNCTION_COLUMNS} FROM {FUNCTIONS_TABLE} WHERE id = ?",
+            (identifier,),
+        )
+        if len(rows) == 0:
+            raise IndexError(identifier)
+        return _to_function(rows[0])
+
+    def __iter__(self) -> Iterator[CoveredFunction]:
+        for row in self.db.query(
+            f"SELECT {FUNCTION_COLUMNS} FROM {FUNCTIONS_TABLE} ORDER BY id"
+        ):
+            yield _to_function(row)
+
+
+class _SQLiteFileTable(Mapping):
+    def __init__(self, db: SQLiteConnection) -> None:
+        self.db = db
+
+    def __getitem__(self, file: str) -> List[CoveredFunction]:
+        functions: List[CoveredFunction] = [
+            _to_function(row)
+            for row in self.db.query(
+                f"SELECT {FUNCTION_COLUMNS} FROM {FUNCTIONS_TABLE} WHERE file = ? ORDER BY id",
+                (file,),
+            )
+        ]
+        if len(functions) == 0:
+            raise KeyError(file)
+        return functions
+
+    def __contains__(self, file: object) -> bool:
+        return (
+            len(
+                self.db.query(
+                    f"SELECT 1 FROM {FUNCTIONS_TABLE} WHERE file = ? LIMIT 1", (file,)
+                )
+            )
+            > 0
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        for (file,) in self.db.query(
+            f"SELECT file FROM {FUNCTIONS_TABLE} GROUP BY file ORDER BY MIN(id)"
+        ):
+            yield file
+
+    def __len__(self) -> int:
+        return self.db.query(
+            f"SELECT COUNT(DISTINCT file) FROM {FUNCTIONS_TABLE}"
+        )[0][0]
+
+
+class SQLiteFunctionLookupTable(FunctionLookupTable):
+    """
+    Read-only function lookup table backed by a SQLite database, which answers all queries via indexed SQL.
+    """
+
+    def __init__(self, filepath: Path, root_dir: Optional[Path] = None) -> None:
+        # we deliberately skip the initialization of the base class, which would load all functions
+        self.db: SQLiteConnection = SQLiteConnection(filepath=filepath)
+        self.root_dir = root_dir
+        # attributes of the base class for parsing added files, although read-only tables never add any
+        self.disk_cache = None
+        self.parser = None
+        self.table: Mapping[str, List[CoveredFunction]] = _SQLiteFileTable(db=self.db)
+        self.all_functions_ordered_by_id: Sequence[CoveredFunction] = _SQLiteFunctions(
+            db=self.db
+        )
+        self.function_cache: Dict[str, List[CoveredFunction]] = {}
+        self.namespace_index = None
+        self.class_name_index = None
+        self.line_index = {}
+        self.max_id = self.db.query(
+            f"SELECT COALESCE(MAX(id) + 1, 0) FROM {FUNCTIONS_TABLE}"
+        )[0][0]
+
+    def __getstate__(self):
+        raise Exception(
+            "SQLite-backed function lookup tables cannot be pickled, use `to_csv` or convert it first."
+        )
+
+    def update_function_cache(self):
+        pass
+
+    def add_functions(self, file: Path) -> List[CoveredFunction]:
+        raise Exception(
+            f"SQLite-backed function lookup tables are read-only, cannot add functions for {file}."
+        )
+
+    def _query_functions(
+        self, conditions: List[str], parameters: List[Any]
+    ) -> List[CoveredFunction]:
+        where: str = f" WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+        return [
+            _to_function(row)
+            for row in self.db.query(
+                f"SELECT {FUNCTION_COLUMNS} FROM {FUNCTIONS_TABLE}{where} ORDER BY id",
+                parameters,
+            )
+        ]
+
+    def find_functions_by_file_regex(self, file_regex: str) -> List[CoveredFunction]:
+        return self._query_functions(
+            conditions=[
+                f"file IN (SELECT DISTINCT file FROM {FUNCTIONS_TABLE} WHERE REGEXP(?, file))"
+            ],
+            parameters=[file_regex],
+        )
+
+    def find_functions(
+        self,
+        file: Optional[Path] = None,
+        signature: Optional[str] = None,
+        namespace: Optional[str] = None,
+        class_name: Optional[str] = None,
+    ) -> List[CoveredFunction]:
+        conditions: List[str] = []
+        parameters: List[Any] = []
+        # make sure we query by the correct function name, not an intermediate prototype name
+        if signature is not None and signature.startswith(PROTOTYPE_PREFIX):
+            signature = remove_prefix(string=signature, prefix=PROTOTYPE_PREFIX)
+        if file is not None:
+            conditions.append("file = ?")
+            parameters.append(self._relativize_filepath_to_key(filepath=file))
+        if signature is not None and signature.endswith("*"):
+            # in the case of a wildcard, we strip the wildcard character and match by substring
+            conditions.append("instr(signature, ?) > 0")
+            parameters.append(signature[:-1])
+        elif signature is not None:
+            conditions.append("signature = ?")
+            parameters.append(signature)
+        for column, value in [("namespace", namespace), ("class_name", class_name)]:
+            if value is None:
+                continue
+            if value == "*":
+                conditions.append(f"{column} IS NOT NULL")
+            elif value == "":
+                conditions.append(f"{column} IS NULL")
+            else:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        return self._query_functions(conditions=conditions, parameters=parameters)
+
+    def find_functions_by_line(
+        self, file: Path, line: int
+    ) -> Optional[List[CoveredFunction]]:
+        file_key: str = self._relativize_filepath_to_key(file)
+        if file_key not in self.table:
+            return None
+        return self._query_functions(
+            conditions=["file = ?", "start_line <= ?", "end_line >= ?"],
+            parameters=[file_key, line, line],
+        )
+
+    def get_function_by_identifier(self, identifier: int) -> CoveredFunction:
+        return self.all_functions_ordered_by_id[identifier]
+
+
+class SQLiteTraceIndex(TestTraceIndex):
+    """
+    Test trace index, which resolves the tests of affected entities via the indexed edge table of the database.
+    Tests are referenced by their (0-indexed) ID in the tests table.
+    """
+
+    def __init__(
+        self, db: SQLiteConnection, edge_table: str, entity_column: str
+    ) -> None:
+        self.db = db
+        self.edge_table = edge_table
+        self.entity_column = entity_column
+        super().__init__(
+            test_ids=[
+                name
+                for (name,) in db.query(f"SELECT name FROM {TESTS_TABLE} ORDER BY id")
+            ]
+        )
+
+    def __getstate__(self):
+        raise Exception("SQLite-backed test trace indices cannot be pickled.")
+
+    def find_affected_tests(self, affected_entity_ids: Set) -> Dict[int, Set]:
+        affected_tests: Dict[int, Set] = {}
+        for chunk in _chunks(list(affected_entity_ids)):
+            for entity, test_idx in self.db.query(
+                f"SELECT {self.entity_column}, test_id FROM {self.edge_table} "
+                f"WHERE {self.entity_column} IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ):
+                if test_idx not in affected_tests:
+                    affected_tests[test_idx] = set()
+                affected_tests[test_idx].add(entity)
+        return affected_tests
+
+
+class _SQLiteTraceTable(Mapping):
+    def __init__(
+        self, db: SQLiteConnection, edge_table: str, entity_column: str
+    ) -> None:
+        self.db = db
+        self.edge_table = edge_table
+        self.entity_column = entity_column
+
+    def __getitem__(self, test_id: str) -> Set:
+        rows: List[Tuple] = self.db.query(
+            f"SELECT id FROM {TESTS_TABLE} WHERE name = ?", (test_id,)
+        )
+        if len(rows) == 0:
+            raise KeyError(test_id)
+        return {
+            entity
+            for (entity,) in self.db.query(
+                f"SELECT {self.entity_column} FROM {self.edge_table} WHERE test_id = ?",
+                (rows[0][0],),
+            )
+        }
+
+    def __contains__(self, test_id: object) -> bool:
+        return (
+            len(
+                self.db.query(f"SELECT 1 FROM {TESTS_TABLE} WHERE name = ?", (test_id,))
+            )
+            > 0
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        for (name,) in self.db.query(f"SELECT name FROM {TESTS_TABLE} ORDER BY id"):
+            yield name
+
+    def __len__(self) -> int:
+        return self.db.query(f"SELECT COUNT(*) FROM {TESTS_TABLE}")[0][0]
+
+
+class _SQLiteTracesMixin(AbstractTestTrace):
+    EDGE_TABLE: str
+    ENTITY_COLUMN: str
+
+    def _init_from_database(self, filepath: Path) -> None:
+        self.db: SQLiteConnection = SQLiteConnection(filepath=filepath)
+        self.table = _SQLiteTraceTable(
+            db=self.db, edge_table=self.EDGE_TABLE, entity_column=self.ENTITY_COLUMN
+        )
+        self.index = None
+
+    def __getstate__(self):
+        raise Exception(
+            "SQLite-backed test traces cannot be pickled, use `to_csv` or convert them first."
+        )
+
+    def get_index(self) -> TestTraceIndex:
+        if self.index is None:
+            self.index = SQLiteTraceIndex(
+                db=self.db, edge_table=self.EDGE_TABLE, entity_column=self.ENTITY_COLUMN
+            )
+        return self.index
+
+    def remove_test(self, test_id: str) -> None:
+        raise Exception(
+            f"SQLite-backed test traces are read-only, cannot remove {test_id}."
+        )
+
+
+class SQLiteTestFunctionTraces(_SQLiteTracesMixin, TestFunctionTraces):
+    """
+    Read-only test function traces backed by a SQLite database.
+    """
+
+    EDGE_TABLE: str = TEST_FUNCTIONS_TABLE
+    ENTITY_COLUMN: str = "function_id"
+
+    def __init__(self, filepath: Path) -> None:
+        self._init_from_database(filepath=filepath)
+
+    def add_test_function_dependency(self, *args, **kwargs) -> None:
+        raise Exception("SQLite-backed test function traces are read-only.")
+
+
+class SQLiteTestFileTraces(_SQLiteTracesMixin, TestFileTraces):
+    """
+    Read-only test file traces backed by a SQLite database.
+    """
+
+    EDGE_TABLE: str = TEST_FILES_TABLE
+    ENTITY_COLUMN: str = "file"
+
+    def __init__(self, filepath: Path, root_dir: Optional[Path] = None) -> None:
+        self._init_from_database(filepath=filepath)
+        self.root_dir = root_dir
+
+    def add_coverage(self, *args, **kwargs) -> None:
+        raise Exception("SQLite-backed test file traces are read-only.")
+
+
+def _open_for_writing(filepath: Path) -> sqlite3.Connection:
+    connection: sqlite3.Connection = sqlite3.connect(filepath)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return connection
+
+
+def _create_indices(connection: sqlite3.Connection, table: str) -> None:
+    # indices are created after bulk insertion, which is considerably faster than maintaining them on every insert
+    for statement in INDICES.get(table, []):
+        connection.execute(statement)
+
+
+def save_function_lookup_table(
+    filepath: Path, function_lookup_table: FunctionLookupTable
+) -> None:
+    connection: sqlite3.Connection = _open_for_writing(filepath)
+    try:
+        with connection:
+            connection.execute(f"DELETE FROM {FUNCTIONS_TABLE}")
+            connection.executemany(
+                f"INSERT INTO {FUNCTIONS_TABLE} ({FUNCTION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        function.identifier,
+                        file_key,
+                        function.signature,
+                        function.start,
+                        function.end,
+                        function.properties,
+                        function.namespace,
+                        function.class_name,
+                    )
+                    for file_key, functions in function_lookup_table.table.items()
+                    for function in functions
+                ),
+            )
+            _create_indices(connection, FUNCTIONS_TABLE)
+    finally:
+        connection.close()
+
+
+def _save_traces(
+    filepath: Path, table: Mapping[str, Iterable], edge_table: str, entity_column: str
+) -> None:
+    connection: sqlite3.Connection = _open_for_writing(filepath)
+    try:
+        with connection:
+            connection.execute(f"DELETE FROM {edge_table}")
+            connection.execute(f"DELETE FROM {TESTS_TABLE}")
+            test_ids: List[str] = list(table.keys())
+            connection.executemany(
+                f"INSERT INTO {TESTS_TABLE} (id, name) VALUES (?, ?)",
+                enumerate(test_ids),
+            )
+            connection.executemany(
+                f"INSERT INTO {edge_table} ({entity_column}, test_id) VALUES (?, ?)",
+                (
+                    (entity, test_idx)
+                    for test_idx, test_id in enumerate(test_ids)
+                    for entity in set(table[test_id])
+                ),
+            )
+            _create_indices(connection, edge_table)
+    finally:
+        connection.close()
+
+
+def save_test_function_traces(
+    filepath: Path, test_function_traces: TestFunctionTraces
+) -> None:
+    _save_traces(
+        filepath=filepath,
+        table=test_function_traces.table,
+        edge_table=TEST_FUNCTIONS_TABLE,
+        entity_column="function_id",
+    )
+
+
+def save_test_file_traces(filepath: Path, test_file_traces: TestFileTraces) -> None:
+    _save_traces(
+        filepath=filepath,
+        table=test_file_traces.table,
+        edge_table=TEST_FILES_TABLE,
+        entity_column="file",
+    )
+
+
+def read_function_lookup_table(
+    filepath: Path, root_dir: Optional[Path] = None
+) -> SQLiteFunctionLookupTable:
+    return SQLiteFunctionLookupTable(filepath=filepath, root_dir=root_dir)
+
+
+def read_test_function_traces(filepath: Path) -> SQLiteTestFunctionTraces:
+    return SQLiteTestFunctionTraces(filepath=filepath)
+
+
+def read_test_file_traces(
+    filepath: Path, root_dir: Optional[Path] = None
+) -> SQLiteTestFileTraces:
+    return SQLiteTestFileTraces(filepath=filepath, root_dir=root_dir)
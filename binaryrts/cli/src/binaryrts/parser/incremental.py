@@ -0,0 +1,123 @@
+"""
+Module containing the incremental update of function lookup tables and test traces from a previous conversion.
+
+Functions of unchanged files are taken over from the previous lookup table, while changed files are parsed again.
+Function identifiers are re-assigned consecutively in the order of the previous lookup table,
+such that they are stable if nothing changed, and the previous test traces are remapped accordingly.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    FunctionLookupTable,
+    TestFunctionTraces,
+)
+from binaryrts.util.cache import DiskCache
+
+FunctionKey = Tuple[str, Optional[str], Optional[str]]
+
+
+def _get_function_key(function: CoveredFunction) -> FunctionKey:
+    return function.signature, function.namespace, function.class_name
+
+
+def update_function_lookup_table(
+    previous_function_lookup_table: FunctionLookupTable,
+    changed_files: Set[Path],
+    root_dir: Path,
+    disk_cache: Optional[DiskCache] = None,
+) -> Tuple[FunctionLookupTable, Dict[int, int]]:
+    """
+    Creates a new function lookup table from a previous one, re-parsing only the changed files.
+    Returns the new lookup table along with a mapping of previous to new function identifiers.
+    Functions of changed files are mapped by their signature, namespace, and class name;
+    functions that do not exist anymore have no mapping.
+    """
+    function_lookup_table: FunctionLookupTable = FunctionLookupTable(
+        root_dir=root_dir, disk_cache=disk_cache
+    )
+    id_mapping: Dict[int, int] = {}
+    # file keys are either relative to the root directory or absolute
+    changed_filepaths: Set[Path] = {root_dir / file for file in changed_files}
+    n_reparsed_files: int = 0
+    # changed files of the previous lookup table are parsed at once
+    function_lookup_table.prefetch_functions(
+        files=[
+            root_dir / file_key
+            for file_key in previous_function_lookup_table.table.keys()
+            if root_dir / file_key in changed_filepaths
+        ]
+    )
+
+    for file_key, previous_functions in previous_function_lookup_table.table.items():
+        file: Path = root_dir / file_key
+        if file not in changed_filepaths:
+            functions: List[CoveredFunction] = []
+            for previous_function in previous_functions:
+                function: CoveredFunction = CoveredFunction(
+                    identifier=function_lookup_table.max_id,
+                    file=file_key,
+                    signature=previous_function.signature,
+                    start=previous_function.start,
+                    end=previous_function.end,
+                    properties=previous_function.properties,
+                    namespace=previous_function.namespace,
+                    class_name=previous_function.class_name,
+                )
+                id_mapping[previous_function.identifier] = function.identifier
+                function_lookup_table.max_id += 1
+                functions.append(function)
+            function_lookup_table.table[file_key] = functions
+            function_lookup_table.all_functions_ordered_by_id += functions
+            for function in functions:
+                function_lookup_table._index_function(function)
+            continue
+
+        if not file.exists():
+            logging.debug(f"Dropping functions of deleted file {file_key}")
+            continue
+        try:
+            new_functions: List[CoveredFunction] = function_lookup_table.add_functions(
+                file=file
+            )
+        except Exception as e:
+            logging.warning(f"{e}: Failed to re-parse functions of {file}")
+            continue
+        n_reparsed_files += 1
+        new_functions_by_key: Dict[FunctionKey, List[CoveredFunction]] = {}
+        for function in new_functions:
+            new_functions_by_key.setdefault(_get_function_key(function), []).append(
+                function
+            )
+        for previous_function in previous_functions:
+            candidates: List[CoveredFunction] = new_functions_by_key.get(
+                _get_function_key(previous_function), []
+            )
+            if len(candidates) > 0:
+                id_mapping[previous_function.identifier] = candidates.pop(0).identifier
+
+    logging.info(
+        f"Took over {len(id_mapping)} functions from previous lookup table, "
+        f"re-parsed {n_reparsed_files} of {len(changed_filepaths)} changed files."
+    )
+    return function_lookup_table, id_mapping
+
+
+def remap_test_function_traces(
+    previous_test_function_traces: TestFunctionTraces, id_mapping: Dict[int, int]
+) -> TestFunctionTraces:
+    """
+    Remaps the function identifiers of previous test traces, dropping functions without mapping.
+    """
+    return TestFunctionTraces(
+        table={
+            test_id: {
+                id_mapping[function_id]
+                for function_id in function_ids
+                if function_id in id_mapping
+            }
+            for test_id, function_ids in previous_test_function_traces.table.items()
+        }
+    )
@@ -0,0 +1,563 @@
+"""
+Module containing a versioned, memory-mappable binary format for function lookup tables and test function traces.
+
+In contrast to pickled or CSV files, which need to be deserialized entirely before any query can be answered,
+files in this format are mapped into memory and only the parts required for a query are decoded.
+This keeps start-up latency of test selection independent of the trace size and lets concurrent selections
+on the same machine share the operating system's page cache.
+
+Each file consists of a header, followed by a list of sections:
+
+    magic (8 bytes) | version (u32) | number of sections (u32) | (offset (u64), length (u64)) * sections | sections
+
+All integers are stored in little-endian byte order, sections are aligned to 8 bytes.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+    Dict,
+    Iterator,
+    Mapping,
+    Sequence,
+    Tuple,
+    Union,
+    Callable,
+    Any,
+)
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TestTraceIndex,
+)
+
+BINARY_FUNCTION_LOOKUP_FILE: str = "function-lookup.bin"
+BINARY_TEST_FUNCTION_TRACES_FILE: str = "test-function-traces.bin"
+
+FORMAT_VERSION: int = 1
+FUNCTION_LOOKUP_MAGIC: bytes = b"BRTSFLT\x00"
+TEST_FUNCTION_TRACES_MAGIC: bytes = b"BRTSTFT\x00"
+
+HEADER_FORMAT: str = "<8sII"
+SECTION_FORMAT: str = "<QQ"
+SECTION_ALIGNMENT: int = 8
+NO_STRING: int = 0xFFFFFFFF
+
+# function lookup table sections
+LOOKUP_STRING_OFFSETS: int = 0  # u64[n_strings + 1]
+LOOKUP_STRINGS: int = 1  # utf-8 encoded strings
+LOOKUP_FUNCTIONS: int = 2  # u32[n_functions * 7] (file, signature, start, end, properties, namespace, class)
+LOOKUP_FILES: int = 3  # u32[n_files * 3] (file, first position in file functions, number of functions)
+LOOKUP_FILE_FUNCTIONS: int = 4  # u32[n_functions] function IDs grouped by file
+LOOKUP_SIGNATURE_ORDER: int = 5  # u32[n_functions] function IDs sorted by signature
+FUNCTION_RECORD_SIZE: int = 7
+
+# test function traces sections
+TRACES_STRING_OFFSETS: int = 0  # u64[n_tests + 1]
+TRACES_STRINGS: int = 1  # utf-8 encoded test IDs
+TRACES_TEST_OFFSETS: int = 2  # u64[n_tests + 1]
+TRACES_TEST_FUNCTIONS: int = 3  # u32[n_edges] sorted function IDs per test
+TRACES_FUNCTION_OFFSETS: int = 4  # u64[n_functions + 1]
+TRACES_FUNCTION_TESTS: int = 5  # u32[n_edges] test indices per function (inverted index)
+
+
+def _check_byte_order() -> None:
+    if sys.byteorder != "little":
+        raise Exception(
+            "Memory-mapped trace files are only supported on little-endian platforms."
+        )
+
+
+def _write_sections(filepath: Path, magic: bytes, sections: List[bytes]) -> None:
+    _check_byte_order()
+    header_size: int = struct.calcsize(HEADER_FORMAT) + len(sections) * struct.calcsize(
+        SECTION_FORMAT
+    )
+    offsets: List[Tuple[int, int]] = []
+    offset: int = header_size
+    for section in sections:
+        offset += -offset % SECTION_ALIGNMENT
+        offsets.append((offset, len(section)))
+        offset += len(section)
+    with filepath.open("wb+") as fp:
+        fp.write(struct.pack(HEADER_FORMAT, magic, FORMAT_VERSION, len(sections)))
+        for section_offset, section_length in offsets:
+            fp.write(struct.pack(SECTION_FORMAT, section_offset, section_length))
+        for (section_offset, _), section in zip(offsets, sections):
+            fp.write(b"\x00" * (section_offset - fp.tell()))
+            fp.write(section)
+
+
+def _encode_strings(strings: List[str]) -> Tuple[bytes, bytes]:
+    offsets: array = array("Q", [0])
+    encoded: List[bytes] = []
+    for string in strings:
+        encoded_string: bytes = string.encode("utf-8")
+        encoded.append(encoded_string)
+        offsets.append(offsets[-1] + len(encoded_string))
+    return offsets.tobytes(), b"".join(encoded)
+
+
+class MappedFile:
+    """
+    Read-only memory mapping of a file in the binary format, giving access to its sections.
+    """
+
+    def __init__(self, filepath: Path, magic: bytes) -> None:
+        _check_byte_order()
+        self.filepath = filepath
+        with filepath.open("rb") as fp:
+            self.mm: mmap.mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, version, n_sections = struct.unpack_from(HEADER_FORMAT, self.mm, 0)
+        if file_magic != magic:
+            raise Exception(f"File {filepath} is not a valid memory-mapped trace file.")
+        if version != FORMAT_VERSION:
+            raise Exception(
+                f"File {filepath} has unsupported format version {version}, expected {FORMAT_VERSION}."
+            )
+        self.sections: List[Tuple[int, int]] = [
+            struct.unpack_from(
+                SECTION_FORMAT,
+                self.mm,
+                struct.calcsize(HEADER_FORMAT) + idx * struct.calcsize(SECTION_FORMAT),
+            )
+            for idx in range(n_sections)
+        ]
+
+    def section(self, idx: int, fmt: str = "B") -> memoryview:
+        offset, length = self.sections[idx]
+        view: memoryview = memoryview(self.mm)[offset : offset + length]
+        return view.cast(fmt) if fmt != "B" else view
+
+
+class MappedStrings(Sequence):
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0 or idx >= len(self):
+            raise IndexError(idx)
+        return bytes(self.data[self.offsets[idx] : self.offsets[idx + 1]]).decode(
+            "utf-8"
+        )
+
+
+class _LazySortedMapping(Mapping):
+    """
+    Mapping that resolves keys via binary search over `n` sorted keys, decoding only the visited keys.
+    """
+
+    def __init__(
+        self, n: int, key_at: Callable[[int], str], value_at: Callable[[int], Any]
+    ) -> None:
+        self.n = n
+        self.key_at = key_at
+        self.value_at = value_at
+        self.cache: Dict[str, Any] = {}
+
+    def _find(self, key: str) -> int:
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n and self.key_at(lo) == key:
+            return lo
+        return -1
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.cache:
+            return self.cache[key]
+        idx: int = self._find(key) if isinstance(key, str) else -1
+        if idx < 0:
+            raise KeyError(key)
+        value = self.value_at(idx)
+        self.cache[key] = value
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.cache or (isinstance(key, str) and self._find(key) >= 0)
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(self.n):
+            yield self.key_at(idx)
+
+    def __len__(self) -> int:
+        return self.n
+
+
+class MappedFunctions(Sequence):
+    def __init__(self, records: memoryview, strings: MappedStrings) -> None:
+        self.records = records
+        self.strings = strings
+        self.cache: Dict[int, CoveredFunction] = {}
+
+    def __len__(self) -> int:
+        return len(self.records) // FUNCTION_RECORD_SIZE
+
+    def _get_string(self, idx: int) -> Optional[str]:
+        return None if idx == NO_STRING else self.strings[idx]
+
+    def __getitem__(
+        self, identifier: Union[int, slice]
+    ) -> Union[CoveredFunction, List[CoveredFunction]]:
+        if isinstance(identifier, slice):
+            return [self[idx] for idx in range(*identifier.indices(len(self)))]
+        if identifier < 0:
+            identifier += len(self)
+        if identifier < 0 or identifier >= len(self):
+            raise IndexError(identifier)
+        if identifier in self.cache:
+            return self.cache[identifier]
+        (
+            file,
+            signature,
+            start,
+            end,
+            properties,
+            namespace,
+            class_name,
+        ) = self.records[
+            identifier * FUNCTION_RECORD_SIZE : (identifier + 1) * FUNCTION_RECORD_SIZE
+        ]
+        function: CoveredFunction = CoveredFunction(
+            identifier=identifier,
+            file=self.strings[file],
+            signature=self.strings[signature],
+            start=start,
+            end=end,
+            properties=self._get_string(properties),
+            namespace=self._get_string(namespace),
+            class_name=self._get_string(class_name),
+        )
+        self.cache[identifier] = function
+        return function
+
+
+class MappedFunctionLookupTable(FunctionLookupTable):
+    """
+    Read-only function lookup table backed by a memory-mapped file.
+    The lookup by file, signature, and identifier resolve functions lazily, such that
+    the table can be queried right away without deserializing all functions first.
+    """
+
+    def __init__(self, filepath: Path, root_dir: Optional[Path] = None) -> None:
+        # we deliberately skip the initialization of the base class, which would load all functions
+        self.mapped_file: MappedFile = MappedFile(
+            filepath=filepath, magic=FUNCTION_LOOKUP_MAGIC
+        )
+        self.root_dir = root_dir
+        # attributes of the base class for parsing added files, although read-only tables never add any
+        self.disk_cache = None
+        self.parser = None
+        strings: MappedStrings = MappedStrings(
+            offsets=self.mapped_file.section(LOOKUP_STRING_OFFSETS, "Q"),
+            data=self.mapped_file.section(LOOKUP_STRINGS),
+        )
+        self.all_functions_ordered_by_id: MappedFunctions = MappedFunctions(
+            records=self.mapped_file.section(LOOKUP_FUNCTIONS, "I"), strings=strings
+        )
+        files: memoryview = self.mapped_file.section(LOOKUP_FILES, "I")
+        file_functions: memoryview = self.mapped_file.section(
+            LOOKUP_FILE_FUNCTIONS, "I"
+        )
+        self.table: Mapping[str, List[CoveredFunction]] = _LazySortedMapping(
+            n=len(files) // 3,
+            key_at=lambda idx: strings[files[idx * 3]],
+            value_at=lambda idx: [
+                self.all_functions_ordered_by_id[function_id]
+                for function_id in file_functions[
+                    files[idx * 3 + 1] : files[idx * 3 + 1] + files[idx * 3 + 2]
+                ]
+            ],
+        )
+        self.function_cache: Mapping[str, List[CoveredFunction]] = _MappedSignatureIndex(
+            functions=self.all_functions_ordered_by_id,
+            signature_order=self.mapped_file.section(LOOKUP_SIGNATURE_ORDER, "I"),
+        )
+        # secondary indices would require decoding all functions, so scope queries scan the functions instead
+        self.namespace_index = None
+        self.class_name_index = None
+        self.line_index = {}
+        self.max_id = len(self.all_functions_ordered_by_id)
+
+    def __getstate__(self):
+        raise Exception(
+            "Memory-mapped function lookup tables cannot be pickled, use `to_csv` or convert it first."
+        )
+
+    def update_function_cache(self):
+        pass
+
+    def add_functions(self, file: Path) -> List[CoveredFunction]:
+        raise Exception(
+            f"Memory-mapped function lookup tables are read-only, cannot add functions for {file}."
+        )
+
+
+class _MappedSignatureIndex(Mapping):
+    def __init__(self, functions: MappedFunctions, signature_order: memoryview) -> None:
+        self.functions = functions
+        self.signature_order = signature_order
+        self.cache: Dict[str, List[CoveredFunction]] = {}
+
+    def _signature_at(self, pos: int) -> str:
+        return self.functions[self.signature_order[pos]].signature
+
+    def _find_range(self, signature: str) -> Tuple[int, int]:
+        lo, hi = 0, len(self.signature_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._signature_at(mid) < signature:
+                lo = mid + 1
+            else:
+                hi = mid
+        start: int = lo
+        hi = len(self.signature_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._signature_at(mid) <= signature:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def __getitem__(self, signature: str) -> List[CoveredFunction]:
+        if signature not in self.cache:
+            start, end = self._find_range(signature)
+            if start == end:
+                raise KeyError(signature)
+            self.cache[signature] = [
+                self.functions[function_id]
+                for function_id in self.signature_order[start:end]
+            ]
+        return self.cache[signature]
+
+    def __contains__(self, signature: object) -> bool:
+        if not isinstance(signature, str):
+            return False
+        if signature in self.cache:
+            return True
+        start, end = self._find_range(signature)
+        return start != end
+
+    def __iter__(self) -> Iterator[str]:
+        last: Optional[str] = None
+        for pos in range(len(self.signature_order)):
+            signature: str = self._signature_at(pos)
+            if signature != last:
+                yield signature
+                last = signature
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _MappedEntityTests(Mapping):
+    def __init__(self, offsets: memoryview, tests: memoryview) -> None:
+        self.offsets = offsets
+        self.tests = tests
+
+    def __getitem__(self, entity: int) -> memoryview:
+        if not isinstance(entity, int) or entity < 0 or entity >= len(self):
+            raise KeyError(entity)
+        return self.tests[self.offsets[entity] : self.offsets[entity + 1]]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class MappedTestFunctionTraces(TestFunctionTraces):
+    """
+    Read-only test function traces backed by a memory-mapped file, which contains both the traces
+    and their inverted index, such that tests can be selected without deserializing all traces.
+    """
+
+    def __init__(self, filepath: Path) -> None:
+        # we deliberately skip the initialization of the base class, which would require a loaded table
+        self.mapped_file: MappedFile = MappedFile(
+            filepath=filepath, magic=TEST_FUNCTION_TRACES_MAGIC
+        )
+        test_ids: MappedStrings = MappedStrings(
+            offsets=self.mapped_file.section(TRACES_STRING_OFFSETS, "Q"),
+            data=self.mapped_file.section(TRACES_STRINGS),
+        )
+        test_offsets: memoryview = self.mapped_file.section(TRACES_TEST_OFFSETS, "Q")
+        test_functions: memoryview = self.mapped_file.section(
+            TRACES_TEST_FUNCTIONS, "I"
+        )
+        self.test_positions: Optional[Dict[str, int]] = None
+        self.test_ids = test_ids
+        self.test_offsets = test_offsets
+        self.test_functions = test_functions
+        self.table: Mapping[str, memoryview] = _MappedTraceTable(traces=self)
+        # the inverted index is read from the file on first use
+        self.index: Optional[TestTraceIndex] = None
+
+    def __getstate__(self):
+        raise Exception(
+            "Memory-mapped test function traces cannot be pickled, use `to_csv` or convert them first."
+        )
+
+    def get_index(self) -> TestTraceIndex:
+        if self.index is None:
+            self.index = TestTraceIndex(
+                test_ids=self.test_ids,
+                entity_to_tests=_MappedEntityTests(
+                    offsets=self.mapped_file.section(TRACES_FUNCTION_OFFSETS, "Q"),
+                    tests=self.mapped_file.section(TRACES_FUNCTION_TESTS, "I"),
+                ),
+            )
+        return self.index
+
+    def remove_test(self, test_id: str) -> None:
+        raise Exception(
+            f"Memory-mapped test function traces are read-only, cannot remove {test_id}."
+        )
+
+    def add_test_function_dependency(self, *args, **kwargs) -> None:
+        raise Exception("Memory-mapped test function traces are read-only.")
+
+
+class _MappedTraceTable(Mapping):
+    def __init__(self, traces: MappedTestFunctionTraces) -> None:
+        self.traces = traces
+
+    def _get_position(self, test_id: str) -> int:
+        if self.traces.test_positions is None:
+            self.traces.test_positions = {
+                test_id: idx for idx, test_id in enumerate(self.traces.test_ids)
+            }
+        return self.traces.test_positions.get(test_id, -1)
+
+    def __getitem__(self, test_id: str) -> memoryview:
+        idx: int = self._get_position(test_id)
+        if idx < 0:
+            raise KeyError(test_id)
+        return self.traces.test_functions[
+            self.traces.test_offsets[idx] : self.traces.test_offsets[idx + 1]
+        ]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.traces.test_ids)
+
+    def __len__(self) -> int:
+        return len(self.traces.test_ids)
+
+
+def save_function_lookup_table(
+    filepath: Path, function_lookup_table: FunctionLookupTable
+) -> None:
+    functions: Sequence[CoveredFunction] = function_lookup_table.all_functions_ordered_by_id
+    for idx, function in enumerate(functions):
+        if function.identifier != idx:
+            raise Exception(
+                f"Function identifiers must be consecutive, found {function.identifier} at position {idx}."
+            )
+    strings: Dict[str, int] = {}
+
+    def _get_string_idx(string: Optional[str]) -> int:
+        if string is None:
+            return NO_STRING
+        if string not in strings:
+            strings[string] = len(strings)
+        return strings[string]
+
+    records: array = array("I")
+    for function in functions:
+        records.extend(
+            [
+                _get_string_idx(function.file),
+                _get_string_idx(function.signature),
+                function.start,
+                function.end,
+                _get_string_idx(function.properties),
+                _get_string_idx(function.namespace),
+                _get_string_idx(function.class_name),
+            ]
+        )
+    files: array = array("I")
+    file_functions: array = array("I")
+    for file_key in sorted(function_lookup_table.table.keys()):
+        file_functions_of_key: List[CoveredFunction] = function_lookup_table.table[
+            file_key
+        ]
+        files.extend(
+            [_get_string_idx(file_key), len(file_functions), len(file_functions_of_key)]
+        )
+        file_functions.extend([function.identifier for function in file_functions_of_key])
+    signature_order: array = array(
+        "I",
+        [
+            function.identifier
+            for function in sorted(functions, key=lambda f: (f.signature, f.identifier))
+        ],
+    )
+    string_offsets, string_data = _encode_strings(list(strings.keys()))
+    _write_sections(
+        filepath=filepath,
+        magic=FUNCTION_LOOKUP_MAGIC,
+        sections=[
+            string_offsets,
+            string_data,
+            records.tobytes(),
+            files.tobytes(),
+            file_functions.tobytes(),
+            signature_order.tobytes(),
+        ],
+    )
+
+
+def read_function_lookup_table(
+    filepath: Path, root_dir: Optional[Path] = None
+) -> MappedFunctionLookupTable:
+    return MappedFunctionLookupTable(filepath=filepath, root_dir=root_dir)
+
+
+def save_test_function_traces(
+    filepath: Path, test_function_traces: TestFunctionTraces
+) -> None:
+    index: TestTraceIndex = test_function_traces.get_index()
+    test_offsets: array = array("Q", [0])
+    test_functions: array = array("I")
+    for test_id in index.test_ids:
+        test_functions.extend(sorted(test_function_traces.table[test_id]))
+        test_offsets.append(len(test_functions))
+    n_functions: int = max(index.entity_to_tests.keys(), default=-1) + 1
+    function_offsets: array = array("Q", [0])
+    function_tests: array = array("I")
+    for function_id in range(n_functions):
+        function_tests.extend(index.entity_to_tests.get(function_id, []))
+        function_offsets.append(len(function_tests))
+    string_offsets, string_data = _encode_strings(list(index.test_ids))
+    _write_sections(
+        filepath=filepath,
+        magic=TEST_FUNCTION_TRACES_MAGIC,
+        sections=[
+            string_offsets,
+            string_data,
+            test_offsets.tobytes(),
+            test_functions.tobytes(),
+            function_offsets.tobytes(),
+            function_tests.tobytes(),
+        ],
+    )
+
+
+def read_test_function_traces(filepath: Path) -> MappedTestFunctionTraces:
+    return MappedTestFunctionTraces(filepath=filepath)
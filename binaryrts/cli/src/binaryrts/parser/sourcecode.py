@@ -1,20 +1,40 @@
+import itertools
 import json
 import logging
+import mmap
 import os.path
 import re
+import shutil
 import string
 import subprocess as sb
 import sys
+import tempfile
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, List, Dict, Pattern
+from typing import Optional, List, Dict, Pattern, Iterable, IO, Set, Tuple, Iterator
 
+from binaryrts.util.cache import DiskCache
 from binaryrts.util.fs import has_ext
-from binaryrts.util.io import slice_file_into_chunks
+from binaryrts.util.hash import hash_git_blob, hash_string
+from binaryrts.util.io import (
+    slice_file_into_chunks,
+    slice_lines_into_chunks,
+    split_lines,
+)
+from binaryrts.util.mp import imap_with_multi_processing, can_start_process_pool
 from binaryrts.util.os import os_is_windows
 from binaryrts.util.process import check_executable_exists
 
 PROTOTYPE_PREFIX: str = "__proto__"
+# bump to invalidate persistently cached ctags outputs, e.g., when changing the ctags command
+CTAGS_CACHE_VERSION: int = 1
+# minimum number of files to parse with a single ctags process instead of one process per file
+CTAGS_BATCH_MIN_FILES: int = 2
+# minimum number of files per process to search call sites in parallel, which outweighs starting the processes
+CALL_SITE_SCAN_MIN_FILES_PER_PROCESS: int = 256
+# bump to invalidate persistently cached cscope databases, e.g., when changing the cscope command
+CSCOPE_DATABASE_VERSION: int = 1
 
 
 @dataclass()
@@ -110,14 +130,47 @@ class CSourceCodeParser:
         ".h++",
     ]
     C_TOKEN_PATTERN: str = r"[\s\;\*\%\|\&\~\^\+\-\/\>\<\,\(\)\!\.\=\?\{\}]"
+    # runs of non-delimiter characters that are enclosed by delimiters, i.e., all symbols that
+    # a search for the symbol enclosed by `C_TOKEN_PATTERN` would find
+    C_ENCLOSED_TOKEN_REGEX: Pattern = re.compile(
+        rf"(?<={C_TOKEN_PATTERN})[^{C_TOKEN_PATTERN[1:]}+(?={C_TOKEN_PATTERN})"
+    )
+    # only identifiers can be matched literally against tokens, as symbols are searched as regular expressions
+    C_IDENTIFIER_REGEX: Pattern = re.compile(r"\w+")
 
     def __init__(
-        self, include_prototypes: bool = False, use_cache: bool = False
+        self,
+        include_prototypes: bool = False,
+        use_cache: bool = False,
+        disk_cache: Optional[DiskCache] = None,
     ) -> None:
         # cache that prevents analyzing the same file again
         self.ctags_output_cache: Dict[Path, str] = {}
         self.include_prototypes = include_prototypes
         self.use_cache = use_cache
+        # persistent cache across runs, keyed by file content
+        self.disk_cache = disk_cache
+        # outputs of batched ctags calls, which are consumed on first access
+        self.prefetched_ctags_outputs: Dict[Path, str] = {}
+
+    def copy_for_files(self, files: Iterable[Path]) -> "CSourceCodeParser":
+        """
+        Returns a parser with the same configuration that only holds the ctags outputs of the given files,
+        e.g., to pass it to another process.
+        """
+        parser: CSourceCodeParser = CSourceCodeParser(
+            include_prototypes=self.include_prototypes,
+            use_cache=self.use_cache,
+            disk_cache=self.disk_cache,
+        )
+        for file in files:
+            if file in self.ctags_output_cache:
+                parser.ctags_output_cache[file] = self.ctags_output_cache[file]
+            if file in self.prefetched_ctags_outputs:
+                parser.prefetched_ctags_outputs[file] = self.prefetched_ctags_outputs[
+                    file
+                ]
+        return parser
 
     @classmethod
     def extract_raw_signature(cls, signature: str) -> str:
@@ -139,14 +192,34 @@ class CSourceCodeParser:
 
     @classmethod
     def get_raw_code(cls, file: Path, start: int, end: int) -> str:
-        return cls.strip_whitespaces(
-            cls.strip_comments(
-                slice_file_into_chunks(
-                    file,
-                    [(start, end)],
-                )[0]
-            )
-        )
+        return cls.get_raw_codes(file=file, line_ranges=[(start, end)])[0]
+
+    @classmethod
+    def get_raw_codes(cls, file: Path, line_ranges: List[Tuple[int, int]]) -> List[str]:
+        """
+        Returns the code without comments and whitespaces of each line range (e.g., of all functions),
+        reading the file only once.
+        """
+        return [
+            cls.strip_whitespaces(cls.strip_comments(chunk))
+            for chunk in slice_file_into_chunks(file, line_ranges)
+        ]
+
+    @classmethod
+    def get_raw_code_from_lines(cls, lines: List[str], start: int, end: int) -> str:
+        return cls.get_raw_codes_from_lines(lines=lines, line_ranges=[(start, end)])[0]
+
+    @classmethod
+    def get_raw_codes_from_lines(
+        cls, lines: List[str], line_ranges: List[Tuple[int, int]]
+    ) -> List[str]:
+        """
+        Same as `get_raw_codes`, but for lines that are already in memory.
+        """
+        return [
+            cls.strip_whitespaces(cls.strip_comments(chunk))
+            for chunk in slice_lines_into_chunks(lines, line_ranges)
+        ]
 
     @classmethod
     def strip_comments(cls, code: str) -> str:
@@ -167,6 +240,69 @@ class CSourceCodeParser:
     def strip_whitespaces(cls, code: str) -> str:
         return code.translate(str.maketrans("", "", string.whitespace))
 
+    def _get_disk_cache_key(self, file: Path) -> str:
+        return (
+            f"ctags:{CTAGS_CACHE_VERSION}:{hash_git_blob(file)}:"
+            f"{'prototypes' if self.include_prototypes else 'definitions'}"
+        )
+
+    def prefetch(self, files: Iterable[Path]) -> None:
+        """
+        Parses many files with a single ctags process, such that subsequent queries for them
+        do not spawn a ctags process per file.
+        """
+        missing_files: Dict[Path, Optional[str]] = {}  # file -> disk cache key
+        for file in files:
+            if (
+                file in self.ctags_output_cache
+                or file in self.prefetched_ctags_outputs
+                or file in missing_files
+                or not file.exists()
+            ):
+                continue
+            cache_key: Optional[str] = None
+            if self.disk_cache is not None:
+                cache_key = self._get_disk_cache_key(file)
+                ctags_output: Optional[str] = self.disk_cache.get(cache_key)
+                if ctags_output is not None:
+                    self.prefetched_ctags_outputs[file] = ctags_output
+                    continue
+            missing_files[file] = cache_key
+        if len(missing_files) < CTAGS_BATCH_MIN_FILES:
+            # not worth a batch, files are parsed on demand
+            return
+        try:
+            ctags_outputs: Dict[Path, str] = ctags_batch(
+                files=list(missing_files.keys()),
+                include_prototypes=self.include_prototypes,
+            )
+        except Exception as e:
+            logging.warning(f"{e}: Failed to parse files in batch, parsing on demand")
+            return
+        for file, ctags_output in ctags_outputs.items():
+            self.prefetched_ctags_outputs[file] = ctags_output
+            if missing_files[file] is not None:
+                self.disk_cache.put(missing_files[file], ctags_output)
+
+    def _get_ctags_output(self, file: Path) -> Optional[str]:
+        if file in self.ctags_output_cache:
+            return self.ctags_output_cache[file]
+        ctags_output: Optional[str] = self.prefetched_ctags_outputs.pop(file, None)
+        if ctags_output is None:
+            cache_key: Optional[str] = None
+            if self.disk_cache is not None and file.exists():
+                cache_key = self._get_disk_cache_key(file)
+                ctags_output = self.disk_cache.get(cache_key)
+            if ctags_output is None:
+                ctags_output = ctags(
+                    file=file, include_prototypes=self.include_prototypes
+                )
+                if cache_key is not None and ctags_output is not None:
+                    self.disk_cache.put(cache_key, ctags_output)
+        if ctags_output and self.use_cache:
+            self.ctags_output_cache[file] = ctags_output
+        return ctags_output
+
     def get_functions(self, file: Path) -> List[FunctionDefinition]:
         return self._get_functions_from_ctags(
             file=file,
@@ -181,13 +317,8 @@ class CSourceCodeParser:
         self, file: Path
     ) -> List[NonFunctionalEntityDefinition]:
         non_functionals: List[NonFunctionalEntityDefinition] = []
-        if file in self.ctags_output_cache:
-            ctags_output = self.ctags_output_cache[file]
-        else:
-            ctags_output = ctags(file=file, include_prototypes=self.include_prototypes)
+        ctags_output: Optional[str] = self._get_ctags_output(file=file)
         if ctags_output:
-            if self.use_cache:
-                self.ctags_output_cache[file] = ctags_output
             for line in ctags_output.splitlines():
                 try:
                     data: Dict = json.loads(line)
@@ -205,7 +336,8 @@ class CSourceCodeParser:
                             properties += ctags_output_line.properties
                         non_functionals.append(
                             NonFunctionalEntityDefinition(
-                                file=Path(ctags_output_line.path).resolve(),
+                                # ctags is called per file, but cached outputs may stem from a file with same content
+                                file=file.resolve(),
                                 name=ctags_output_line.name,
                                 start_line=ctags_output_line.line,
                                 end_line=ctags_output_line.end
@@ -222,13 +354,8 @@ class CSourceCodeParser:
     def _get_functions_from_ctags(self, file: Path) -> List[FunctionDefinition]:
         functions: List[FunctionDefinition] = []
         type_defs: Dict[str, List[TypeDefinition]] = {}  # lookup by type name
-        if file in self.ctags_output_cache:
-            ctags_output = self.ctags_output_cache[file]
-        else:
-            ctags_output = ctags(file=file, include_prototypes=self.include_prototypes)
+        ctags_output: Optional[str] = self._get_ctags_output(file=file)
         if ctags_output:
-            if self.use_cache:
-                self.ctags_output_cache[file] = ctags_output
             for line in ctags_output.splitlines():
                 try:
                     data: Dict = json.loads(line)
@@ -375,40 +502,61 @@ class CTagsJsonOutputLine:
         return function_def
 
 
-def ctags(file: Path, include_prototypes: bool = False) -> Optional[str]:
-    """
-    Calls `ctags` executable to parse functions/macros/globals from C/C++ source file.
-    """
-    output: Optional[str] = None
+def _get_ctags_executable() -> Optional[str]:
     ctags_executable_default: Path = (
         (Path(os.path.dirname(sys.modules["binaryrts"].__file__)) / "bin" / "ctags")
         if os_is_windows()
         else Path("/usr/local/bin/ctags")
     )
-    ctags_executable: Optional[str] = check_executable_exists(
+    return check_executable_exists(
         program=ctags_executable_default.resolve().__str__()
     )
 
-    if ctags_executable and file.exists():
-        command_parts: List[str] = [
-            f'"{ctags_executable}"',  # need the quotes to support paths with spaces
-            '--fields-all="*"',
-            "--fields-c++=-{macrodef}",
-            "--fields-c=-{macrodef}",
-            "--fields=-Prtl",
-            '-D "AUTO_REGISTER_SERVICE(...)=namespace{void AUTO_REGISTER_SERVICE(__VA_ARGS__){}}"',
-            # IVU-specific hack for unconventional macro usage
-        ]
-        if include_prototypes:
-            command_parts += [
-                "--kinds-c=+p",
-                "--kinds-c++=+p",
-            ]
+
+def _get_missing_ctags_message() -> str:
+    return (
+        "Missing ctags executable!"
+        f"Maybe you didn't add the ctags location to your PATH or "
+        f"the executable is not inside {(Path(os.path.dirname(sys.modules['binaryrts'].__file__)) / 'bin').absolute()}."
+    )
+
+
+def _get_ctags_command_parts(
+    ctags_executable: str, include_prototypes: bool = False
+) -> List[str]:
+    command_parts: List[str] = [
+        f'"{ctags_executable}"',  # need the quotes to support paths with spaces
+        '--fields-all="*"',
+        "--fields-c++=-{macrodef}",
+        "--fields-c=-{macrodef}",
+        "--fields=-Prtl",
+        '-D "AUTO_REGISTER_SERVICE(...)=namespace{void AUTO_REGISTER_SERVICE(__VA_ARGS__){}}"',
+        # IVU-specific hack for unconventional macro usage
+    ]
+    if include_prototypes:
         command_parts += [
-            "--output-format=json",
-            "--language-force=c++",  # fix problem with .ipp files by forcing C++ parser
-            f'"{file.absolute().__str__()}"',
+            "--kinds-c=+p",
+            "--kinds-c++=+p",
         ]
+    command_parts += [
+        "--output-format=json",
+        "--language-force=c++",  # fix problem with .ipp files by forcing C++ parser
+    ]
+    return command_parts
+
+
+def ctags(file: Path, include_prototypes: bool = False) -> Optional[str]:
+    """
+    Calls `ctags` executable to parse functions/macros/globals from C/C++ source file.
+    """
+    output: Optional[str] = None
+    ctags_executable: Optional[str] = _get_ctags_executable()
+
+    if ctags_executable and file.exists():
+        command_parts: List[str] = _get_ctags_command_parts(
+            ctags_executable=ctags_executable, include_prototypes=include_prototypes
+        )
+        command_parts.append(f'"{file.absolute().__str__()}"')
         command: str = " ".join(command_parts)
         logging.debug(f"Calling ctags with: {command}")
         process: sb.CompletedProcess = sb.run(
@@ -424,14 +572,85 @@ def ctags(file: Path, include_prototypes: bool = False) -> Optional[str]:
             )
         output = process.stdout
     else:
-        raise Exception(
-            "Missing ctags executable!"
-            f"Maybe you didn't add the ctags location to your PATH or "
-            f"the executable is not inside {(Path(os.path.dirname(sys.modules['binaryrts'].__file__)) / 'bin').absolute()}."
-        )
+        raise Exception(_get_missing_ctags_message())
     return output
 
 
+def ctags_batch(files: List[Path], include_prototypes: bool = False) -> Dict[Path, str]:
+    """
+    Calls `ctags` executable once for many C/C++ source files, which are passed via stdin (`-L -`).
+    The streamed JSON output is demultiplexed by the `path` of each tag,
+    such that each file is mapped to the same output as if `ctags` was called for it individually.
+    Files that do not exist are omitted.
+    """
+    ctags_executable: Optional[str] = _get_ctags_executable()
+    if not ctags_executable:
+        raise Exception(_get_missing_ctags_message())
+
+    files_by_path: Dict[str, Path] = {
+        file.absolute().__str__(): file for file in files if file.exists()
+    }
+    output_lines: Dict[Path, List[str]] = {file: [] for file in files_by_path.values()}
+    if len(files_by_path) == 0:
+        return {}
+    command_parts: List[str] = _get_ctags_command_parts(
+        ctags_executable=ctags_executable, include_prototypes=include_prototypes
+    )
+    command_parts.append("-L -")
+    command: str = " ".join(command_parts)
+    logging.debug(f"Calling ctags for {len(files_by_path)} files with: {command}")
+
+    # stderr goes to a file, such that neither of the pipes can block the process
+    with tempfile.TemporaryFile(mode="w+") as stderr_fp:
+        process: sb.Popen = sb.Popen(
+            command,
+            text=True,
+            shell=True,
+            stdin=sb.PIPE,
+            stdout=sb.PIPE,
+            stderr=stderr_fp,
+        )
+
+        def write_file_list(stdin: IO[str]) -> None:
+            try:
+                for path in files_by_path.keys():
+                    stdin.write(f"{path}\n")
+            except OSError as e:
+                logging.debug(f"Failed to pass file list to ctags: {e}")
+            finally:
+                try:
+                    stdin.close()
+                except OSError:
+                    pass
+
+        # we feed the file list concurrently, as ctags already writes tags while reading the list
+        writer: threading.Thread = threading.Thread(
+            target=write_file_list, args=(process.stdin,), daemon=True
+        )
+        writer.start()
+        for line in process.stdout:
+            try:
+                path: Optional[str] = json.loads(line).get("path", None)
+            except Exception as e:
+                logging.debug(
+                    f"Failed to decode JSON output of ctags line {line} with exception: {e}"
+                )
+                continue
+            file: Optional[Path] = (
+                files_by_path.get(path, files_by_path.get(Path(path).absolute().__str__()))
+                if path is not None
+                else None
+            )
+            if file is not None:
+                output_lines[file].append(line)
+        writer.join()
+        returncode: int = process.wait()
+        if returncode != 0:
+            stderr_fp.seek(0)
+            raise Exception(f"ctags failed with output: {stderr_fp.read()}")
+    return {file: "".join(lines) for file, lines in output_lines.items()}
+
+
 @dataclass()
 class NonFunctionalCallSite:
     path: Path
@@ -468,25 +687,35 @@ class NonFunctionalCallAnalyzer:
         use_cscope: bool = False,
         use_grep: bool = False,
         use_findstr: bool = False,
+        n_processes: int = 1,
+        cscope_cache_dir: Optional[Path] = None,
     ) -> None:
         self.root_dir = root_dir
         self.use_cscope = use_cscope
+        # directory to keep cscope databases across runs
+        self.cscope_cache_dir = cscope_cache_dir
         self.use_grep = use_grep
         self.use_findstr = use_findstr
+        # number of processes for the built-in search
+        self.n_processes = n_processes
 
     def _get_call_sites_from_cscope(
-        self, symbol_name: str, file_relative_to: Optional[Path] = None
-    ) -> List[NonFunctionalCallSite]:
-        call_sites: List[NonFunctionalCallSite] = []
-        output: Optional[str] = cscope(symbol_name=symbol_name, root_dir=self.root_dir)
-        if output:
-            call_sites = [
+        self, symbol_names: List[str], file_relative_to: Optional[Path] = None
+    ) -> Dict[str, List[NonFunctionalCallSite]]:
+        outputs: Dict[str, str] = cscope_batch(
+            symbol_names=symbol_names,
+            root_dir=self.root_dir,
+            cache_dir=self.cscope_cache_dir,
+        )
+        return {
+            symbol_name: [
                 NonFunctionalCallSite.from_cscope(
                     line=line, file_relative_to=file_relative_to
                 )
-                for line in output.splitlines()
+                for line in outputs.get(symbol_name, "").splitlines()
             ]
-        return call_sites
+            for symbol_name in symbol_names
+        }
 
     @staticmethod
     def _parse_call_sites(
@@ -630,14 +859,69 @@ class NonFunctionalCallAnalyzer:
 
         return calling_functions
 
+    def _scan_call_sites(
+        self, symbol_names: List[str], file_relative_to: Optional[Path] = None
+    ) -> Dict[str, List[NonFunctionalCallSite]]:
+        """
+        Searches the call sites of all symbols in a single traversal of the root directory, reading each file once.
+        Chunks of files are scanned in parallel, and results are collected in the order of the traversal.
+        """
+        call_sites: Dict[str, List[NonFunctionalCallSite]] = {
+            symbol_name: [] for symbol_name in symbol_names
+        }
+        if len(call_sites) == 0:
+            return call_sites
+        unique_symbol_names: List[str] = list(call_sites.keys())
+        files: List[str] = []
+        for root, dirs, filenames in os.walk(self.root_dir.absolute()):
+            for filename in filenames:
+                if CSourceCodeParser.is_c_file(Path(filename)):
+                    files.append(os.path.join(root, filename))
+        n_processes: int = (
+            1
+            if not can_start_process_pool()
+            else min(
+                self.n_processes, len(files) // CALL_SITE_SCAN_MIN_FILES_PER_PROCESS
+            )
+        )
+        # several chunks per process balance the load across processes
+        chunk_size: int = max(
+            len(files) // (n_processes * 4) if n_processes > 1 else len(files), 1
+        )
+        jobs: List[Tuple[List[str], List[str]]] = [
+            (files[idx : idx + chunk_size], unique_symbol_names)
+            for idx in range(0, len(files), chunk_size)
+        ]
+        results: Iterable[List[List[Tuple[int, int]]]] = (
+            imap_with_multi_processing(
+                scan_files_for_symbols, jobs, n_cpu=n_processes
+            )
+            if n_processes > 1
+            else map(scan_files_for_symbols, jobs)
+        )
+        for (chunk_files, _), chunk_hits in zip(jobs, results):
+            for file, hits in zip(chunk_files, chunk_hits):
+                if len(hits) == 0:
+                    continue
+                filepath: Path = (
+                    Path(file).resolve().relative_to(file_relative_to.resolve())
+                    if file_relative_to
+                    else Path(file).resolve()
+                )
+                for symbol_idx, line_no in hits:
+                    call_sites[unique_symbol_names[symbol_idx]].append(
+                        NonFunctionalCallSite(path=filepath, line_no=line_no)
+                    )
+        return call_sites
+
     def get_call_sites(
         self, symbol_name: str, file_relative_to: Optional[Path] = None
     ) -> List[NonFunctionalCallSite]:
         calling_functions: List[NonFunctionalCallSite] = []
         if self.use_cscope:
             calling_functions = self._get_call_sites_from_cscope(
-                symbol_name=symbol_name, file_relative_to=file_relative_to
-            )
+                symbol_names=[symbol_name], file_relative_to=file_relative_to
+            )[symbol_name]
         elif self.use_findstr:
             calling_functions = self._get_call_sites_from_findstr(
                 symbol_name=symbol_name, file_relative_to=file_relative_to
@@ -647,95 +931,269 @@ class NonFunctionalCallAnalyzer:
                 symbol_name=symbol_name, file_relative_to=file_relative_to
             )
         else:
-            pattern: Pattern = re.compile(
-                rf"{CSourceCodeParser.C_TOKEN_PATTERN}{symbol_name}{CSourceCodeParser.C_TOKEN_PATTERN}"
-            )
-            for root, dirs, files in os.walk(self.root_dir.absolute()):
-                for file in files:
-                    filepath: Path = Path(root) / file
-                    if CSourceCodeParser.is_c_file(filepath):
-                        try:
-                            with filepath.open("r") as fp:
-                                for idx, line in enumerate(fp):
-                                    if re.search(pattern, line) is not None:
-                                        filepath = (
-                                            filepath.resolve().relative_to(
-                                                file_relative_to.resolve()
-                                            )
-                                            if file_relative_to
-                                            else filepath.resolve()
-                                        )
-                                        calling_functions.append(
-                                            NonFunctionalCallSite(
-                                                path=filepath, line_no=idx + 1
-                                            )
-                                        )
-                        except Exception as e:
-                            logging.error(
-                                f"Could not search for call sites in {filepath}: {e}"
-                            )
+            calling_functions = self._scan_call_sites(
+                symbol_names=[symbol_name], file_relative_to=file_relative_to
+            )[symbol_name]
 
         return calling_functions
 
+    def get_call_sites_of_symbols(
+        self, symbol_names: List[str], file_relative_to: Optional[Path] = None
+    ) -> Dict[str, List[NonFunctionalCallSite]]:
+        """
+        Returns the call sites of several symbols. The built-in search finds all of them in a single traversal
+        and cscope in a single session, whereas grep and findstr are invoked once per symbol.
+        """
+        if self.use_cscope:
+            return self._get_call_sites_from_cscope(
+                symbol_names=symbol_names, file_relative_to=file_relative_to
+            )
+        if self.use_findstr or self.use_grep:
+            return {
+                symbol_name: self.get_call_sites(
+                    symbol_name=symbol_name, file_relative_to=file_relative_to
+                )
+                for symbol_name in symbol_names
+            }
+        return self._scan_call_sites(
+            symbol_names=symbol_names, file_relative_to=file_relative_to
+        )
 
-def cscope(
-    symbol_name: str,
-    root_dir: Path,
-) -> Optional[str]:
+
+def scan_files_for_symbols(
+    job: Tuple[List[str], List[str]]
+) -> List[List[Tuple[int, int]]]:
     """
-    Calls `cscope` executable to get cross-file references from C/C++ source files.
+    Scans files for lines containing symbols enclosed by `C_TOKEN_PATTERN`.
+    Returns the (symbol index, line number) pairs per file, ordered by line.
+    Files are memory-mapped and skipped if they contain none of the identifiers,
+    before identifiers are looked up in the set of tokens of each line.
+    Symbols that are not plain identifiers are searched line by line with their regular expression.
     """
-    output: Optional[str] = None
+    files, symbol_names = job
+    identifiers: Dict[bytes, int] = {
+        symbol_name.encode("utf-8"): idx
+        for idx, symbol_name in enumerate(symbol_names)
+        if CSourceCodeParser.C_IDENTIFIER_REGEX.fullmatch(symbol_name) is not None
+    }
+    patterns: List[Tuple[int, Pattern]] = [
+        (
+            idx,
+            re.compile(
+                rf"{CSourceCodeParser.C_TOKEN_PATTERN}{symbol_name}{CSourceCodeParser.C_TOKEN_PATTERN}"
+            ),
+        )
+        for idx, symbol_name in enumerate(symbol_names)
+        if symbol_name.encode("utf-8") not in identifiers
+    ]
+    results: List[List[Tuple[int, int]]] = []
+    for file in files:
+        hits: List[Tuple[int, int]] = []
+        results.append(hits)
+        try:
+            with open(file, "rb") as fp:
+                if os.fstat(fp.fileno()).st_size == 0:
+                    continue
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # most files contain none of the symbols, which is cheap to check on the raw bytes
+                    found_identifiers: Dict[str, int] = {
+                        identifier.decode("utf-8"): idx
+                        for identifier, idx in identifiers.items()
+                        if mm.find(identifier) != -1
+                    }
+                    if len(found_identifiers) == 0 and len(patterns) == 0:
+                        continue
+                    content: str = mm[:].decode("utf-8", errors="replace")
+        except Exception as e:
+            logging.error(f"Could not search for call sites in {file}: {e}")
+            continue
+        # universal newlines, as when reading the file in text mode
+        lines: List[str] = split_lines(
+            content.replace("\r\n", "\n").replace("\r", "\n")
+        )
+        for line_idx, line in enumerate(lines):
+            line_hits: Set[int] = set()
+            if len(found_identifiers) > 0:
+                line_hits |= {
+                    found_identifiers[token]
+                    for token in CSourceCodeParser.C_ENCLOSED_TOKEN_REGEX.findall(line)
+                    if token in found_identifiers
+                }
+            for idx, pattern in patterns:
+                if re.search(pattern, line) is not None:
+                    line_hits.add(idx)
+            hits += [(idx, line_idx + 1) for idx in sorted(line_hits)]
+    return results
+
+
+def _get_cscope_executable() -> Optional[str]:
+    cscope_executable_default: Path = (
+        (Path(os.path.dirname(sys.modules["binaryrts"].__file__)) / "bin" / "cscope")
+        if os_is_windows()
+        else Path("/usr/local/bin/cscope")
+    )
+    return check_executable_exists(
+        program=cscope_executable_default.resolve().__str__()
+    )
+
+
+def _update_cscope_database(
+    cscope_executable: str, file_paths: List[str], databases_dir: Path
+) -> Path:
+    """
+    Returns the directory of an up-to-date cscope database for the files, which is identified by
+    the paths, modification times, and sizes of the files, such that it is only rebuilt if any of them changed.
+    A new database is built from a copy of the most recent one, which lets cscope re-parse changed files only.
+    Databases are built in a temporary directory and renamed, such that concurrent builds do not interfere.
+    """
+    stamp_parts: List[str] = [f"{CSCOPE_DATABASE_VERSION}"]
+    for file_path in file_paths:
+        try:
+            stat: os.stat_result = os.stat(file_path)
+            stamp_parts.append(f"{file_path}\t{stat.st_mtime_ns}\t{stat.st_size}")
+        except OSError:
+            continue
+    database_dir: Path = databases_dir / hash_string("\n".join(stamp_parts))[:16]
+    if (database_dir / "cscope.out").exists():
+        os.utime(database_dir)
+        return database_dir
+
+    databases_dir.mkdir(parents=True, exist_ok=True)
+    build_dir: Path = Path(tempfile.mkdtemp(dir=databases_dir, prefix="."))
+    try:
+        previous_dirs: List[Path] = [
+            path for path in databases_dir.iterdir() if not path.name.startswith(".")
+        ]
+        try:
+            if len(previous_dirs) > 0:
+                latest_dir: Path = max(
+                    previous_dirs, key=lambda path: path.stat().st_mtime
+                )
+                for file in latest_dir.iterdir():
+                    shutil.copy2(file, build_dir / file.name)
+        except OSError as e:
+            # removed concurrently, hence, we build from scratch
+            logging.debug(f"Failed to copy previous cscope database: {e}")
+        (build_dir / "cscope.files").write_text(
+            "\n".join(f'"{file_path}"' for file_path in file_paths)
+        )
+        command: str = " ".join(
+            [
+                f'"{cscope_executable}"',
+                "-b",  # Build the cross-reference only.
+                "-q",  # Enable fast symbol lookup via an inverted index.
+                "-c",  # Use only ASCII chars in cross-reference file, i.e., do not compress the data.
+                "-i cscope.files",
+                "-f cscope.out",
+            ]
+        )
+        logging.debug(f"Building cscope database in {build_dir} with: {command}")
+        process: sb.CompletedProcess = sb.run(
+            command,
+            text=True,
+            shell=True,
+            capture_output=True,
+            cwd=build_dir,
+            timeout=60 * 10,  # wait max. 10 minutes for results
+        )
+        if process.returncode != 0:
+            raise Exception(
+                f"Failed to run cscope command {command}: {process.stdout} {process.stderr}"
+            )
+        try:
+            os.replace(build_dir, database_dir)
+        except OSError:
+            # built concurrently by another process
+            if not (database_dir / "cscope.out").exists():
+                raise
+        for previous_dir in previous_dirs:
+            if previous_dir != database_dir:
+                shutil.rmtree(previous_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return database_dir
+
+
+def cscope_batch(
+    symbol_names: List[str], root_dir: Path, cache_dir: Optional[Path] = None
+) -> Dict[str, str]:
+    """
+    Calls `cscope` executable to get the functions calling each of the symbols from C/C++ source files.
+    All symbols are queried in a single line-oriented session on the cross-reference database of the root directory.
+    The database is kept in the cache directory across calls (or in a temporary directory otherwise).
+    """
+    outputs: Dict[str, str] = {}
+    symbol_names = list(dict.fromkeys(symbol_names))
 
     # collect file paths
     file_paths: List[str] = []
     for root, dirs, files in os.walk(root_dir.absolute()):
         for file in files:
-            filepath: str = os.path.join(root, file)
             if CSourceCodeParser.is_c_file(Path(file)):
-                file_paths.append(f'"{filepath}"')
-    if len(file_paths) > 0:
-        input_file: Path = Path("cscope.files")
-        input_file.write_text("\n".join(file_paths))
-
-        cscope_executable_default: Path = (
-            (
-                Path(os.path.dirname(sys.modules["binaryrts"].__file__))
-                / "bin"
-                / "cscope"
-            )
-            if os_is_windows()
-            else Path("/usr/local/bin/cscope")
+                file_paths.append(os.path.join(root, file))
+    cscope_executable: Optional[str] = _get_cscope_executable()
+    if len(file_paths) == 0 or len(symbol_names) == 0 or not cscope_executable:
+        return outputs
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        databases_dir: Path = (
+            cache_dir / hash_string(root_dir.absolute().__str__())[:16]
+            if cache_dir is not None
+            else Path(tmp_dir)
         )
-        cscope_executable: Optional[str] = check_executable_exists(
-            program=cscope_executable_default.resolve().__str__()
+        database_dir: Path = _update_cscope_database(
+            cscope_executable=cscope_executable,
+            file_paths=file_paths,
+            databases_dir=databases_dir,
         )
-        if cscope_executable:
-            command: str = " ".join(
-                [
-                    f'"{cscope_executable}"',
-                    "-c",  # Use only ASCII chars in cross-reference file, i.e., do not compress the data.
-                    "-L",  # Do a single search with line-oriented output.
-                    "-3",  # Find functions calling this symbol.
-                    symbol_name,
-                ]
-            )
-            process: sb.CompletedProcess = sb.run(
-                command,
-                text=True,
-                shell=True,
-                capture_output=True,
-                timeout=60 * 10,  # wait max. 10 minutes for results
+        command: str = " ".join(
+            [
+                f'"{cscope_executable}"',
+                "-d",  # Do not update the cross-reference.
+                "-q",  # Use the inverted index.
+                "-l",  # Line-oriented interface, reading queries from stdin.
+                f'-f "{database_dir / "cscope.out"}"',
+            ]
+        )
+        # query type 3 finds functions calling this symbol
+        queries: str = "".join(f"3{symbol_name}\n" for symbol_name in symbol_names)
+        process: sb.CompletedProcess = sb.run(
+            command,
+            input=queries,
+            text=True,
+            shell=True,
+            capture_output=True,
+            cwd=database_dir,
+            timeout=60 * 10,  # wait max. 10 minutes for results
+        )
+        if process.returncode != 0:
+            raise Exception(
+                f"Failed to run cscope command {command}: {process.stdout} {process.stderr}"
             )
-            output = process.stdout
-            if process.returncode != 0:
-                raise Exception(
-                    f"Failed to run cscope command {command}: {process.stdout} {process.stderr}"
-                )
 
-        if input_file.exists():
-            input_file.unlink()
-        if Path("cscope.out").exists():
-            Path("cscope.out").unlink()
+    # the results of each query are preceded by a line (after the prompt) with their number
+    output_lines: Iterator[str] = iter(process.stdout.splitlines())
+    for symbol_name in symbol_names:
+        n_lines: Optional[int] = None
+        for line in output_lines:
+            match: Optional[re.Match] = re.search(r"cscope: (\d+) lines?", line)
+            if match is not None:
+                n_lines = int(match.group(1))
+                break
+        if n_lines is None:
+            raise Exception(f"Missing results of cscope query for {symbol_name}.")
+        outputs[symbol_name] = "\n".join(itertools.islice(output_lines, n_lines))
+    return outputs
 
-    return output
+
+def cscope(
+    symbol_name: str,
+    root_dir: Path,
+    cache_dir: Optional[Path] = None,
+) -> Optional[str]:
+    """
+    Calls `cscope` executable to get cross-file references from C/C++ source files.
+    """
+    return cscope_batch(
+        symbol_names=[symbol_name], root_dir=root_dir, cache_dir=cache_dir
+    ).get(symbol_name)
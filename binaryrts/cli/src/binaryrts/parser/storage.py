@@ -0,0 +1,117 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+from binaryrts.parser.coverage import (
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TestFileTraces,
+    TestTraceIndex,
+    TEST_LOOKUP_FILE,
+    TEST_FUNCTION_INDEX_FILE,
+    PICKLE_TEST_FUNCTION_INDEX_FILE,
+)
+from binaryrts.parser import mapped, database
+from binaryrts.util.fs import has_ext
+from binaryrts.util.hash import hash_file
+
+SUPPORTED_FORMATS: str = ".csv, .pkl, .bin, and .db"
+
+
+def load_function_lookup_table(
+    file: Path, root_dir: Optional[Path] = None
+) -> FunctionLookupTable:
+    function_lookup_table: FunctionLookupTable
+    if has_ext(file, exts=[".csv"]):
+        function_lookup_table = FunctionLookupTable.from_csv(file, root_dir=root_dir)
+    elif has_ext(file, exts=[".pkl"]):
+        function_lookup_table = FunctionLookupTable.from_pickle(file)
+        function_lookup_table.root_dir = root_dir
+    elif has_ext(file, exts=[".bin"]):
+        function_lookup_table = mapped.read_function_lookup_table(
+            file, root_dir=root_dir
+        )
+    elif has_ext(file, exts=[".db"]):
+        function_lookup_table = database.read_function_lookup_table(
+            file, root_dir=root_dir
+        )
+    else:
+        raise Exception(
+            f"Provided invalid function lookup file format, only {SUPPORTED_FORMATS} are currently supported."
+        )
+    return function_lookup_table
+
+
+def get_test_function_traces_fingerprint(file: Path) -> str:
+    """
+    Returns the fingerprint of persisted test function traces (i.e., the hash of their content),
+    which an inverted index built from the traces carries to be matched on loading.
+    CSV traces are loaded along with the test lookup file next to them, which therefore is part of the fingerprint.
+    """
+    fingerprint: str = hash_file(file, algo="sha1")
+    if has_ext(file, exts=[".csv"]) and (file.parent / TEST_LOOKUP_FILE).exists():
+        fingerprint += hash_file(file.parent / TEST_LOOKUP_FILE, algo="sha1")
+    return fingerprint
+
+
+def load_test_function_traces(
+    file: Path, load_index: bool = False
+) -> TestFunctionTraces:
+    test_function_traces: TestFunctionTraces
+    if has_ext(file, exts=[".csv"]):
+        test_function_traces = TestFunctionTraces.from_csv(
+            file,
+            (file.parent / TEST_LOOKUP_FILE)
+            if (file.parent / TEST_LOOKUP_FILE).exists()
+            else None,
+        )
+    elif has_ext(file, exts=[".pkl"]):
+        test_function_traces = TestFunctionTraces.from_pickle(file)
+    elif has_ext(file, exts=[".bin"]):
+        # memory-mapped traces already embed their inverted index
+        return mapped.read_test_function_traces(file)
+    elif has_ext(file, exts=[".db"]):
+        # the database resolves affected tests via its indexed edge table
+        return database.read_test_function_traces(file)
+    else:
+        raise Exception(
+            f"Provided invalid test traces file format, only {SUPPORTED_FORMATS} are currently supported."
+        )
+
+    if load_index:
+        # the inverted index (if created during conversion) spares us from scanning all traces when selecting tests
+        index_file: Path = file.parent / (
+            PICKLE_TEST_FUNCTION_INDEX_FILE
+            if has_ext(file, exts=[".pkl"])
+            else TEST_FUNCTION_INDEX_FILE
+        )
+        if index_file.exists():
+            logging.info(f"Loading test function index from {index_file}")
+            index: TestTraceIndex
+            if has_ext(index_file, exts=[".pkl"]):
+                index = TestTraceIndex.from_pickle(index_file)
+            else:
+                index = TestTraceIndex.from_csv(index_file)
+            # an index built from other traces (e.g., converted without `--index` afterwards) would miss tests
+            if index.traces_fingerprint == get_test_function_traces_fingerprint(file):
+                test_function_traces.index = index
+            else:
+                logging.warning(
+                    f"Ignoring test function index {index_file}, which was not built from the traces in {file}."
+                )
+    return test_function_traces
+
+
+def load_test_file_traces(file: Path) -> TestFileTraces:
+    test_file_traces: TestFileTraces
+    if has_ext(file, exts=[".csv"]):
+        test_file_traces = TestFileTraces.from_csv(file)
+    elif has_ext(file, exts=[".pkl"]):
+        test_file_traces = TestFileTraces.from_pickle(file)
+    elif has_ext(file, exts=[".db"]):
+        test_file_traces = database.read_test_file_traces(file)
+    else:
+        raise Exception(
+            "Provided invalid test file traces file format, only .csv, .pkl, and .db are currently supported."
+        )
+    return test_file_traces
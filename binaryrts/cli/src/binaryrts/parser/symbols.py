@@ -0,0 +1,185 @@
+"""
+Module containing an index of identifier tokens in C/C++ source files, which answers the call site lookups
+of the non-functional analysis without scanning the whole source tree for every changed symbol.
+
+The tokens of a file are persistently cached by the file's content (i.e., its git blob ID),
+such that re-building the index for another revision only tokenizes the files that changed in between.
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from binaryrts.parser.sourcecode import (
+    CSourceCodeParser,
+    CALL_SITE_SCAN_MIN_FILES_PER_PROCESS,
+)
+from binaryrts.util.cache import DiskCache
+from binaryrts.util.hash import hash_git_blob
+from binaryrts.util.io import split_lines
+from binaryrts.util.mp import imap_with_multi_processing, can_start_process_pool
+
+# bump to invalidate persistently cached tokens, e.g., when changing the tokenization
+SYMBOL_INDEX_CACHE_VERSION: int = 2
+
+FileTokens = Dict[str, List[int]]
+
+
+def tokenize(content: str) -> FileTokens:
+    """
+    Returns the (1-based) numbers of the lines each token occurs in.
+    Lines keep their line break, such that tokens at the end of a line are enclosed by a delimiter.
+    """
+    tokens: FileTokens = {}
+    # universal newlines, as when reading the file in text mode
+    lines: List[str] = split_lines(content.replace("\r\n", "\n").replace("\r", "\n"))
+    for idx, line in enumerate(lines):
+        for token in set(CSourceCodeParser.C_ENCLOSED_TOKEN_REGEX.findall(line)):
+            tokens.setdefault(token, []).append(idx + 1)
+    return tokens
+
+
+def _get_cache_key(blob_id: str) -> str:
+    return f"symbol-index:{SYMBOL_INDEX_CACHE_VERSION}:{blob_id}"
+
+
+def load_tokens(job: Tuple[Path, Optional[DiskCache]]) -> Optional[FileTokens]:
+    """
+    Returns the tokens of a file from the cache, or tokenizes and caches them.
+    Returns `None` if the file cannot be read.
+    """
+    file, disk_cache = job
+    try:
+        blob_id: Optional[str] = None
+        if disk_cache is not None:
+            blob_id = hash_git_blob(file)
+            cached_tokens: Optional[str] = disk_cache.get(_get_cache_key(blob_id))
+            if cached_tokens is not None:
+                return json.loads(cached_tokens)
+        tokens: FileTokens = tokenize(
+            file.read_bytes().decode("utf-8", errors="replace")
+        )
+        if blob_id is not None:
+            disk_cache.put(_get_cache_key(blob_id), json.dumps(tokens))
+        return tokens
+    except Exception as e:
+        logging.error(f"Could not index symbols in {file}: {e}")
+        return None
+
+
+class SymbolIndex:
+    """
+    Index from tokens to the lines they occur in for all C-like files below a root directory.
+    Call `refresh` to (re-)build the index for the current state of the files;
+    only files that were added or changed since the last refresh are tokenized again.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        disk_cache: Optional[DiskCache] = None,
+        n_processes: int = 1,
+    ) -> None:
+        self.root_dir = root_dir.absolute()
+        self.disk_cache = disk_cache
+        # number of processes for tokenizing files
+        self.n_processes = n_processes
+        # files in the order of walking the root directory, with their stats and tokens
+        self.files: Dict[Path, Tuple[Tuple[int, int], FileTokens]] = {}
+        # occurrences of queried symbols only, as those of all tokens would not fit into memory for large trees
+        self.occurrences: Dict[str, List[Tuple[Path, int]]] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def is_indexed(symbol_name: str) -> bool:
+        """
+        Only identifiers are single tokens that match literally, which can be looked up in the index.
+        """
+        return CSourceCodeParser.C_IDENTIFIER_REGEX.fullmatch(symbol_name) is not None
+
+    def refresh(self) -> None:
+        with self.lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        stat_keys: Dict[Path, Tuple[int, int]] = {}
+        for root, dirs, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                file: Path = Path(root) / filename
+                if not CSourceCodeParser.is_c_file(file):
+                    continue
+                try:
+                    stat: os.stat_result = file.stat()
+                except OSError as e:
+                    logging.error(f"Could not index symbols in {file}: {e}")
+                    continue
+                stat_keys[file] = (stat.st_mtime_ns, stat.st_size)
+        changed_files: List[Path] = [
+            file
+            for file, stat_key in stat_keys.items()
+            if file not in self.files or self.files[file][0] != stat_key
+        ]
+
+        # changed files are tokenized in parallel
+        n_processes: int = (
+            min(
+                self.n_processes,
+                len(changed_files) // CALL_SITE_SCAN_MIN_FILES_PER_PROCESS,
+            )
+            if can_start_process_pool()
+            else 1
+        )
+        jobs: List[Tuple[Path, Optional[DiskCache]]] = [
+            (file, self.disk_cache) for file in changed_files
+        ]
+        changed_tokens: Dict[Path, Optional[FileTokens]] = dict(
+            zip(
+                changed_files,
+                imap_with_multi_processing(
+                    load_tokens,
+                    jobs,
+                    n_cpu=n_processes,
+                    chunksize=CALL_SITE_SCAN_MIN_FILES_PER_PROCESS // 4,
+                )
+                if n_processes > 1
+                else map(load_tokens, jobs),
+            )
+        )
+
+        files: Dict[Path, Tuple[Tuple[int, int], FileTokens]] = {}
+        for file, stat_key in stat_keys.items():
+            if file in changed_tokens:
+                tokens: Optional[FileTokens] = changed_tokens[file]
+                if tokens is not None:
+                    files[file] = (stat_key, tokens)
+            else:
+                files[file] = self.files[file]
+        n_tokenized_files: int = len(changed_files)
+        if n_tokenized_files == 0 and files.keys() == self.files.keys():
+            return
+        self.files = files
+        self.occurrences = {}
+        logging.debug(
+            f"Indexed symbols of {len(self.files)} files in {self.root_dir}, "
+            f"tokenized {n_tokenized_files} added or changed files."
+        )
+
+    def find(self, symbol_name: str) -> List[Tuple[Path, int]]:
+        """
+        Returns the absolute file paths and line numbers of all occurrences of a symbol,
+        in the order of a line-by-line scan of the files.
+        """
+        with self.lock:
+            occurrences: Optional[List[Tuple[Path, int]]] = self.occurrences.get(
+                symbol_name
+            )
+            if occurrences is None:
+                occurrences = [
+                    (file, line_no)
+                    for file, (_, tokens) in self.files.items()
+                    for line_no in tokens.get(symbol_name, [])
+                ]
+                self.occurrences[symbol_name] = occurrences
+            return occurrences
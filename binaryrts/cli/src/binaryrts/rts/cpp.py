@@ -1,8 +1,12 @@
 import logging
 import re
+import threading
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple, Set, Dict, Any
+from typing import List, Optional, Tuple, Set, Dict, Any, Iterator, Generator
 
 from binaryrts.parser.coverage import (
     FunctionLookupTable,
@@ -12,16 +16,35 @@ from binaryrts.parser.coverage import (
 from binaryrts.parser.sourcecode import (
     FunctionDefinition,
     CSourceCodeParser,
+    NonFunctionalEntityDefinition,
     NonFunctionalCallAnalyzer,
     NonFunctionalCallSite,
 )
+from binaryrts.parser.symbols import SymbolIndex
 from binaryrts.rts.base import RTSAlgo, SelectionCause
-from binaryrts.rts.diff import CodeDiffAnalyzer
-from binaryrts.util.fs import temp_file, get_parent, has_ext
+from binaryrts.rts.diff import CodeDiffAnalyzer, FileDiff, DiffHunks, get_file_diff
+from binaryrts.util.cache import DiskCache
+from binaryrts.util.fs import temp_path, get_parent, has_ext
+from binaryrts.util.mp import imap_with_multi_processing, can_start_process_pool
 from binaryrts.vcs.base import Changelist, ChangelistItemAction, ChangelistItem
 from binaryrts.vcs.git import GitClient
 
 
+@dataclass()
+class ChangeAnalysis:
+    """
+    Analysis of the changes between two revisions that does not depend on the configuration of
+    the function-level selection (i.e., override and non-functional analyses), such that it is shared
+    by several configurations. It is only valid within `CppFunctionLevelRTS.analyze_changes`.
+    """
+
+    changelist: Changelist
+    file_revisions: Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]]
+    file_diffs: Dict[ChangelistItem, FileDiff]
+    parser: CSourceCodeParser
+    includes_non_functionals: bool
+
+
 class CppBaseRTS(RTSAlgo, ABC):
     def __init__(
         self,
@@ -178,6 +201,9 @@ class CppFunctionLevelRTS(CppBaseRTS):
         generated_code_exts: Optional[List[str]] = None,
         retest_all_regex: Optional[str] = None,
         file_level_regex: Optional[str] = None,
+        disk_cache: Optional[DiskCache] = None,
+        n_processes: int = 1,
+        symbol_indices: Optional[Dict[Path, SymbolIndex]] = None,
     ) -> None:
         super().__init__(
             function_lookup_table=function_lookup_table,
@@ -198,6 +224,24 @@ class CppFunctionLevelRTS(CppBaseRTS):
         self.virtual_analysis = virtual_analysis
         self.file_level_regex = file_level_regex
         self.use_cscope = use_cscope
+        self.disk_cache = disk_cache
+        # number of processes for diffing files, and threads for analyzing change items
+        self.n_processes = n_processes
+        # symbol indices by analysis root directory, which may be shared across selections;
+        # tokenizing a whole tree only pays off if the tokens outlive this selection,
+        # i.e., are cached persistently or kept by a long-running process, otherwise, symbols are searched directly
+        self.use_symbol_index: bool = (
+            disk_cache is not None or symbol_indices is not None
+        )
+        self.symbol_indices: Dict[Path, SymbolIndex] = (
+            symbol_indices if symbol_indices is not None else {}
+        )
+        # root directories whose index has been refreshed for the current selection
+        self.refreshed_symbol_indices: Set[Path] = set()
+        self.symbol_indices_lock: threading.Lock = threading.Lock()
+        # IDs of functions using a symbol by root directory and file, which are memoized per selection
+        self.non_functional_memo: Dict[str, Dict[Path, Dict[Path, Set[int]]]] = {}
+        self.non_functional_memo_lock: threading.Lock = threading.Lock()
 
     def _get_ids_of_affected_functions_for_file(
         self, affected_functions: List[FunctionDefinition], file: Optional[Path] = None
@@ -224,24 +268,158 @@ class CppFunctionLevelRTS(CppBaseRTS):
         )
         return function_ids
 
-    def _get_ids_of_affected_function_for_non_functional(
-        self, symbol_name: str, root_dir: Path, file_relative_to: Optional[Path] = None
+    def _get_symbol_index(self, root_dir: Path) -> SymbolIndex:
+        """
+        Returns the symbol index of a root directory, which is refreshed once per selection,
+        such that only files changed since a previous selection are tokenized again.
+        """
+        key: Path = root_dir.absolute()
+        with self.symbol_indices_lock:
+            symbol_index: Optional[SymbolIndex] = self.symbol_indices.get(key)
+            if symbol_index is None:
+                symbol_index = SymbolIndex(
+                    root_dir=key,
+                    disk_cache=self.disk_cache,
+                    n_processes=self.n_processes,
+                )
+                self.symbol_indices[key] = symbol_index
+            if key not in self.refreshed_symbol_indices:
+                symbol_index.refresh()
+                self.refreshed_symbol_indices.add(key)
+            return symbol_index
+
+    def _get_call_sites_of_non_functionals(
+        self,
+        symbol_names: List[str],
+        root_dir: Path,
+        file_relative_to: Optional[Path] = None,
+    ) -> Dict[str, List[NonFunctionalCallSite]]:
+        """
+        Identifiers are looked up in the symbol index if used, all other symbols are searched at once.
+        """
+        call_sites: Dict[str, List[NonFunctionalCallSite]] = {}
+        searched_symbol_names: List[str] = []
+        for symbol_name in symbol_names:
+            if (
+                self.use_symbol_index
+                and not self.use_cscope
+                and SymbolIndex.is_indexed(symbol_name)
+            ):
+                call_sites[symbol_name] = [
+                    NonFunctionalCallSite(
+                        path=(
+                            file.resolve().relative_to(file_relative_to.resolve())
+                            if file_relative_to
+                            else file.resolve()
+                        ),
+                        line_no=line_no,
+                    )
+                    for file, line_no in self._get_symbol_index(
+                        root_dir=root_dir
+                    ).find(symbol_name)
+                ]
+            else:
+                searched_symbol_names.append(symbol_name)
+        if len(searched_symbol_names) > 0:
+            call_analyzer: NonFunctionalCallAnalyzer = NonFunctionalCallAnalyzer(
+                root_dir=root_dir,
+                use_cscope=self.use_cscope,
+                n_processes=self.n_processes,
+                cscope_cache_dir=(
+                    self.disk_cache.get_dir("cscope")
+                    if self.disk_cache is not None
+                    else None
+                ),
+            )
+            call_sites.update(
+                call_analyzer.get_call_sites_of_symbols(
+                    symbol_names=searched_symbol_names,
+                    file_relative_to=file_relative_to,
+                )
+            )
+        return call_sites
+
+    def _get_memoized_ids_of_affected_functions(
+        self, symbol_name: str, root_dir: Path
+    ) -> Optional[Dict[Path, Set[int]]]:
+        """
+        Returns the IDs of functions using a symbol by file, if they are known for the root directory
+        or any directory containing it, of which only the files inside the root directory are taken over.
+        """
+        with self.non_functional_memo_lock:
+            memo_by_root_dir: Dict[
+                Path, Dict[Path, Set[int]]
+            ] = self.non_functional_memo.setdefault(symbol_name, {})
+            function_ids_by_file: Optional[Dict[Path, Set[int]]] = memo_by_root_dir.get(
+                root_dir
+            )
+            if function_ids_by_file is not None:
+                return function_ids_by_file
+            for memo_root_dir, memo_function_ids_by_file in memo_by_root_dir.items():
+                if memo_root_dir in root_dir.parents:
+                    function_ids_by_file = {
+                        file: function_ids
+                        for file, function_ids in memo_function_ids_by_file.items()
+                        if root_dir in file.parents
+                    }
+                    memo_by_root_dir[root_dir] = function_ids_by_file
+                    return function_ids_by_file
+        return None
+
+    def _get_ids_of_affected_functions_for_non_functionals(
+        self,
+        symbol_names: List[str],
+        root_dir: Path,
+        file_relative_to: Optional[Path] = None,
     ) -> Set[int]:
-        call_analyzer: NonFunctionalCallAnalyzer = NonFunctionalCallAnalyzer(
-            root_dir=root_dir, use_cscope=self.use_cscope
-        )
-        call_sites: List[NonFunctionalCallSite] = call_analyzer.get_call_sites(
-            symbol_name=symbol_name, file_relative_to=file_relative_to
-        )
+        """
+        Returns the IDs of all functions that use any of the symbols below the root directory.
+        Results are memoized per selection by root directory and symbol, such that
+        symbols of several changed files are only searched once below the same (or a containing) root directory.
+        """
+        resolved_root_dir: Path = root_dir.absolute().resolve()
         affected_function_ids: Set[int] = set()
-        for site in call_sites:
-            funcs: Optional[
-                List[CoveredFunction]
-            ] = self.function_lookup_table.find_functions_by_line(
-                file=site.path, line=site.line_no
+        missing_symbol_names: List[str] = []
+        for symbol_name in dict.fromkeys(symbol_names):
+            memoized_function_ids_by_file: Optional[
+                Dict[Path, Set[int]]
+            ] = self._get_memoized_ids_of_affected_functions(
+                symbol_name=symbol_name, root_dir=resolved_root_dir
             )
-            if funcs is not None and len(funcs) > 0:
-                affected_function_ids |= {func.identifier for func in funcs}
+            if memoized_function_ids_by_file is None:
+                missing_symbol_names.append(symbol_name)
+            else:
+                for function_ids in memoized_function_ids_by_file.values():
+                    affected_function_ids |= function_ids
+        if len(missing_symbol_names) == 0:
+            return affected_function_ids
+
+        for symbol_name, call_sites in self._get_call_sites_of_non_functionals(
+            symbol_names=missing_symbol_names,
+            root_dir=root_dir,
+            file_relative_to=file_relative_to,
+        ).items():
+            function_ids_by_file: Dict[Path, Set[int]] = {}
+            for site in call_sites:
+                funcs: Optional[
+                    List[CoveredFunction]
+                ] = self.function_lookup_table.find_functions_by_line(
+                    file=site.path, line=site.line_no
+                )
+                if funcs is not None and len(funcs) > 0:
+                    file: Path = (
+                        file_relative_to.resolve() / site.path
+                        if file_relative_to
+                        else site.path.resolve()
+                    )
+                    function_ids_by_file.setdefault(file, set()).update(
+                        func.identifier for func in funcs
+                    )
+                    affected_function_ids |= {func.identifier for func in funcs}
+            with self.non_functional_memo_lock:
+                self.non_functional_memo.setdefault(symbol_name, {})[
+                    resolved_root_dir
+                ] = function_ids_by_file
         return affected_function_ids
 
     def _mark_all_functions_as_affected(self, change_item: ChangelistItem) -> Set[str]:
@@ -260,209 +438,485 @@ class CppFunctionLevelRTS(CppBaseRTS):
             affected_function_ids |= {func.identifier for func in functions}
         return affected_function_ids
 
+    def _write_file_revisions(
+        self,
+        changelist: Changelist,
+        from_revision: str,
+        to_revision: str,
+        scratch_dir: Path,
+        diff_analyzer: CodeDiffAnalyzer,
+    ) -> Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]]:
+        """
+        Writes the old and new revision of all change items that require a code analysis to the scratch directory,
+        such that they can be parsed at once. Change items after the first retest-all trigger are never analyzed.
+        The contents are also kept in memory by the diff analyzer, which slices code from them.
+        """
+        file_revisions: Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]] = {}
+        # all file revisions are read from git at once
+        requests: List[Tuple[str, Path]] = []
+        files: List[Path] = []
+        for idx, change_item in enumerate(changelist.items):
+            if self.check_retest_all(item=change_item):
+                break
+            if self.check_generated_code(item=change_item) or self.check_file_excluded(
+                item=change_item
+            ):
+                continue
+            old_file: Optional[Path] = None
+            new_file: Optional[Path] = None
+            if change_item.action in [
+                ChangelistItemAction.DELETED,
+                ChangelistItemAction.MODIFIED,
+            ]:
+                old_file = scratch_dir / f"{idx}_old.cxx"
+                requests.append((from_revision, change_item.filepath))
+                files.append(old_file)
+            if change_item.action in [
+                ChangelistItemAction.ADDED,
+                ChangelistItemAction.MODIFIED,
+            ]:
+                new_file = scratch_dir / f"{idx}_new.cxx"
+                requests.append((to_revision, change_item.filepath))
+                files.append(new_file)
+            file_revisions[change_item] = (old_file, new_file)
+
+        for file, content in zip(
+            files, self.git_client.get_file_contents_at_revisions(requests=requests)
+        ):
+            with file.open("w+", newline="\n", encoding="utf-8") as fp:
+                fp.write(content)
+            diff_analyzer.add_file_content(file=file, content=content)
+        return file_revisions
+
+    def _include_non_functionals(self) -> bool:
+        return (
+            self.non_functional_analysis
+            or self.non_functional_retest_all
+            or bool(self.file_level_regex)
+        )
+
+    def _is_diff_based_on_revision(self, from_revision: str, to_revision: str) -> bool:
+        """
+        Returns True if the (three-dot) diff is based on the from revision itself, i.e., the from revision is
+        the merge base. Only then, the hunks of the diff refer to the old file revisions we analyze.
+        """
+        try:
+            merge_base: Optional[str] = self.git_client.get_merge_base(
+                from_revision=from_revision, to_revision=to_revision
+            )
+            return merge_base is not None and merge_base == self.git_client.rev_parse(
+                revision=from_revision
+            )
+        except Exception as e:
+            logging.debug(f"Failed to determine merge base: {e}")
+            return False
+
+    def _diff_file_revisions(
+        self,
+        file_revisions: Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]],
+        diff_analyzer: CodeDiffAnalyzer,
+        include_non_functionals: bool = False,
+        use_hunks: bool = False,
+    ) -> Dict[ChangelistItem, FileDiff]:
+        """
+        Diffs the revisions of all modified files, in parallel processes if configured.
+        If enabled, code that is not touched by the hunks of the diff is not compared.
+        """
+        modified_items: List[ChangelistItem] = [
+            change_item
+            for change_item in file_revisions.keys()
+            if change_item.action == ChangelistItemAction.MODIFIED
+        ]
+        hunks: Dict[ChangelistItem, Optional[DiffHunks]] = {
+            change_item: DiffHunks(hunks=change_item.hunks)
+            if use_hunks and change_item.hunks is not None
+            else None
+            for change_item in modified_items
+        }
+        if (
+            self.n_processes > 1
+            and len(modified_items) > 1
+            and can_start_process_pool()
+        ):
+            # every job only carries the cached data of its own file revisions
+            jobs: List[
+                Tuple[
+                    CodeDiffAnalyzer,
+                    Path,
+                    Path,
+                    bool,
+                    Optional[DiffHunks],
+                ]
+            ] = [
+                (
+                    diff_analyzer.copy_for_files(files=file_revisions[change_item]),
+                    *file_revisions[change_item],
+                    include_non_functionals,
+                    hunks[change_item],
+                )
+                for change_item in modified_items
+            ]
+            return dict(
+                zip(
+                    modified_items,
+                    imap_with_multi_processing(
+                        func=get_file_diff, iterable=jobs, n_cpu=self.n_processes
+                    ),
+                )
+            )
+        return {
+            change_item: diff_analyzer.get_file_diff(
+                *file_revisions[change_item],
+                include_non_functionals=include_non_functionals,
+                hunks=hunks[change_item],
+            )
+            for change_item in modified_items
+        }
+
     def select_tests(
         self,
         from_revision: str,
         to_revision: str,
     ) -> Tuple[Set[str], Set[str], Dict[str, List[Any]]]:
-        affected_function_ids: Set[int] = set()
+        with self.analyze_changes(
+            from_revision=from_revision, to_revision=to_revision
+        ) as change_analysis:
+            return self.select_tests_from_analysis(change_analysis=change_analysis)
+
+    @contextmanager
+    def analyze_changes(
+        self,
+        from_revision: str,
+        to_revision: str,
+        include_non_functionals: Optional[bool] = None,
+    ) -> Generator[ChangeAnalysis, None, None]:
+        """
+        Diffs and parses all changed files once. Non-functional entities are included if this selection
+        requires them, or if enabled explicitly, e.g., to share the analysis with other configurations.
+        The file revisions are kept in a scratch directory until the context is left.
+        """
+        if include_non_functionals is None:
+            include_non_functionals = self._include_non_functionals()
         changelist: Changelist = self.git_client.get_diff(
             from_revision=from_revision, to_revision=to_revision
         )
         # Note: We include function prototypes here, as when parsing for changed functions,
         # we must also consider changed function declarations, which will have keywords
         # such as `override` or `virtual` in their signature, as opposed to definitions.
-        parser: CSourceCodeParser = CSourceCodeParser(include_prototypes=True)
-        diff_analyzer: CodeDiffAnalyzer = CodeDiffAnalyzer(
-            parser=parser,
-            scope_analysis=self.scope_analysis,
-            overload_analysis=self.overload_analysis,
-            virtual_analysis=self.virtual_analysis,
+        # The in-memory cache is safe to use, as every file revision has its own path in the scratch directory.
+        parser: CSourceCodeParser = CSourceCodeParser(
+            include_prototypes=True, use_cache=True, disk_cache=self.disk_cache
         )
+        diff_analyzer: CodeDiffAnalyzer = CodeDiffAnalyzer(parser=parser)
+        with temp_path(change_dir=False) as scratch_dir:
+            file_revisions: Dict[
+                ChangelistItem, Tuple[Optional[Path], Optional[Path]]
+            ] = self._write_file_revisions(
+                changelist=changelist,
+                from_revision=from_revision,
+                to_revision=to_revision,
+                scratch_dir=Path(scratch_dir),
+                diff_analyzer=diff_analyzer,
+            )
+            # all file revisions are parsed by a single ctags process
+            parser.prefetch(
+                files=[
+                    file
+                    for revisions in file_revisions.values()
+                    for file in revisions
+                    if file is not None
+                ]
+            )
+            file_diffs: Dict[ChangelistItem, FileDiff] = self._diff_file_revisions(
+                file_revisions=file_revisions,
+                diff_analyzer=diff_analyzer,
+                include_non_functionals=include_non_functionals,
+                use_hunks=self._is_diff_based_on_revision(
+                    from_revision=from_revision, to_revision=to_revision
+                ),
+            )
+            yield ChangeAnalysis(
+                changelist=changelist,
+                file_revisions=file_revisions,
+                file_diffs=file_diffs,
+                parser=parser,
+                includes_non_functionals=include_non_functionals,
+            )
 
-        for change_item in changelist.items:
-            logging.debug(
-                f"Analyzing change item: {change_item.filepath} ({change_item.action})"
+    def select_tests_from_analysis(
+        self, change_analysis: ChangeAnalysis
+    ) -> Tuple[Set[str], Set[str], Dict[str, List[Any]]]:
+        """
+        Selects tests from a (possibly shared) change analysis, which must have been created
+        with the same file filters as this selection.
+        """
+        if (
+            self._include_non_functionals()
+            and not change_analysis.includes_non_functionals
+        ):
+            raise Exception(
+                "Change analysis lacks the non-functional entities required for selection."
             )
+        self.refreshed_symbol_indices.clear()
+        self.non_functional_memo.clear()
+        return self._select_tests_for_changelist(
+            changelist=change_analysis.changelist,
+            file_revisions=change_analysis.file_revisions,
+            file_diffs=change_analysis.file_diffs,
+            parser=change_analysis.parser,
+        )
 
-            if self.check_retest_all(item=change_item):
-                logging.debug(f"Triggering retest-all")
-                return self._retest_all(
-                    causes=[
-                        SelectionCause.RETEST_ALL_REGEX.value
-                        + f" {change_item.filepath}"
-                    ]
-                )
+    def _analyze_change_item(
+        self,
+        change_item: ChangelistItem,
+        file_revisions: Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]],
+        file_diffs: Dict[ChangelistItem, FileDiff],
+        parser: CSourceCodeParser,
+    ) -> Tuple[Set[int], Optional[str]]:
+        """
+        Returns the affected function IDs of a change item, or the cause if it triggers a retest-all.
+        """
+        logging.debug(
+            f"Analyzing change item: {change_item.filepath} ({change_item.action})"
+        )
+        affected_function_ids: Set[int] = set()
 
-            if self.check_generated_code(item=change_item):
-                logging.debug(f"Triggering generated-code handling")
-                functions: List[
-                    CoveredFunction
-                ] = self.function_lookup_table.find_functions_by_file_regex(
-                    file_regex=self.generated_code_regex
-                )
-                affected_function_ids |= {func.identifier for func in functions}
-                continue
+        if self.check_retest_all(item=change_item):
+            logging.debug(f"Triggering retest-all")
+            return (
+                affected_function_ids,
+                SelectionCause.RETEST_ALL_REGEX.value + f" {change_item.filepath}",
+            )
 
-            if self.check_file_excluded(item=change_item):
-                logging.debug(f"Triggering file excluded")
-                continue
+        if self.check_generated_code(item=change_item):
+            logging.debug(f"Triggering generated-code handling")
+            functions: List[
+                CoveredFunction
+            ] = self.function_lookup_table.find_functions_by_file_regex(
+                file_regex=self.generated_code_regex
+            )
+            affected_function_ids |= {func.identifier for func in functions}
+            return affected_function_ids, None
 
-            changed_functions: List[FunctionDefinition]
-            if change_item.action == ChangelistItemAction.ADDED:
-                with temp_file(suffix=".cxx") as new_file:
-                    with new_file.open("w+", newline="\n", encoding="utf-8") as n_fp:
-                        n_fp.write(
-                            self.git_client.get_file_content_at_revision(
-                                revision=to_revision, filepath=change_item.filepath
-                            )
+        if self.check_file_excluded(item=change_item):
+            logging.debug(f"Triggering file excluded")
+            return affected_function_ids, None
+
+        old_file, new_file = file_revisions[change_item]
+        changed_functions: List[FunctionDefinition]
+        if change_item.action == ChangelistItemAction.ADDED:
+            changed_functions = parser.get_functions(new_file)
+            affected_function_ids |= self._get_ids_of_affected_functions_for_file(
+                affected_functions=changed_functions, file=None
+            )
+            if self.non_functional_analysis or self.non_functional_retest_all:
+                non_func_entities: List[
+                    NonFunctionalEntityDefinition
+                ] = parser.get_non_functional_entities(new_file)
+                if len(non_func_entities) > 0:
+                    if self.non_functional_retest_all:
+                        return (
+                            affected_function_ids,
+                            SelectionCause.ADD_NON_FUNCTIONAL_FILE.value
+                            + f" {change_item.filepath}",
                         )
-                    changed_functions: List[FunctionDefinition] = parser.get_functions(
-                        new_file
-                    )
                     affected_function_ids |= (
-                        self._get_ids_of_affected_functions_for_file(
-                            affected_functions=changed_functions, file=None
+                        self._get_ids_of_affected_functions_for_non_functionals(
+                            symbol_names=[entity.name for entity in non_func_entities],
+                            root_dir=get_parent(
+                                change_item.filepath,
+                                depth=self.non_functional_analysis_depth,
+                            ),
+                            file_relative_to=self.git_client.root,
                         )
                     )
-                    if self.non_functional_analysis or self.non_functional_retest_all:
-                        for non_func_entity in parser.get_non_functional_entities(
-                            new_file
-                        ):
-                            if self.non_functional_retest_all:
-                                return self._retest_all(
-                                    causes=[
-                                        SelectionCause.ADD_NON_FUNCTIONAL_FILE.value
-                                        + f" {change_item.filepath}"
-                                    ]
-                                )
-                            affected_function_ids |= (
-                                self._get_ids_of_affected_function_for_non_functional(
-                                    symbol_name=non_func_entity.name,
-                                    root_dir=get_parent(
-                                        change_item.filepath,
-                                        depth=self.non_functional_analysis_depth,
-                                    ),
-                                    file_relative_to=self.git_client.root,
-                                )
-                            )
 
-            elif change_item.action == ChangelistItemAction.DELETED:
-                with temp_file(suffix=".cxx") as old_file:
-                    with old_file.open("w+", newline="\n", encoding="utf-8") as o_fp:
-                        o_fp.write(
-                            self.git_client.get_file_content_at_revision(
-                                revision=from_revision, filepath=change_item.filepath
-                            )
+        elif change_item.action == ChangelistItemAction.DELETED:
+            changed_functions = parser.get_functions(file=old_file)
+            affected_function_ids |= self._get_ids_of_affected_functions_for_file(
+                affected_functions=changed_functions,
+                file=change_item.filepath,
+            )
+            if self.non_functional_analysis or self.non_functional_retest_all:
+                non_func_entities: List[
+                    NonFunctionalEntityDefinition
+                ] = parser.get_non_functional_entities(old_file)
+                if len(non_func_entities) > 0:
+                    if self.non_functional_retest_all:
+                        return (
+                            affected_function_ids,
+                            SelectionCause.DELETE_NON_FUNCTIONAL_FILE.value
+                            + f" {change_item.filepath}",
+                        )
+                    affected_function_ids |= (
+                        self._get_ids_of_affected_functions_for_non_functionals(
+                            symbol_names=[entity.name for entity in non_func_entities],
+                            root_dir=get_parent(
+                                change_item.filepath,
+                                depth=self.non_functional_analysis_depth,
+                            ),
+                            file_relative_to=self.git_client.root,
                         )
-                    changed_functions: List[FunctionDefinition] = parser.get_functions(
-                        file=old_file
+                    )
+
+        elif change_item.action == ChangelistItemAction.MODIFIED:
+            file_diff: FileDiff = file_diffs[change_item]
+            for func, file in [
+                *file_diff.get_changed_functions(
+                    scope_analysis=self.scope_analysis,
+                    overload_analysis=self.overload_analysis,
+                    virtual_analysis=self.virtual_analysis,
+                ),
+                *file_diff.deleted_functions,
+            ]:
+                affected_function_ids |= self._get_ids_of_affected_functions_for_file(
+                    affected_functions=[func],
+                    file=None if file is None else change_item.filepath,
+                )
+
+            if len(file_diff.changed_non_functionals) > 0:
+                if self.non_functional_retest_all:
+                    return (
+                        affected_function_ids,
+                        SelectionCause.MODIFY_NON_FUNCTIONAL_FILE.value
+                        + f" {change_item.filepath}",
+                    )
+
+                if self.file_level_regex:
+                    affected_function_ids |= self._mark_all_functions_as_affected(
+                        change_item=change_item
+                    )
+
+                if self.non_functional_analysis:
+                    analysis_root_dir: Path = get_parent(
+                        change_item.filepath,
+                        depth=self.non_functional_analysis_depth,
+                    )
+                    logging.info(
+                        f"Macro analysis in {analysis_root_dir} with git repo {self.git_client.root}"
                     )
                     affected_function_ids |= (
-                        self._get_ids_of_affected_functions_for_file(
-                            affected_functions=changed_functions,
-                            file=change_item.filepath,
+                        self._get_ids_of_affected_functions_for_non_functionals(
+                            symbol_names=[
+                                non_func.name
+                                for non_func, _ in file_diff.changed_non_functionals
+                            ],
+                            root_dir=analysis_root_dir,
+                            file_relative_to=self.git_client.root,
                         )
                     )
-                    if self.non_functional_analysis or self.non_functional_retest_all:
-                        for non_func_entity in parser.get_non_functional_entities(
-                            old_file
-                        ):
-                            if self.non_functional_retest_all:
-                                return self._retest_all(
-                                    causes=[
-                                        SelectionCause.DELETE_NON_FUNCTIONAL_FILE.value
-                                        + f" {change_item.filepath}"
-                                    ]
-                                )
-                            affected_function_ids |= (
-                                self._get_ids_of_affected_function_for_non_functional(
-                                    symbol_name=non_func_entity.name,
-                                    root_dir=get_parent(
-                                        change_item.filepath,
-                                        depth=self.non_functional_analysis_depth,
-                                    ),
-                                    file_relative_to=self.git_client.root,
-                                )
-                            )
-
-            elif change_item.action == ChangelistItemAction.MODIFIED:
-                with temp_file(suffix=".cxx") as new_file:
-                    with temp_file(suffix=".cxx") as old_file:
-                        with new_file.open(
-                            "w+", newline="\n", encoding="utf-8"
-                        ) as n_fp:
-                            n_fp.write(
-                                self.git_client.get_file_content_at_revision(
-                                    revision=to_revision, filepath=change_item.filepath
-                                )
-                            )
-                        with old_file.open(
-                            "w+", newline="\n", encoding="utf-8"
-                        ) as o_fp:
-                            o_fp.write(
-                                self.git_client.get_file_content_at_revision(
-                                    revision=from_revision,
-                                    filepath=change_item.filepath,
-                                )
-                            )
-                        for func, file in [
-                            *diff_analyzer.get_changed_or_newly_overridden_functions(
-                                old_revision=old_file, new_revision=new_file
-                            ),
-                            *diff_analyzer.get_deleted_functions(
-                                old_revision=old_file, new_revision=new_file
-                            ),
-                        ]:
-                            affected_function_ids |= (
-                                self._get_ids_of_affected_functions_for_file(
-                                    affected_functions=[func],
-                                    file=None if file is None else change_item.filepath,
-                                )
-                            )
-
-                        if (
-                            self.non_functional_analysis
-                            or self.non_functional_retest_all
-                            or self.file_level_regex
-                        ):
-                            is_first_entity: bool = True
-                            for (
-                                non_func,
-                                file,
-                            ) in diff_analyzer.get_changed_non_functional_entities(
-                                old_revision=old_file, new_revision=new_file
-                            ):
-                                if self.non_functional_retest_all:
-                                    return self._retest_all(
-                                        causes=[
-                                            SelectionCause.MODIFY_NON_FUNCTIONAL_FILE.value
-                                            + f" {change_item.filepath}"
-                                        ]
-                                    )
-
-                                # we only want to mark functions as affected once
-                                if is_first_entity and self.file_level_regex:
-                                    affected_function_ids |= (
-                                        self._mark_all_functions_as_affected(
-                                            change_item=change_item
-                                        )
-                                    )
-                                is_first_entity = False
-
-                                if self.non_functional_analysis:
-                                    analysis_root_dir: Path = get_parent(
-                                        change_item.filepath,
-                                        depth=self.non_functional_analysis_depth,
-                                    )
-                                    logging.info(
-                                        f"Macro analysis in {analysis_root_dir} with git repo {self.git_client.root}"
-                                    )
-                                    affected_function_ids |= self._get_ids_of_affected_function_for_non_functional(
-                                        symbol_name=non_func.name,
-                                        root_dir=analysis_root_dir,
-                                        file_relative_to=self.git_client.root,
-                                    )
+
+        return affected_function_ids, None
+
+    def _prefetch_non_functional_call_sites(
+        self,
+        change_items: List[ChangelistItem],
+        file_revisions: Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]],
+        file_diffs: Dict[ChangelistItem, FileDiff],
+        parser: CSourceCodeParser,
+    ) -> None:
+        """
+        Searches the call sites of all non-functional entities of the changelist at once per analysis root directory,
+        which memoizes them for the analysis of the single change items. This runs before change items are
+        analyzed by threads, such that the search may use processes, which must not be forked from threads.
+        """
+        if not self.non_functional_analysis or self.non_functional_retest_all:
+            return
+        symbol_names_by_root_dir: Dict[Path, List[str]] = {}
+        for change_item in change_items:
+            if change_item not in file_revisions:
+                continue
+            old_file, new_file = file_revisions[change_item]
+            symbol_names: List[str] = []
+            if change_item.action == ChangelistItemAction.ADDED:
+                symbol_names = [
+                    entity.name
+                    for entity in parser.get_non_functional_entities(new_file)
+                ]
+            elif change_item.action == ChangelistItemAction.DELETED:
+                symbol_names = [
+                    entity.name
+                    for entity in parser.get_non_functional_entities(old_file)
+                ]
+            elif change_item in file_diffs:
+                symbol_names = [
+                    non_func.name
+                    for non_func, _ in file_diffs[change_item].changed_non_functionals
+                ]
+            if len(symbol_names) > 0:
+                symbol_names_by_root_dir.setdefault(
+                    get_parent(
+                        change_item.filepath, depth=self.non_functional_analysis_depth
+                    ),
+                    [],
+                ).extend(symbol_names)
+        for root_dir, symbol_names in symbol_names_by_root_dir.items():
+            self._get_ids_of_affected_functions_for_non_functionals(
+                symbol_names=symbol_names,
+                root_dir=root_dir,
+                file_relative_to=self.git_client.root,
+            )
+
+    def _select_tests_for_changelist(
+        self,
+        changelist: Changelist,
+        file_revisions: Dict[ChangelistItem, Tuple[Optional[Path], Optional[Path]]],
+        file_diffs: Dict[ChangelistItem, FileDiff],
+        parser: CSourceCodeParser,
+    ) -> Tuple[Set[str], Set[str], Dict[str, List[Any]]]:
+        affected_function_ids: Set[int] = set()
+
+        def analyze_change_item(
+            change_item: ChangelistItem,
+        ) -> Tuple[Set[int], Optional[str]]:
+            return self._analyze_change_item(
+                change_item=change_item,
+                file_revisions=file_revisions,
+                file_diffs=file_diffs,
+                parser=parser,
+            )
+
+        # change items after the first retest-all trigger are never analyzed
+        change_items: List[ChangelistItem] = []
+        for change_item in changelist.items:
+            change_items.append(change_item)
+            if self.check_retest_all(item=change_item):
+                break
+
+        self._prefetch_non_functional_call_sites(
+            change_items=change_items,
+            file_revisions=file_revisions,
+            file_diffs=file_diffs,
+            parser=parser,
+        )
+
+        # Change items are analyzed concurrently if configured, as the lookups of non-functional call sites
+        # are mostly I/O; results are merged in the order of the changelist,
+        # such that the first change item triggering a retest-all determines the selection cause.
+        results: Iterator[Tuple[Set[int], Optional[str]]]
+        executor: Optional[ThreadPoolExecutor] = None
+        futures: List[Future] = []
+        if self.n_processes > 1 and len(change_items) > 1:
+            executor = ThreadPoolExecutor(max_workers=self.n_processes)
+            futures = [
+                executor.submit(analyze_change_item, change_item)
+                for change_item in change_items
+            ]
+            results = (future.result() for future in futures)
+        else:
+            results = map(analyze_change_item, change_items)
+
+        try:
+            for item_function_ids, retest_all_cause in results:
+                if retest_all_cause is not None:
+                    return self._retest_all(causes=[retest_all_cause])
+                affected_function_ids |= item_function_ids
+        finally:
+            if executor is not None:
+                # pending analyses are obsolete in case of a retest-all or failure
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=True)
 
         logging.debug(
             f"Selecting tests with {len(affected_function_ids)} affected function IDs"
@@ -1,11 +1,118 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Iterable, Tuple, List, Dict
+from typing import Optional, Iterable, Tuple, List, Dict, Set
 
 from binaryrts.parser.sourcecode import (
     FunctionDefinition,
     CSourceCodeParser,
     NonFunctionalEntityDefinition,
 )
+from binaryrts.util.hash import hash_string
+from binaryrts.util.io import split_lines
+from binaryrts.vcs.base import Hunk
+
+LineRange = Tuple[int, int]
+
+
+class DiffHunks:
+    """
+    Hunks of a diff without context lines, to check if code is unchanged without comparing it.
+    Line numbers must refer to the diffed file revisions.
+    """
+
+    def __init__(self, hunks: Iterable[Hunk]) -> None:
+        # old line spans of hunks in half-lines, where a pure insertion lies between two old lines
+        self.spans: List[Tuple[int, int]] = []
+        # line offsets from old to new revision in front of each hunk
+        self.offsets: List[int] = [0]
+        for old_start, old_count, _, new_count in sorted(hunks):
+            if old_count == 0:
+                self.spans.append((2 * old_start + 1, 2 * old_start + 1))
+            else:
+                self.spans.append((2 * old_start, 2 * (old_start + old_count - 1)))
+            self.offsets.append(self.offsets[-1] + new_count - old_count)
+        self.span_ends: List[int] = [end for _, end in self.spans]
+
+    def is_unchanged(self, old_range: LineRange, new_range: LineRange) -> bool:
+        """
+        Returns True if no hunk touches the old line range and the old range is moved exactly onto the new range,
+        i.e., both ranges hold the same lines.
+        """
+        start, end = old_range
+        idx: int = bisect_left(self.span_ends, 2 * start)
+        if idx < len(self.spans) and self.spans[idx][0] <= 2 * end:
+            return False
+        offset: int = self.offsets[idx]
+        return new_range == (start + offset, end + offset)
+
+
+@dataclass()
+class FunctionChange:
+    """
+    A function of the new revision that is changed or newly added, along with the functions it may override,
+    independent of which override analyses are enabled.
+    """
+
+    function: FunctionDefinition
+    is_changed: bool
+    # functions with a similar name, which a newly added function may overload
+    overload_candidate: Optional[FunctionDefinition] = None
+    # functions of any class, which a newly added "virtual"/"override" function may override
+    virtual_candidate: Optional[FunctionDefinition] = None
+    # functions from an outer scope, which a newly added member or namespace local function may override
+    scope_candidate: Optional[FunctionDefinition] = None
+
+    def get_affected_functions(
+        self,
+        file: Path,
+        scope_analysis: bool = False,
+        overload_analysis: bool = False,
+        virtual_analysis: bool = False,
+    ) -> Iterable[Tuple[FunctionDefinition, Optional[Path]]]:
+        if self.is_changed:
+            yield self.function, file
+        if overload_analysis and self.overload_candidate is not None:
+            # limited to the current file, see `CodeDiffAnalyzer.get_function_changes`
+            yield self.overload_candidate, file
+        if virtual_analysis and self.virtual_candidate is not None:
+            yield self.virtual_candidate, None
+        elif scope_analysis and self.scope_candidate is not None:
+            yield self.scope_candidate, None
+
+
+@dataclass()
+class FileDiff:
+    """
+    Result of diffing the old and new revision of a file, where each entity is paired with
+    the file it is limited to (if any), as yielded by the `CodeDiffAnalyzer`.
+    The function changes do not depend on the enabled override analyses,
+    such that one diff serves any analysis configuration.
+    """
+
+    new_revision: Path
+    function_changes: List[FunctionChange]
+    deleted_functions: List[Tuple[FunctionDefinition, Optional[Path]]]
+    changed_non_functionals: List[
+        Tuple[NonFunctionalEntityDefinition, Optional[Path]]
+    ] = field(default_factory=list)
+
+    def get_changed_functions(
+        self,
+        scope_analysis: bool = False,
+        overload_analysis: bool = False,
+        virtual_analysis: bool = False,
+    ) -> List[Tuple[FunctionDefinition, Optional[Path]]]:
+        return [
+            affected_function
+            for function_change in self.function_changes
+            for affected_function in function_change.get_affected_functions(
+                file=self.new_revision,
+                scope_analysis=scope_analysis,
+                overload_analysis=overload_analysis,
+                virtual_analysis=virtual_analysis,
+            )
+        ]
 
 
 class CodeDiffAnalyzer:
@@ -18,6 +125,10 @@ class CodeDiffAnalyzer:
     ) -> None:
         self.parser = parser
         self.function_cache: Dict[Path, List[FunctionDefinition]] = {}
+        # lines of analyzed files, such that code is sliced without re-reading files
+        self.lines_cache: Dict[Path, List[str]] = {}
+        # fingerprints of normalized code by file and line range, such that code is only normalized once
+        self.fingerprint_cache: Dict[Tuple[Path, int, int], str] = {}
         self.scope_analysis = scope_analysis
         self.overload_analysis = overload_analysis
         self.virtual_analysis = virtual_analysis
@@ -30,52 +141,235 @@ class CodeDiffAnalyzer:
         self.function_cache[filepath] = functions
         return functions
 
+    def add_file_content(self, file: Path, content: str) -> None:
+        """
+        Registers the in-memory content of a file, which is then never read from disk for slicing code.
+        """
+        self.lines_cache[file.absolute()] = split_lines(content)
+
+    def _get_lines(self, file: Path) -> List[str]:
+        filepath: Path = file.absolute()
+        if filepath not in self.lines_cache:
+            with filepath.open(mode="r", encoding="utf-8", errors="replace") as fp:
+                self.lines_cache[filepath] = split_lines(fp.read())
+        return self.lines_cache[filepath]
+
+    def _get_raw_code(self, file: Path, start: int, end: int) -> str:
+        return self.parser.get_raw_code_from_lines(
+            lines=self._get_lines(file=file), start=start, end=end
+        )
+
+    def _get_fingerprint(self, file: Path, start: int, end: int) -> str:
+        key: Tuple[Path, int, int] = (file.absolute(), start, end)
+        if key not in self.fingerprint_cache:
+            self._prefetch_fingerprints(file=file, line_ranges=[(start, end)])
+        return self.fingerprint_cache[key]
+
+    def _prefetch_fingerprints(self, file: Path, line_ranges: List[LineRange]) -> None:
+        """
+        Normalizes the code of all line ranges of a file at once, which are not fingerprinted yet.
+        """
+        filepath: Path = file.absolute()
+        missing_ranges: List[LineRange] = [
+            line_range
+            for line_range in dict.fromkeys(line_ranges)
+            if (filepath, *line_range) not in self.fingerprint_cache
+        ]
+        if len(missing_ranges) == 0:
+            return
+        for line_range, raw_code in zip(
+            missing_ranges,
+            self.parser.get_raw_codes_from_lines(
+                lines=self._get_lines(file=file), line_ranges=missing_ranges
+            ),
+        ):
+            self.fingerprint_cache[(filepath, *line_range)] = hash_string(raw_code)
+
+    def _prefetch_compared_code(
+        self,
+        old_revision: Path,
+        new_revision: Path,
+        compared_ranges: List[Tuple[LineRange, LineRange]],
+        hunks: Optional[DiffHunks] = None,
+    ) -> None:
+        """
+        Fingerprints the code of both revisions that needs to be compared, i.e., is touched by the diff hunks.
+        """
+        compared_ranges = [
+            (old_range, new_range)
+            for old_range, new_range in compared_ranges
+            if hunks is None
+            or not hunks.is_unchanged(old_range=old_range, new_range=new_range)
+        ]
+        self._prefetch_fingerprints(
+            file=old_revision,
+            line_ranges=[old_range for old_range, _ in compared_ranges],
+        )
+        self._prefetch_fingerprints(
+            file=new_revision,
+            line_ranges=[new_range for _, new_range in compared_ranges],
+        )
+
+    def copy_for_files(self, files: Iterable[Path]) -> "CodeDiffAnalyzer":
+        """
+        Returns an analyzer with the same configuration that only holds the cached data of the given files,
+        which is cheap to pass to another process.
+        """
+        files = list(files)
+        analyzer: CodeDiffAnalyzer = CodeDiffAnalyzer(
+            parser=self.parser.copy_for_files(files=files),
+            scope_analysis=self.scope_analysis,
+            overload_analysis=self.overload_analysis,
+            virtual_analysis=self.virtual_analysis,
+        )
+        for file in files:
+            filepath: Path = file.absolute()
+            if filepath in self.function_cache:
+                analyzer.function_cache[filepath] = self.function_cache[filepath]
+            if filepath in self.lines_cache:
+                analyzer.lines_cache[filepath] = self.lines_cache[filepath]
+        return analyzer
+
+    def get_file_diff(
+        self,
+        old_revision: Path,
+        new_revision: Path,
+        include_non_functionals: bool = False,
+        hunks: Optional[DiffHunks] = None,
+    ) -> FileDiff:
+        return FileDiff(
+            new_revision=new_revision,
+            function_changes=list(
+                self.get_function_changes(
+                    old_revision=old_revision,
+                    new_revision=new_revision,
+                    hunks=hunks,
+                )
+            ),
+            deleted_functions=list(
+                self.get_deleted_functions(
+                    old_revision=old_revision, new_revision=new_revision
+                )
+            ),
+            changed_non_functionals=list(
+                self.get_changed_non_functional_entities(
+                    old_revision=old_revision,
+                    new_revision=new_revision,
+                    hunks=hunks,
+                )
+            )
+            if include_non_functionals
+            else [],
+        )
+
+    def _is_code_changed(
+        self,
+        old_revision: Path,
+        old_range: LineRange,
+        new_revision: Path,
+        new_range: LineRange,
+        hunks: Optional[DiffHunks] = None,
+    ) -> bool:
+        if hunks is not None and hunks.is_unchanged(
+            old_range=old_range, new_range=new_range
+        ):
+            return False
+        return self._get_fingerprint(
+            new_revision, *new_range
+        ) != self._get_fingerprint(old_revision, *old_range)
+
     def get_changed_or_newly_overridden_functions(
-        self, old_revision: Path, new_revision: Path
+        self,
+        old_revision: Path,
+        new_revision: Path,
+        hunks: Optional[DiffHunks] = None,
     ) -> Iterable[Tuple[FunctionDefinition, Optional[Path]]]:
+        """
+        If the diff hunks are given, functions whose code is not touched by them are unchanged without comparing code.
+        """
+        for function_change in self.get_function_changes(
+            old_revision=old_revision, new_revision=new_revision, hunks=hunks
+        ):
+            yield from function_change.get_affected_functions(
+                file=new_revision,
+                scope_analysis=self.scope_analysis,
+                overload_analysis=self.overload_analysis,
+                virtual_analysis=self.virtual_analysis,
+            )
+
+    def get_function_changes(
+        self,
+        old_revision: Path,
+        new_revision: Path,
+        hunks: Optional[DiffHunks] = None,
+    ) -> Iterable[FunctionChange]:
+        """
+        Yields all changed or newly added functions of the new revision with their override candidates,
+        regardless of the analyses enabled for this analyzer.
+        """
         old_functions: List[FunctionDefinition] = self._get_functions(file=old_revision)
         new_functions: List[FunctionDefinition] = self._get_functions(file=new_revision)
-        # (1) find all modified functions
+        # (1) find all modified functions;
+        # if identifiers are ambiguous, the first old function is matched
+        old_functions_by_identifier: Dict[str, FunctionDefinition] = {}
+        for old_func in old_functions:
+            old_functions_by_identifier.setdefault(old_func.identifier, old_func)
+        # the code of all matching functions is compared, which is normalized at once per revision
+        compared_ranges: List[Tuple[LineRange, LineRange]] = []
+        for new_func in new_functions:
+            if new_func.identifier in old_functions_by_identifier:
+                old_func: FunctionDefinition = old_functions_by_identifier[
+                    new_func.identifier
+                ]
+                compared_ranges.append(
+                    (
+                        (old_func.start_line, old_func.end_line),
+                        (new_func.start_line, new_func.end_line),
+                    )
+                )
+        self._prefetch_compared_code(
+            old_revision=old_revision,
+            new_revision=new_revision,
+            compared_ranges=compared_ranges,
+            hunks=hunks,
+        )
         for new_func in new_functions:
             found: bool = False
-            new_function_string: str = self.parser.get_raw_code(
-                file=new_revision,
-                start=new_func.start_line,
-                end=new_func.end_line,
+            is_changed: bool = False
+            matching_old_func: Optional[
+                FunctionDefinition
+            ] = old_functions_by_identifier.get(new_func.identifier)
+            if matching_old_func is not None:
+                is_changed = self._is_code_changed(
+                    old_revision=old_revision,
+                    old_range=(matching_old_func.start_line, matching_old_func.end_line),
+                    new_revision=new_revision,
+                    new_range=(new_func.start_line, new_func.end_line),
+                    hunks=hunks,
+                )
+                # a changed prototype covers the case where a "virtual" or "override" keyword is added to an
+                # existing function prototype; this case is handled by (3) then
+                found = not (new_func.is_prototype and is_changed)
+            if found and not is_changed:
+                continue
+            function_change: FunctionChange = FunctionChange(
+                function=new_func, is_changed=is_changed and not new_func.is_prototype
             )
-            for old_func in old_functions:
-                if new_func.identifier == old_func.identifier:
-                    old_function_string: str = self.parser.get_raw_code(
-                        file=old_revision,
-                        start=old_func.start_line,
-                        end=old_func.end_line,
-                    )
-                    if (
-                        not new_func.is_prototype
-                        and new_function_string != old_function_string
-                    ):
-                        yield new_func, new_revision
-                    elif (
-                        new_func.is_prototype
-                        and new_function_string != old_function_string
-                    ):
-                        # this covers the case where a "virtual" or "override" keyword is added to an existing
-                        # function prototype; this case is handled by (3) then
-                        break
-                    found = True
-                    break
 
             # (2) find newly added functions that may override a function with similar name;
             # E.g., if type `B` extends `A` and `void foo(A& a)` exists, adding `void foo(B& b)` will
             # lead to the new function being called for objects of type `B`.
             if (
-                self.overload_analysis
-                and not found
+                not found
                 and not new_func.is_prototype
                 and new_func.has_parameters
                 and not new_func.is_test_function
             ):
-                tmp_func: FunctionDefinition = FunctionDefinition(
+                # this will query only by function name wildcard and disregard class or namespace
+                # since this could potentially lead to many functions being marked as affected,
+                # such as setter functions like `setName(...)`,
+                # we limit this analysis to the current file, by returning `new_revision`
+                function_change.overload_candidate = FunctionDefinition(
                     file=new_func.file,
                     signature=new_func.raw_function_name
                     + "*",  # remove signature and add wildcard '*' char
@@ -85,23 +379,17 @@ class CodeDiffAnalyzer:
                     namespace=None,
                     properties=new_func.properties,
                 )
-                # this will query only by function name wildcard and disregard class or namespace
-                # since this could potentially lead to many functions being marked as affected,
-                # such as setter functions like `setName(...)`,
-                # we limit this analysis to the current file, by returning `new_revision`
-                yield tmp_func, new_revision
 
             # (3) find newly added "virtual"/"override" functions
             if (
-                self.virtual_analysis
-                and not found
+                not found
                 and new_func.properties
                 and (
                     "virtual" in new_func.properties
                     or "override" in new_func.properties
                 )
             ):
-                tmp_func: FunctionDefinition = FunctionDefinition(
+                function_change.virtual_candidate = FunctionDefinition(
                     file=new_func.file,
                     signature=new_func.signature,
                     class_name="*",  # this will cause to find all functions with *any* class
@@ -110,17 +398,16 @@ class CodeDiffAnalyzer:
                     namespace=None,
                     properties=new_func.properties,
                 )
-                yield tmp_func, None
 
             # (4) find newly added member or namespace local functions that may override a function from an outer scope
             # Note: Use with care; this can be expensive, as all functions with the same name are marked as affected.
-            elif (
-                self.scope_analysis
-                and not found
+            if (
+                not found
                 and (new_func.class_name is not None or new_func.namespace is not None)
                 and not new_func.is_prototype
             ):
-                tmp_func: FunctionDefinition = FunctionDefinition(
+                # this will query only by function name and disregard class or namespace
+                function_change.scope_candidate = FunctionDefinition(
                     file=new_func.file,
                     signature=new_func.signature,
                     start_line=new_func.start_line,
@@ -129,8 +416,7 @@ class CodeDiffAnalyzer:
                     namespace=None,
                     properties=new_func.properties,
                 )
-                # this will query only by function name and disregard class or namespace
-                yield tmp_func, None
+            yield function_change
 
     def get_deleted_functions(
         self, old_revision: Path, new_revision: Path
@@ -139,17 +425,16 @@ class CodeDiffAnalyzer:
         old_functions: List[FunctionDefinition] = self._get_functions(file=old_revision)
         new_functions: List[FunctionDefinition] = self._get_functions(file=new_revision)
 
+        new_identifiers: Set[str] = {new_func.identifier for new_func in new_functions}
         for old_func in old_functions:
-            found: bool = False
-            for new_func in new_functions:
-                if old_func.identifier == new_func.identifier:
-                    found = True
-                    break
-            if not found:
+            if old_func.identifier not in new_identifiers:
                 yield old_func, new_revision
 
     def get_changed_non_functional_entities(
-        self, old_revision: Path, new_revision: Path
+        self,
+        old_revision: Path,
+        new_revision: Path,
+        hunks: Optional[DiffHunks] = None,
     ) -> Iterable[Tuple[NonFunctionalEntityDefinition, Optional[Path]]]:
         old_non_functionals: List[
             NonFunctionalEntityDefinition
@@ -158,36 +443,78 @@ class CodeDiffAnalyzer:
             NonFunctionalEntityDefinition
         ] = self.parser.get_non_functional_entities(file=new_revision)
 
+        old_non_functionals_by_name: Dict[str, NonFunctionalEntityDefinition] = {}
+        for old_non_func in old_non_functionals:
+            old_non_functionals_by_name.setdefault(old_non_func.name, old_non_func)
+        compared_ranges: List[Tuple[LineRange, LineRange]] = []
         for new_non_func in new_non_functionals:
-            found: bool = False
-            new_code_string: str = self.parser.get_raw_code(
-                file=new_revision,
-                start=new_non_func.start_line,
-                end=new_non_func.end_line,
-            )
-            for old_non_func in old_non_functionals:
-                if new_non_func.name == old_non_func.name:
-                    old_code_string: str = self.parser.get_raw_code(
-                        file=old_revision,
-                        start=old_non_func.start_line,
-                        end=old_non_func.end_line,
+            if new_non_func.name in old_non_functionals_by_name:
+                old_non_func: NonFunctionalEntityDefinition = (
+                    old_non_functionals_by_name[new_non_func.name]
+                )
+                compared_ranges.append(
+                    (
+                        (old_non_func.start_line, old_non_func.end_line),
+                        (new_non_func.start_line, new_non_func.end_line),
                     )
-                    # modified non-functionals
-                    if new_code_string != old_code_string:
-                        yield new_non_func, new_revision
-                    found = True
-                    break
+                )
+        self._prefetch_compared_code(
+            old_revision=old_revision,
+            new_revision=new_revision,
+            compared_ranges=compared_ranges,
+            hunks=hunks,
+        )
+        for new_non_func in new_non_functionals:
+            matching_old_non_func: Optional[
+                NonFunctionalEntityDefinition
+            ] = old_non_functionals_by_name.get(new_non_func.name)
+            # modified non-functionals
+            if matching_old_non_func is not None:
+                if self._is_code_changed(
+                    old_revision=old_revision,
+                    old_range=(
+                        matching_old_non_func.start_line,
+                        matching_old_non_func.end_line,
+                    ),
+                    new_revision=new_revision,
+                    new_range=(new_non_func.start_line, new_non_func.end_line),
+                    hunks=hunks,
+                ):
+                    yield new_non_func, new_revision
 
             # added non-functionals
-            if not found:
+            else:
                 yield new_non_func, new_revision
 
         # deleted non-functionals
+        new_names: Set[str] = {new_non_func.name for new_non_func in new_non_functionals}
         for old_non_func in old_non_functionals:
-            found: bool = False
-            for new_non_func in new_non_functionals:
-                if old_non_func.name == new_non_func.name:
-                    found = True
-                    break
-            if not found:
+            if old_non_func.name not in new_names:
                 yield old_non_func, new_revision
+
+
+def get_file_diff(
+    job: Tuple[
+        CodeDiffAnalyzer,
+        Path,
+        Path,
+        bool,
+        Optional[DiffHunks],
+    ]
+) -> FileDiff:
+    """
+    Picklable entry point to diff a file in another process.
+    """
+    (
+        analyzer,
+        old_revision,
+        new_revision,
+        include_non_functionals,
+        hunks,
+    ) = job
+    return analyzer.get_file_diff(
+        old_revision=old_revision,
+        new_revision=new_revision,
+        include_non_functionals=include_non_functionals,
+        hunks=hunks,
+    )
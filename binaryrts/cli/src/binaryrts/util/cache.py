@@ -0,0 +1,116 @@
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+from binaryrts.util.hash import hash_string
+
+# 1 GiB by default
+DEFAULT_MAX_CACHE_SIZE: int = 1024 * 1024 * 1024
+# when evicting, we free some headroom to not evict on every subsequent write
+EVICTION_TARGET_RATIO: float = 0.9
+# directory for data that is managed by its users instead of the cache (see `DiskCache.get_dir`)
+MANAGED_DIRS_NAME: str = "managed"
+
+
+class DiskCache:
+    """
+    Content-addressed cache on disk, which is shared between CLI invocations (and concurrent processes).
+    Entries are stored in files named by the hash of their key, sharded by the first two hex characters:
+
+    cache_dir/
+        ab/
+            ab3f...
+        cd/
+            cd01...
+        managed/
+            ...
+
+    The cache is bounded in size; once exceeded, the least recently used entries
+    (by modification time, which is refreshed on every hit) are evicted.
+    """
+
+    def __init__(self, root: Path, max_size: int = DEFAULT_MAX_CACHE_SIZE) -> None:
+        self.root = root
+        self.max_size = max_size
+        # the size is computed on the first write only, as scanning the cache can be expensive
+        self.size: Optional[int] = None
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def get_dir(self, name: str) -> Path:
+        """
+        Returns a directory for data that is managed outside of the cache entries (e.g., databases of external tools),
+        which is neither counted towards the cache size nor evicted.
+        """
+        path: Path = self.root / MANAGED_DIRS_NAME / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _get_path(self, key: str) -> Path:
+        digest: str = hash_string(key)
+        return self.root / digest[:2] / digest
+
+    def get(self, key: str) -> Optional[str]:
+        path: Path = self._get_path(key)
+        try:
+            value: str = path.read_text(encoding="utf-8")
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # concurrently evicted
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        path: Path = self._get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a unique temporary file first, such that readers never see partial entries
+        tmp_path: Path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        try:
+            tmp_path.write_text(value, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.debug(f"Failed to write cache entry {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        if self.size is None:
+            self.size = self._compute_size()
+        else:
+            self.size += path.stat().st_size
+        if self.size > self.max_size:
+            self.evict()
+
+    def _list_entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        # entries are stored in shards named by two hex characters only
+        for path in self.root.glob("??/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat: os.stat_result = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _compute_size(self) -> int:
+        return sum(size for _, size, _ in self._list_entries())
+
+    def evict(self) -> None:
+        entries: List[Tuple[float, int, Path]] = sorted(self._list_entries())
+        size: int = sum(size for _, size, _ in entries)
+        target_size: int = int(self.max_size * EVICTION_TARGET_RATIO)
+        n_evicted: int = 0
+        for _, entry_size, path in entries:
+            if size <= target_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            n_evicted += 1
+        logging.debug(f"Evicted {n_evicted} entries from cache {self.root}")
+        self.size = size
@@ -44,3 +44,17 @@ def hash_string(string: str, algo: str = "sha256") -> str:
     else:
         h = hashlib.sha256(str_bytes)
     return h.hexdigest()
+
+
+def hash_git_blob(file_path: Path) -> str:
+    """
+    Computes the git blob ID of a file (i.e., the SHA-1 of the content prefixed by a blob header),
+    which equals the ID git itself would assign to the file's content.
+
+    :param file_path:
+    :return:
+    """
+    content: bytes = file_path.read_bytes()
+    h = hashlib.sha1(f"blob {len(content)}\0".encode())
+    h.update(content)
+    return h.hexdigest()
@@ -1,17 +1,60 @@
-from operator import itemgetter
+import heapq
 from pathlib import Path
 from typing import List, Tuple
 
 
 def slice_file_into_chunks(file: Path, line_ranges: List[Tuple[int, int]]) -> List[str]:
-    ranges: List[range] = [range(min(r), max(r) + 1) for r in line_ranges]
-    chunks: List[str] = ["" for _ in ranges]
+    """
+    Returns the lines of each (1-based, inclusive) line range of a file, reading the file only once.
+    Ranges are swept in the order of their first line, such that each line is only visited once
+    and appended to the chunks of the ranges it belongs to.
+    """
+    ranges: List[Tuple[int, int]] = [(min(r), max(r)) for r in line_ranges]
+    chunks: List[List[str]] = [[] for _ in ranges]
+    if len(ranges) == 0:
+        return []
+    # indices of ranges ordered by their first line, of which the next one to start is tracked
+    starting_order: List[int] = sorted(range(len(ranges)), key=lambda idx: ranges[idx][0])
+    next_start: int = 0
+    # (last line, index) of ranges that include the current line
+    active_ranges: List[Tuple[int, int]] = []
+    max_line_no: int = max(end for _, end in ranges)
     with file.open(mode="r", encoding="utf-8", errors="replace") as fp:
-        max_line_no: int = max([(min(r), max(r)) for r in line_ranges], key=itemgetter(1))[1]
-        for line_no, line in enumerate(fp):
-            for chunk_idx, line_range in enumerate(ranges):
-                if (line_no + 1) in line_range:
-                    chunks[chunk_idx] += line
-            if (line_no + 1) == max_line_no:
+        for line_no, line in enumerate(fp, start=1):
+            while (
+                next_start < len(starting_order)
+                and ranges[starting_order[next_start]][0] <= line_no
+            ):
+                idx: int = starting_order[next_start]
+                heapq.heappush(active_ranges, (ranges[idx][1], idx))
+                next_start += 1
+            while len(active_ranges) > 0 and active_ranges[0][0] < line_no:
+                heapq.heappop(active_ranges)
+            for _, idx in active_ranges:
+                chunks[idx].append(line)
+            if line_no == max_line_no:
                 break
-    return chunks
+    return ["".join(chunk) for chunk in chunks]
+
+
+def split_lines(content: str) -> List[str]:
+    """
+    Splits content into lines including their line endings, exactly like iterating over a text file does
+    (i.e., only at newlines, as opposed to `str.splitlines`).
+    """
+    lines: List[str] = [line + "\n" for line in content.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def slice_lines_into_chunks(
+    lines: List[str], line_ranges: List[Tuple[int, int]]
+) -> List[str]:
+    """
+    Same as `slice_file_into_chunks`, but for lines that are already in memory.
+    """
+    return [
+        "".join(lines[max(min(r) - 1, 0) : max(r)]) for r in line_ranges
+    ]
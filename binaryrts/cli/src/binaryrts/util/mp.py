@@ -1,7 +1,12 @@
 import logging
 import multiprocessing as mp
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from typing import Callable, Iterable, List
+from typing import Callable, Iterable, List, Iterator, Optional, Tuple, Any
+
+
+# function of the parent process, which forked workers inherit instead of unpickling it
+_forked_func: Optional[Callable] = None
 
 
 def get_cpu_count() -> int:
@@ -9,6 +14,15 @@ def get_cpu_count() -> int:
     return mp.cpu_count()
 
 
+def can_start_process_pool() -> bool:
+    """
+    Check if a process pool can be started safely, i.e., neither from a (daemonic) pool worker,
+    which cannot start processes of its own, nor while other threads run, which may hold locks
+    (e.g., of logging) that forked processes would inherit in their locked state.
+    """
+    return not mp.current_process().daemon and threading.active_count() == 1
+
+
 def run_with_multi_threading(func: Callable, arguments: Iterable, n_cpu: int):
     """Run a function for each set of args in an iterable of arguments with multithreading."""
     with ThreadPoolExecutor(max_workers=n_cpu) as executor:
@@ -34,3 +48,42 @@ def run_with_multi_processing(func: Callable, iterable: Iterable, n_cpu: int) ->
                 logging.debug(e)
                 raise Exception("Failed to run function in parallel.")
     return results
+
+
+def imap_with_multi_processing(
+    func: Callable,
+    iterable: Iterable,
+    n_cpu: int,
+    chunksize: int = 1,
+    initializer: Optional[Callable] = None,
+    initargs: Tuple = (),
+) -> Iterator:
+    """
+    Lazily run a function for each element in an iterable with multiprocessing, yielding results in input order.
+    The initializer can be used to set up (expensive) state once per worker instead of once per element.
+    """
+    logging.info(f"Starting multi-processing with {n_cpu} CPUs.")
+    with mp.Pool(processes=n_cpu, initializer=initializer, initargs=initargs) as pool:
+        yield from pool.imap(func, iterable, chunksize=chunksize)
+
+
+def _call_forked_func(arg: Any) -> Any:
+    return _forked_func(arg)
+
+
+def map_with_fork(func: Callable, iterable: Iterable, n_cpu: int) -> List:
+    """
+    Run a function for each element in an iterable with forked processes, which inherit the parent's memory
+    (copy-on-write) instead of pickling the function and the (possibly large) state it references.
+    Runs sequentially if only one CPU is requested or forking is not supported (e.g., on Windows).
+    """
+    global _forked_func
+    if n_cpu <= 1 or "fork" not in mp.get_all_start_methods():
+        return [func(arg) for arg in iterable]
+    logging.info(f"Starting multi-processing with {n_cpu} forked CPUs.")
+    _forked_func = func
+    try:
+        with mp.get_context("fork").Pool(processes=n_cpu) as pool:
+            return pool.map(_call_forked_func, iterable, chunksize=1)
+    finally:
+        _forked_func = None
@@ -4,7 +4,10 @@ Module containing base interfaces for SCM systems.
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
+
+# old start line, old line count, new start line, new line count (as in a unified diff hunk header)
+Hunk = Tuple[int, int, int, int]
 
 
 class ChangelistItemAction(Enum):
@@ -17,6 +20,8 @@ class ChangelistItemAction(Enum):
 class ChangelistItem(object):
     filepath: Path
     action: ChangelistItemAction
+    # hunks of the diff without context lines, if known
+    hunks: Optional[Tuple[Hunk, ...]] = field(default=None, compare=False)
 
 
 @dataclass()
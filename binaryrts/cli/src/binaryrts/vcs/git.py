@@ -2,15 +2,126 @@ import logging
 import os
 import re
 import subprocess as sb
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional, Generator, Tuple, Pattern, Set
+from typing import (
+    List,
+    Dict,
+    Optional,
+    Generator,
+    Tuple,
+    Pattern,
+    Set,
+    IO,
+    Iterable,
+)
 
 from git import Repo
 
-from binaryrts.util.fs import temp_path
+from binaryrts.util.cache import DiskCache
+from binaryrts.util.fs import temp_path, is_relative_to
 from binaryrts.util.process import check_executable_exists
-from binaryrts.vcs.base import ChangelistItem, ChangelistItemAction, Changelist
+from binaryrts.vcs.base import (
+    ChangelistItem,
+    ChangelistItemAction,
+    Changelist,
+    Hunk,
+)
+
+# bump to invalidate git results in the disk cache, e.g., when the diff options change
+GIT_CACHE_VERSION: int = 1
+
+
+class GitBlobReader:
+    """
+    Reads git objects through a long-lived `git cat-file --batch` process,
+    which answers many `rev:path` requests without spawning a process per request.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.process: Optional[sb.Popen] = None
+        # the process that started the reader process, as forked children must not share its pipes
+        self.pid: Optional[int] = None
+        # requests and responses must not interleave between threads
+        self.lock: threading.Lock = threading.Lock()
+
+    def _get_process(self) -> sb.Popen:
+        if self.pid != os.getpid():
+            self.process = None
+        if self.process is None or self.process.poll() is not None:
+            self.pid = os.getpid()
+            self.process = sb.Popen(
+                ["git", "-P", "-C", self.root.__str__(), "cat-file", "--batch"],
+                stdin=sb.PIPE,
+                stdout=sb.PIPE,
+                stderr=sb.DEVNULL,
+            )
+        return self.process
+
+    def read(self, git_objects: List[str]) -> List[Optional[bytes]]:
+        """
+        Returns the raw content of each object in order, or None if it does not exist.
+        All requests are pipelined, i.e., written while the responses are read.
+        """
+        if len(git_objects) == 0:
+            return []
+        with self.lock:
+            process: sb.Popen = self._get_process()
+
+            def write_requests(stdin: IO[bytes]) -> None:
+                try:
+                    for git_obj in git_objects:
+                        stdin.write(f"{git_obj}\n".encode("utf-8"))
+                    stdin.flush()
+                except (OSError, ValueError) as e:
+                    # broken or closed pipe, e.g., after killing the process on errors
+                    logging.debug(f"Failed to pass objects to git cat-file: {e}")
+
+            # we write concurrently, as git answers while reading and the pipes may fill up otherwise
+            writer: threading.Thread = threading.Thread(
+                target=write_requests, args=(process.stdin,), daemon=True
+            )
+            writer.start()
+            contents: List[Optional[bytes]] = []
+            try:
+                for git_obj in git_objects:
+                    header: bytes = process.stdout.readline()
+                    if header == b"":
+                        raise Exception(
+                            f"git cat-file terminated unexpectedly when reading {git_obj}"
+                        )
+                    header_fragments: List[bytes] = header.split()
+                    if len(header_fragments) != 3:
+                        # e.g., `<object> missing` or `<object> ambiguous`
+                        contents.append(None)
+                        continue
+                    size: int = int(header_fragments[2])
+                    contents.append(process.stdout.read(size))
+                    process.stdout.read(1)  # trailing newline
+            except Exception:
+                # the process state is undefined, we start a new one for subsequent requests;
+                # killing it first unblocks the writer, which may wait for a full pipe
+                process.kill()
+                writer.join()
+                self.close()
+                raise
+            finally:
+                writer.join()
+            return contents
+
+    def close(self) -> None:
+        if self.process is not None and self.pid == os.getpid():
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=10)
+            except Exception:
+                self.process.kill()
+            self.process = None
+
+    def __del__(self) -> None:
+        self.close()
 
 
 class GitClient:
@@ -28,11 +139,15 @@ class GitClient:
     }
 
     diff_pattern: Pattern = re.compile(r"^diff --git a/(?P<filepath>.*) b/.*$")
+    hunk_pattern: Pattern = re.compile(
+        r"^@@ -(?P<old_start>\d+)(,(?P<old_count>\d+))? \+(?P<new_start>\d+)(,(?P<new_count>\d+))? @@"
+    )
 
     def __init__(
         self,
         root: Path,
         use_cache: bool = True,
+        disk_cache: Optional[DiskCache] = None,
     ) -> None:
         if not check_executable_exists("git"):
             raise Exception("Cannot find git executable.")
@@ -42,43 +157,156 @@ class GitClient:
         self.use_cache = use_cache
         self.diff_cache: Dict[str, Changelist] = {}
         self.show_cache: Dict[str, str] = {}
+        # diffs and file contents are also shared across invocations, keyed by resolved commit SHAs
+        self.disk_cache = disk_cache
+        self.blob_reader: GitBlobReader = GitBlobReader(root=root)
 
     @classmethod
     def from_repo(cls, git_repo: Repo) -> "GitClient":
         return cls(root=Path(git_repo.git_dir).resolve(strict=True).parent)
 
-    def get_file_content_at_revision(self, revision: str, filepath: Path) -> str:
+    def _get_git_object(self, revision: str, filepath: Path) -> str:
         valid_filepath: str = str(
             filepath.relative_to(Path(self.root).absolute())
             if filepath.is_absolute()
             else filepath
         ).replace(os.sep, "/")
-        git_obj: str = f"{revision}:{valid_filepath}"
-        if self.use_cache and git_obj in self.show_cache:
-            return self.show_cache[git_obj]
-        logging.debug(f"Calling git show {git_obj}")
-        raw_output: str = (
-            sb.check_output(
-                ["git", "-P", "-C", self.root.__str__(), "show", git_obj], text=True, encoding="utf-8", errors="replace"
+        return f"{revision}:{valid_filepath}"
+
+    @staticmethod
+    def _decode_file_content(content: bytes) -> str:
+        # decoding as `utf-8-sig` fixes unicode encoding issues on Windows with BOM,
+        # and we translate line endings like text-mode subprocess output does
+        return (
+            content.decode("utf-8-sig", errors="replace")
+            .replace("\r\n", "\n")
+            .replace("\r", "\n")
+        )
+
+    def get_file_content_at_revision(self, revision: str, filepath: Path) -> str:
+        return self.get_file_contents_at_revisions(requests=[(revision, filepath)])[0]
+
+    def get_file_contents_at_revisions(
+        self, requests: List[Tuple[str, Path]]
+    ) -> List[str]:
+        """
+        Returns the file contents for many (revision, filepath) pairs at once,
+        which are read over a single `git cat-file` process.
+        """
+        git_objects: List[str] = [
+            self._get_git_object(revision=revision, filepath=filepath)
+            for revision, filepath in requests
+        ]
+        contents: Dict[str, str] = {}
+        if self.use_cache:
+            for git_obj in git_objects:
+                # a single lookup, as the cache may be cleared by another thread in between
+                content: Optional[str] = self.show_cache.get(git_obj)
+                if content is not None:
+                    contents[git_obj] = content
+        missing_requests: Dict[str, Tuple[str, Path]] = {
+            git_obj: request
+            for git_obj, request in zip(git_objects, requests)
+            if git_obj not in contents
+        }
+        disk_cache_keys: Dict[str, str] = {}
+        if self.disk_cache is not None and len(missing_requests) > 0:
+            commits: Dict[str, str] = self._resolve_commits(
+                revisions=[revision for revision, _ in missing_requests.values()]
+            )
+            for git_obj, (revision, filepath) in missing_requests.items():
+                if revision not in commits:
+                    continue
+                disk_cache_keys[git_obj] = (
+                    f"git-show:{GIT_CACHE_VERSION}:"
+                    f"{self._get_git_object(revision=commits[revision], filepath=filepath)}"
+                )
+                content: Optional[str] = self.disk_cache.get(disk_cache_keys[git_obj])
+                if content is not None:
+                    contents[git_obj] = content
+
+        missing_git_objects: List[str] = [
+            git_obj for git_obj in missing_requests.keys() if git_obj not in contents
+        ]
+        logging.debug(f"Reading {len(missing_git_objects)} objects with git cat-file")
+        for git_obj, raw_content in zip(
+            missing_git_objects, self.blob_reader.read(missing_git_objects)
+        ):
+            if raw_content is None:
+                raise Exception(f"Git object {git_obj} does not exist.")
+            contents[git_obj] = self._decode_file_content(raw_content)
+            if git_obj in disk_cache_keys:
+                self.disk_cache.put(disk_cache_keys[git_obj], contents[git_obj])
+        if self.use_cache:
+            for git_obj in missing_requests.keys():
+                self.show_cache[git_obj] = contents[git_obj]
+        return [contents[git_obj] for git_obj in git_objects]
+
+    def _resolve_commits(self, revisions: List[str]) -> Dict[str, str]:
+        """
+        Resolves revisions to commit SHAs, such that disk cache entries never go stale for moving refs like `HEAD`.
+        Returns an empty mapping if any revision cannot be resolved.
+        """
+        revisions = list(dict.fromkeys(revisions))
+        try:
+            raw_output: str = sb.check_output(
+                [
+                    "git",
+                    "-P",
+                    "-C",
+                    self.root.__str__(),
+                    "rev-parse",
+                    *[f"{revision}^{{commit}}" for revision in revisions],
+                ],
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                stderr=sb.DEVNULL,
             )
-            .encode("utf-8")
-            .decode("utf-8-sig")
-        )  # fixes unicode encoding issues on Windows with BOM
-        if self.use_cache and git_obj not in self.show_cache:
-            self.show_cache[git_obj] = raw_output
-        return raw_output
+        except sb.CalledProcessError as e:
+            logging.debug(f"Failed to resolve revisions {revisions}: {e}")
+            return {}
+        commits: List[str] = raw_output.split()
+        if len(commits) != len(revisions):
+            return {}
+        return dict(zip(revisions, commits))
 
     def parse_diff(self, diff: str) -> Changelist:
         items: Set[ChangelistItem] = set()
         output_lines = diff.splitlines()
+        item: Optional[ChangelistItem] = None
+        # the hunks are unknown for binary files
+        hunks: Optional[List[Hunk]] = []
+
+        def add_item() -> None:
+            if item is not None:
+                item.hunks = tuple(hunks) if hunks is not None else None
+                items.add(item)
+
         for idx, line in enumerate(output_lines):
             # fast-path without regex
+            if line.startswith("@@ "):
+                hunk_match = re.search(self.hunk_pattern, line)
+                if hunk_match is not None and hunks is not None:
+                    hunks.append(
+                        (
+                            int(hunk_match.group("old_start")),
+                            int(hunk_match.group("old_count") or 1),
+                            int(hunk_match.group("new_start")),
+                            int(hunk_match.group("new_count") or 1),
+                        )
+                    )
+                continue
+            if line.startswith("Binary files "):
+                hunks = None
+                continue
             if "diff --git" not in line:
                 continue
 
             match = re.search(self.diff_pattern, line)
             if match is None:
                 continue
+            add_item()
             filepath: str = match.group("filepath")
             action: ChangelistItemAction = ChangelistItemAction.MODIFIED
             if len(output_lines) > idx + 1:
@@ -86,7 +314,9 @@ class GitClient:
                     action = ChangelistItemAction.ADDED
                 elif "deleted file mode" in output_lines[idx + 1]:
                     action = ChangelistItemAction.DELETED
-            items.add(ChangelistItem(filepath=Path(filepath), action=action))
+            item = ChangelistItem(filepath=Path(filepath), action=action)
+            hunks = []
+        add_item()
 
         changelist: Changelist = Changelist(items=list(items))
         logging.debug(
@@ -125,12 +355,84 @@ class GitClient:
             "--ignore-all-space",
             git_obj,
         ]
-        raw_output: str = sb.check_output(command, text=True, encoding="utf-8", errors="replace")
+        disk_cache_key: Optional[str] = None
+        raw_output: Optional[str] = None
+        if self.disk_cache is not None:
+            commits: Dict[str, str] = self._resolve_commits(
+                revisions=[from_revision, to_revision]
+            )
+            if from_revision in commits and to_revision in commits:
+                disk_cache_key = (
+                    f"git-diff:{GIT_CACHE_VERSION}:"
+                    f"{commits[from_revision]}...{commits[to_revision]}"
+                )
+                raw_output = self.disk_cache.get(disk_cache_key)
+        if raw_output is None:
+            raw_output = sb.check_output(command, text=True, encoding="utf-8", errors="replace")
+            if disk_cache_key is not None:
+                self.disk_cache.put(disk_cache_key, raw_output)
         cl: Changelist = self.parse_diff(diff=raw_output)
         if self.use_cache and git_obj not in self.diff_cache:
             self.diff_cache[git_obj] = cl
         return cl
 
+    def rev_parse(self, revision: str) -> str:
+        return sb.check_output(
+            ["git", "-P", "-C", self.root.__str__(), "rev-parse", "--verify", f"{revision}^{{commit}}"],
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        ).strip()
+
+    def get_merge_base(self, from_revision: str, to_revision: str) -> Optional[str]:
+        """
+        Returns the best common ancestor of two revisions, which is the base of a three-dot diff.
+        """
+        process: sb.CompletedProcess = sb.run(
+            ["git", "-P", "-C", self.root.__str__(), "merge-base", from_revision, to_revision],
+            text=True,
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        if process.returncode != 0:
+            return None
+        return process.stdout.strip()
+
+    def _list_files(self, args: List[str]) -> Set[Path]:
+        raw_output: str = sb.check_output(
+            ["git", "-P", "-C", self.root.__str__(), *args],
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        return {Path(line) for line in raw_output.splitlines() if line.strip() != ""}
+
+    def get_changed_files(
+        self, revision: str, files: Optional[Iterable[Path]] = None
+    ) -> Set[Path]:
+        """
+        Returns the files (relative to the client's root) whose content in the working tree differs from `revision`,
+        including untracked files.
+        Of the given `files` (e.g., the ones of a previous conversion), those that git does not track
+        (e.g., ignored generated sources or files outside the repository) are returned as well,
+        as git cannot tell whether they changed.
+        """
+        changed_files: Set[Path] = self._list_files(
+            ["diff", "--no-renames", "--name-only", "--relative", revision]
+        )
+        changed_files |= self._list_files(
+            ["ls-files", "--others", "--exclude-standard"]
+        )
+        if files is not None:
+            tracked_files: Set[Path] = self._list_files(["ls-files"])
+            for file in files:
+                if file.is_absolute() and is_relative_to(file, self.root):
+                    file = file.relative_to(self.root)
+                if file not in tracked_files:
+                    changed_files.add(file)
+        return changed_files
+
     def get_status(self) -> Changelist:
         raw_output: str = sb.check_output(
             ["git", "-P", "-C", self.root.__str__(), "status", "--porcelain"], text=True, encoding="utf-8", errors="replace"
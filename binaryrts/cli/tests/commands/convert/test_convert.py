@@ -761,5 +761,45 @@ other_lib.dll ({JAVA_MODULE_DIR / "other_lib.dll"})
         )
 
 
+    def test_convert_syscalls_in_parallel(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "-i",
+                SAMPLE_MODULE_DIR.__str__(),
+                "-o",
+                OUTPUT_DIR.__str__(),
+                "--regex",
+                r".*sample\_module[\/|\\]src.*",
+                "--repo",
+                SAMPLE_MODULE_DIR.__str__(),
+                "--processes",
+                2,
+                "syscalls",
+                "--ext",
+                ".syscalls.log",
+            ],
+            catch_exceptions=True,
+        )
+        self.assertEqual(result.exit_code, 0)
+        self.assertTrue(OUTPUT_DIR.exists())
+        self.assertTrue((OUTPUT_DIR / TEST_FILE_TRACES_FILE).exists())
+        # check if content of csv files is correct
+        test_file_traces: TestFileTraces = TestFileTraces.from_csv(
+            OUTPUT_DIR / TEST_FILE_TRACES_FILE
+        )
+        self.assertEqual(
+            TestFileTraces(
+                table={
+                    f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}AlwaysTrue": {
+                        "test.txt"
+                    },
+                    f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}*": {"setup.txt"},
+                }
+            ),
+            test_file_traces,
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -12,6 +12,7 @@ from binaryrts.commands.select import (
     EXCLUDED_TESTS_FILE,
     INCLUDED_TESTS_FILE,
     SELECTION_CAUSES_FILE,
+    get_revision_range_dir_name,
 )
 from binaryrts.parser.coverage import (
     TestFunctionTraces,
@@ -302,6 +303,98 @@ class CliSelectTestCase(unittest.TestCase):
                 )
                 self.assertEqual(result.exit_code, 0, msg=result.stdout)
 
+    def test_select_cpp_batch(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                git_client: GitClient = GitClient.from_repo(git_repo=local_repo)
+                shutil.copytree(
+                    src=SAMPLE_MODULE_DIR / "src",
+                    dst=git_client.root / "src",
+                    dirs_exist_ok=False,
+                )
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Initial Commit")
+                git_client.git_repo.git.push()
+                target_branch: str = git_client.git_repo.active_branch.name
+
+                function_lookup_table: Dict[str, List[CoveredFunction]] = {
+                    f"src{os.sep}test.h": [
+                        CoveredFunction(
+                            0,
+                            f"src{os.sep}test.h",
+                            "Max(int,int)",
+                            5,
+                            7,
+                            None,
+                            None,
+                            None,
+                        ),
+                    ]
+                }
+                FunctionLookupTable(table=function_lookup_table).to_csv(
+                    FUNCTION_LOOKUP_TABLE
+                )
+                test_function_traces: Dict[str, Set[int]] = {
+                    f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Max": {0}
+                }
+                TestFunctionTraces(table=test_function_traces).to_csv(
+                    TEST_FUNCTION_TRACES
+                )
+
+                # modifying change, followed by an unrelated change
+                git_client.git_repo.git.checkout(b="feature/modify")
+                file = Path("src") / "test.h"
+                file.write_text(
+                    file.read_text().replace(
+                        "return a > b", "int c = 0; \nreturn a > b"
+                    )
+                )
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Change Max")
+                Path("README.md").write_text("Hello")
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Add README")
+
+                batch_file: Path = git_client.root / "ranges.txt"
+                batch_file.write_text(
+                    f"# ranges\n{target_branch}..HEAD~1\n\nHEAD~1...HEAD\n"
+                )
+                result = self.runner.invoke(
+                    app,
+                    [
+                        "-o",
+                        OUTPUT_DIR.__str__(),
+                        "--processes",
+                        "2",
+                        "cpp",
+                        "--lookup",
+                        FUNCTION_LOOKUP_TABLE,
+                        "--traces",
+                        TEST_FUNCTION_TRACES,
+                        "--file-level",
+                        "--batch",
+                        batch_file,
+                    ],
+                    catch_exceptions=True,
+                )
+                self.assertEqual(result.exit_code, 0, msg=result.stdout)
+                self.assertEqual(
+                    f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Max",
+                    (
+                        OUTPUT_DIR
+                        / get_revision_range_dir_name(target_branch, "HEAD~1")
+                        / INCLUDED_TESTS_FILE
+                    ).read_text(),
+                )
+                self.assertEqual(
+                    "",
+                    (
+                        OUTPUT_DIR
+                        / get_revision_range_dir_name("HEAD~1", "HEAD")
+                        / INCLUDED_TESTS_FILE
+                    ).read_text(),
+                )
+
 
 if __name__ == "__main__":
     unittest.main()
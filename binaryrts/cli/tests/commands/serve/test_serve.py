@@ -0,0 +1,152 @@
+import json
+import os
+import socket
+import threading
+import unittest
+import urllib.request
+from pathlib import Path
+from typing import Dict, Any
+
+from binaryrts.commands.serve import SelectionService, create_server
+from binaryrts.parser.coverage import (
+    TestFunctionTraces,
+    FunctionLookupTable,
+    CoveredFunction,
+    TEST_ID_SEP,
+    FUNCTION_LOOKUP_FILE,
+    TEST_FUNCTION_TRACES_FILE,
+)
+from binaryrts.util.fs import temp_path
+from binaryrts.vcs.git import temp_clone, temp_repo, GitClient
+
+TEST_ID: str = f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Max"
+
+
+class CliServeTestCase(unittest.TestCase):
+    def test_serve_cpp(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                git_client: GitClient = GitClient.from_repo(git_repo=local_repo)
+                file: Path = Path("foo.cpp")
+                file.write_text("int foo() { return 0; }")
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Initial Commit")
+                file.write_text("int foo() { return 1; }")
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Change foo")
+
+                with temp_path(change_dir=False) as traces_dir:
+                    function_lookup_file: Path = Path(traces_dir) / FUNCTION_LOOKUP_FILE
+                    test_function_traces_file: Path = (
+                        Path(traces_dir) / TEST_FUNCTION_TRACES_FILE
+                    )
+                    FunctionLookupTable(
+                        table={
+                            "foo.cpp": [
+                                CoveredFunction(
+                                    0, "foo.cpp", "foo()", 1, 1, None, None, None
+                                )
+                            ]
+                        }
+                    ).to_csv(function_lookup_file)
+                    TestFunctionTraces(table={TEST_ID: {0}}).to_csv(
+                        test_function_traces_file
+                    )
+
+                    service: SelectionService = SelectionService(
+                        repo_root=git_client.root,
+                        function_lookup_file=function_lookup_file,
+                        test_function_traces_file=test_function_traces_file,
+                    )
+                    server = create_server(service=service, port=0)
+                    thread = threading.Thread(target=server.serve_forever, daemon=True)
+                    thread.start()
+                    url: str = f"http://127.0.0.1:{server.server_address[1]}"
+                    request: Dict[str, Any] = {
+                        "from": "HEAD~1",
+                        "to": "HEAD",
+                        "file_level": True,
+                    }
+
+                    def post(path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+                        with urllib.request.urlopen(
+                            urllib.request.Request(
+                                url + path,
+                                data=json.dumps(body).encode("utf-8"),
+                                method="POST",
+                            )
+                        ) as response:
+                            return json.loads(response.read())
+
+                    try:
+                        with urllib.request.urlopen(url + "/health") as response:
+                            self.assertEqual({"status": "ok"}, json.loads(response.read()))
+                        self.assertEqual([TEST_ID], post("/select/cpp", request)["included"])
+
+                        # traces are reloaded once they change on disk
+                        TestFunctionTraces(table={TEST_ID: {1}}).to_csv(
+                            test_function_traces_file
+                        )
+                        stat: os.stat_result = test_function_traces_file.stat()
+                        os.utime(
+                            test_function_traces_file,
+                            ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9),
+                        )
+                        selection: Dict[str, Any] = post("/select/cpp", request)
+                        self.assertEqual([], selection["included"])
+                        self.assertEqual([TEST_ID], selection["excluded"])
+
+                        # traces that fail to load (e.g., partially written ones) keep the previous ones
+                        test_function_traces_file.write_text("broken\n")
+                        os.utime(
+                            test_function_traces_file,
+                            ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9),
+                        )
+                        self.assertFalse(service.reload_if_changed())
+                        self.assertEqual(
+                            [TEST_ID], post("/select/cpp", request)["excluded"]
+                        )
+
+                        with self.assertRaises(urllib.error.HTTPError) as context:
+                            post("/select/syscalls", request)
+                        self.assertEqual(500, context.exception.code)
+                    finally:
+                        server.shutdown()
+                        server.server_close()
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix sockets")
+    def test_serve_unix_socket(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                with temp_path(change_dir=False) as tmp_dir:
+                    file_traces: Path = Path(tmp_dir) / "test-file-traces.csv"
+                    file_traces.write_text("")
+                    service: SelectionService = SelectionService(
+                        repo_root=Path(local_repo_path),
+                        test_file_traces_file=file_traces,
+                    )
+                    socket_path: Path = Path(tmp_dir) / "binaryrts.sock"
+                    server = create_server(service=service, socket_path=socket_path)
+                    thread = threading.Thread(target=server.serve_forever, daemon=True)
+                    thread.start()
+                    try:
+                        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                            client.connect(str(socket_path))
+                            client.sendall(
+                                b"GET /health HTTP/1.0\r\nHost: localhost\r\n\r\n"
+                            )
+                            response: bytes = b""
+                            while True:
+                                chunk: bytes = client.recv(4096)
+                                if not chunk:
+                                    break
+                                response += chunk
+                        self.assertTrue(response.startswith(b"HTTP/1.0 200"))
+                        self.assertTrue(response.endswith(b'{"status": "ok"}'))
+                    finally:
+                        server.shutdown()
+                        server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
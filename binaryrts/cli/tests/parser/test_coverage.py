@@ -0,0 +1,345 @@
+import unittest
+from array import array
+from pathlib import Path
+from typing import Dict, Set, List
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    CompactTestFunctionTraces,
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TestTraceIndex,
+    TEST_ID_SEP,
+    GLOBAL_TEST_SETUP,
+    TEST_FUNCTION_TRACES_FILE,
+    TEST_FUNCTION_INDEX_FILE,
+)
+from binaryrts.parser.storage import (
+    load_test_function_traces,
+    get_test_function_traces_fingerprint,
+)
+from binaryrts.util.fs import temp_path
+
+
+def create_test_function_traces() -> TestFunctionTraces:
+    table: Dict[str, Set[int]] = {
+        f"module_a{TEST_ID_SEP}{GLOBAL_TEST_SETUP}{TEST_ID_SEP}*": {0},
+        f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}*": {1},
+        f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo": {2, 3},
+        f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar": {3},
+        f"module_a{TEST_ID_SEP}BarSuite{TEST_ID_SEP}Bar": {4},
+        f"module_b{TEST_ID_SEP}{GLOBAL_TEST_SETUP}{TEST_ID_SEP}*": {5},
+        f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}*": {1},
+        f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz": {6},
+        f"*{TEST_ID_SEP}JavaSuite{TEST_ID_SEP}*": {6, 7},
+    }
+    return TestFunctionTraces(table=table)
+
+
+class FunctionLookupTableTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.lookup: FunctionLookupTable = FunctionLookupTable(
+            table={
+                "foo.cpp": [
+                    CoveredFunction(0, "foo.cpp", "Max(int,int)", 1, 3),
+                    CoveredFunction(1, "foo.cpp", "Maximum(int,int)", 5, 9, namespace="ns"),
+                    CoveredFunction(2, "foo.cpp", "foo(Max&)", 11, 15, class_name="Foo"),
+                ],
+                "bar.cpp": [
+                    CoveredFunction(3, "bar.cpp", "Max(int,int)", 1, 3, class_name="Bar"),
+                ],
+            }
+        )
+
+    def test_find_functions_wildcard(self):
+        self.assertListEqual(
+            [0, 1, 2, 3],
+            [f.identifier for f in self.lookup.find_functions(signature="Max*")],
+        )
+        self.assertListEqual(
+            [2, 3],
+            [
+                f.identifier
+                for f in self.lookup.find_functions(signature="Max*", class_name="*")
+            ],
+        )
+
+    def test_find_functions_scope(self):
+        self.assertListEqual(
+            [1], [f.identifier for f in self.lookup.find_functions(namespace="ns")]
+        )
+        self.assertListEqual(
+            [0, 3],
+            [
+                f.identifier
+                for f in self.lookup.find_functions(
+                    signature="Max(int,int)", namespace=""
+                )
+            ],
+        )
+        self.assertListEqual(
+            [3],
+            [
+                f.identifier
+                for f in self.lookup.find_functions(
+                    signature="Max(int,int)", class_name="Bar"
+                )
+            ],
+        )
+        self.assertListEqual(
+            [], self.lookup.find_functions(signature="Max(int,int)", class_name="Foo")
+        )
+
+    def test_find_functions_by_line(self):
+        lookup: FunctionLookupTable = FunctionLookupTable(
+            table={
+                "foo.cpp": [
+                    CoveredFunction(0, "foo.cpp", "outer()", 1, 20),
+                    CoveredFunction(1, "foo.cpp", "lambda()", 5, 8),
+                    CoveredFunction(2, "foo.cpp", "other()", 22, 30),
+                    CoveredFunction(3, "foo.cpp", "nested()", 6, 7),
+                ]
+            }
+        )
+        expected: Dict[int, List[int]] = {
+            0: [],
+            1: [0],
+            6: [0, 1, 3],
+            8: [0, 1],
+            21: [],
+            30: [2],
+            31: [],
+        }
+        for line, function_ids in expected.items():
+            self.assertListEqual(
+                function_ids,
+                [
+                    f.identifier
+                    for f in lookup.find_functions_by_line(file=Path("foo.cpp"), line=line)
+                ],
+            )
+        self.assertDictEqual(
+            expected,
+            {
+                line: [f.identifier for f in functions]
+                for line, functions in lookup.find_functions_by_lines(
+                    file=Path("foo.cpp"), lines=expected.keys()
+                ).items()
+            },
+        )
+        self.assertIsNone(lookup.find_functions_by_lines(file=Path("bar.cpp"), lines=[1]))
+
+    def test_serialization_keeps_function_cache(self):
+        with temp_path() as tmp_dir:
+            pickle_file: Path = Path(tmp_dir) / "lookup.pkl"
+            self.lookup.to_pickle(pickle_file)
+            actual: FunctionLookupTable = FunctionLookupTable.from_pickle(pickle_file)
+            self.assertEqual(self.lookup, actual)
+            self.assertListEqual(
+                [0, 3],
+                [f.identifier for f in actual.find_functions(signature="Max(int,int)")],
+            )
+
+
+class TestTraceIndexTestCase(unittest.TestCase):
+    def test_select_tests_directly_affected(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        included_tests, excluded_tests, selection_causes = traces.select_tests(
+            affected_entity_ids={3, 7}
+        )
+        self.assertSetEqual(
+            {
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo",
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar",
+                f"*{TEST_ID_SEP}JavaSuite{TEST_ID_SEP}*",
+            },
+            included_tests,
+        )
+        self.assertSetEqual(
+            {
+                f"module_a{TEST_ID_SEP}BarSuite{TEST_ID_SEP}Bar",
+                f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz",
+            },
+            excluded_tests,
+        )
+        self.assertDictEqual(
+            {
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo": [3],
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar": [3],
+                f"*{TEST_ID_SEP}JavaSuite{TEST_ID_SEP}*": [7],
+            },
+            selection_causes,
+        )
+
+    def test_select_tests_suite_setup(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        included_tests, excluded_tests, selection_causes = traces.select_tests(
+            affected_entity_ids={1}
+        )
+        self.assertSetEqual(
+            {
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo",
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar",
+                f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz",
+            },
+            included_tests,
+        )
+        self.assertSetEqual(
+            {
+                f"module_a{TEST_ID_SEP}BarSuite{TEST_ID_SEP}Bar",
+                f"*{TEST_ID_SEP}JavaSuite{TEST_ID_SEP}*",
+            },
+            excluded_tests,
+        )
+        self.assertDictEqual(
+            {
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}*": [1],
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo": [],
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar": [],
+                f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}*": [1],
+                f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz": [],
+            },
+            selection_causes,
+        )
+
+    def test_select_tests_global_setup(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        included_tests, excluded_tests, selection_causes = traces.select_tests(
+            affected_entity_ids={0, 4}
+        )
+        self.assertSetEqual(
+            {
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}*",
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo",
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar",
+                f"module_a{TEST_ID_SEP}BarSuite{TEST_ID_SEP}Bar",
+            },
+            included_tests,
+        )
+        self.assertSetEqual(
+            {
+                f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz",
+                f"*{TEST_ID_SEP}JavaSuite{TEST_ID_SEP}*",
+            },
+            excluded_tests,
+        )
+        self.assertListEqual(
+            [4],
+            selection_causes[f"module_a{TEST_ID_SEP}BarSuite{TEST_ID_SEP}Bar"],
+        )
+        self.assertListEqual(
+            [0],
+            selection_causes[f"module_a{TEST_ID_SEP}{GLOBAL_TEST_SETUP}{TEST_ID_SEP}*"],
+        )
+
+    def test_index_is_invalidated(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        included_tests, _, _ = traces.select_tests(affected_entity_ids={8})
+        self.assertSetEqual(set(), included_tests)
+        traces.add_test_function_dependency(
+            test_module="module_b",
+            test_suite="BazSuite",
+            test_case="Baz",
+            function=CoveredFunction(8, "baz.cpp", "baz()", 1, 3),
+        )
+        included_tests, _, _ = traces.select_tests(affected_entity_ids={8})
+        self.assertSetEqual(
+            {f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz"}, included_tests
+        )
+
+    def test_index_serialization(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        # tests without any traced functions are kept as well
+        traces.table[f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Qux"] = set()
+        expected = traces.select_tests(affected_entity_ids={1, 3, 5})
+        traces.get_index().traces_fingerprint = "fingerprint"
+        with temp_path() as tmp_dir:
+            csv_file: Path = Path(tmp_dir) / "index.csv"
+            traces.get_index().to_csv(csv_file)
+            pickle_file: Path = Path(tmp_dir) / "index.pkl"
+            traces.get_index().to_pickle(pickle_file)
+            for index in [
+                TestTraceIndex.from_csv(csv_file),
+                TestTraceIndex.from_pickle(pickle_file),
+            ]:
+                self.assertEqual(
+                    expected, index.select_tests(affected_entity_ids={1, 3, 5})
+                )
+                self.assertListEqual(list(traces.table.keys()), index.test_ids)
+                self.assertEqual("fingerprint", index.traces_fingerprint)
+
+    def test_stale_index_is_ignored(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        with temp_path() as tmp_dir:
+            traces_file: Path = Path(tmp_dir) / TEST_FUNCTION_TRACES_FILE
+            index_file: Path = Path(tmp_dir) / TEST_FUNCTION_INDEX_FILE
+            traces.to_csv(traces_file)
+            traces.get_index().traces_fingerprint = (
+                get_test_function_traces_fingerprint(traces_file)
+            )
+            traces.get_index().to_csv(index_file)
+            self.assertIsNotNone(
+                load_test_function_traces(traces_file, load_index=True).index
+            )
+
+            # traces converted again without an index do not use the previous one
+            traces.add_test_function_dependency(
+                test_module="module_b",
+                test_suite="BazSuite",
+                test_case="Baz",
+                function=CoveredFunction(8, "baz.cpp", "baz()", 1, 3),
+            )
+            traces.to_csv(traces_file)
+            loaded_traces: TestFunctionTraces = load_test_function_traces(
+                traces_file, load_index=True
+            )
+            self.assertIsNone(loaded_traces.index)
+            included_tests, _, _ = loaded_traces.select_tests(affected_entity_ids={8})
+            self.assertSetEqual(
+                {f"module_b{TEST_ID_SEP}BazSuite{TEST_ID_SEP}Baz"}, included_tests
+            )
+
+
+class CompactTestFunctionTracesTestCase(unittest.TestCase):
+    def test_select_tests(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        compact_traces: CompactTestFunctionTraces = (
+            CompactTestFunctionTraces.from_test_function_traces(traces)
+        )
+        self.assertEqual(traces, compact_traces)
+        for affected_entity_ids in [{0}, {1}, {3, 7}, {0, 4, 6}]:
+            self.assertEqual(
+                traces.select_tests(affected_entity_ids=affected_entity_ids),
+                compact_traces.select_tests(affected_entity_ids=affected_entity_ids),
+            )
+
+    def test_add_test_function_dependency(self):
+        traces: CompactTestFunctionTraces = CompactTestFunctionTraces()
+        for function_id in [5, 1, 3, 1, 5]:
+            traces.add_test_function_dependency(
+                test_module="module_a",
+                test_suite="FooSuite",
+                test_case="Foo",
+                function=CoveredFunction(function_id, "foo.cpp", "foo()", 1, 3),
+            )
+        self.assertEqual(
+            array("I", [1, 3, 5]),
+            traces.table[f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo"],
+        )
+
+    def test_serialization(self):
+        traces: CompactTestFunctionTraces = (
+            CompactTestFunctionTraces.from_test_function_traces(
+                create_test_function_traces()
+            )
+        )
+        with temp_path() as tmp_dir:
+            pickle_file: Path = Path(tmp_dir) / "traces.pkl"
+            traces.to_pickle(pickle_file)
+            actual = TestFunctionTraces.from_pickle(pickle_file)
+            self.assertIsInstance(actual, CompactTestFunctionTraces)
+            self.assertEqual(traces, actual)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import multiprocessing as mp
+import unittest
+from pathlib import Path
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TestFileTraces,
+    TEST_ID_SEP,
+)
+from binaryrts.parser.database import (
+    SQLiteFunctionLookupTable,
+    SQLiteTestFunctionTraces,
+    SQLiteTestFileTraces,
+    save_function_lookup_table,
+    read_function_lookup_table,
+    save_test_function_traces,
+    read_test_function_traces,
+    save_test_file_traces,
+    read_test_file_traces,
+)
+from binaryrts.util.fs import temp_path
+from binaryrts.util.mp import map_with_fork
+from tests.parser.test_coverage import create_test_function_traces
+from tests.parser.test_mapped import create_function_lookup_table
+
+
+class SQLiteFunctionLookupTableTestCase(unittest.TestCase):
+    def test_roundtrip(self):
+        lookup: FunctionLookupTable = create_function_lookup_table()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.db"
+            save_function_lookup_table(filepath, lookup)
+            db_lookup: SQLiteFunctionLookupTable = read_function_lookup_table(filepath)
+            self.assertEqual(lookup, db_lookup)
+            self.assertListEqual(
+                lookup.all_functions_ordered_by_id,
+                list(db_lookup.all_functions_ordered_by_id),
+            )
+
+    def test_lookups(self):
+        lookup: FunctionLookupTable = create_function_lookup_table()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.db"
+            save_function_lookup_table(filepath, lookup)
+            db_lookup: SQLiteFunctionLookupTable = read_function_lookup_table(filepath)
+            self.assertEqual(
+                lookup.get_function_by_identifier(2),
+                db_lookup.get_function_by_identifier(2),
+            )
+            self.assertListEqual(
+                lookup.find_functions_by_line(file=Path("foo.cpp"), line=6),
+                db_lookup.find_functions_by_line(file=Path("foo.cpp"), line=6),
+            )
+            self.assertIsNone(
+                db_lookup.find_functions_by_line(file=Path("qux.cpp"), line=6)
+            )
+            for kwargs in [
+                dict(signature="foo()"),
+                dict(signature="foo()", namespace="ns"),
+                dict(signature="foo()", namespace=""),
+                dict(signature="bar*"),
+                dict(signature="bar*", class_name="*"),
+                dict(file=Path("foo.cpp"), namespace="ns"),
+                dict(class_name="Bar"),
+                dict(signature="qux()"),
+            ]:
+                self.assertListEqual(
+                    lookup.find_functions(**kwargs),
+                    db_lookup.find_functions(**kwargs),
+                    msg=str(kwargs),
+                )
+            self.assertListEqual(
+                lookup.find_functions_by_file_regex(".*BAR.*"),
+                db_lookup.find_functions_by_file_regex(".*BAR.*"),
+            )
+            db_lookup.prefetch_functions(files=[Path("foo.cpp")])
+            with self.assertRaisesRegex(Exception, "read-only"):
+                db_lookup.find_or_add_functions(file=Path("qux.cpp"), line=1)
+
+    @unittest.skipUnless("fork" in mp.get_all_start_methods(), "requires fork")
+    def test_forked_lookups(self):
+        lookup: FunctionLookupTable = create_function_lookup_table()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.db"
+            save_function_lookup_table(filepath, lookup)
+            db_lookup: SQLiteFunctionLookupTable = read_function_lookup_table(filepath)
+            # forked children must not wait for a lock held by a thread of the parent
+            with db_lookup.db.lock:
+                self.assertListEqual(
+                    [lookup.get_function_by_identifier(i) for i in [1, 2]],
+                    map_with_fork(
+                        db_lookup.get_function_by_identifier, [1, 2], n_cpu=2
+                    ),
+                )
+            self.assertEqual(
+                lookup.get_function_by_identifier(2),
+                db_lookup.get_function_by_identifier(2),
+            )
+
+
+class SQLiteTestTracesTestCase(unittest.TestCase):
+    def test_function_traces(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.db"
+            save_test_function_traces(filepath, traces)
+            db_traces: SQLiteTestFunctionTraces = read_test_function_traces(filepath)
+            self.assertEqual(traces, db_traces)
+            for affected_entity_ids in [{0}, {1}, {3, 7}, {0, 4, 6}, {42}]:
+                self.assertEqual(
+                    traces.select_tests(affected_entity_ids=affected_entity_ids),
+                    db_traces.select_tests(affected_entity_ids=affected_entity_ids),
+                )
+            with self.assertRaises(Exception):
+                db_traces.add_test_function_dependency(
+                    test_module="module_a",
+                    test_suite="FooSuite",
+                    test_case="Foo",
+                    function=CoveredFunction(8, "foo.cpp", "foo()", 1, 3),
+                )
+            with self.assertRaisesRegex(Exception, "read-only"):
+                db_traces.remove_test(f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo")
+
+    def test_file_traces(self):
+        traces: TestFileTraces = TestFileTraces(
+            table={
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo": {"foo.txt", "bar.txt"},
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Bar": {"bar.txt"},
+            }
+        )
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.db"
+            save_test_file_traces(filepath, traces)
+            db_traces: SQLiteTestFileTraces = read_test_file_traces(filepath)
+            self.assertEqual(traces, db_traces)
+            self.assertEqual(
+                traces.select_tests(affected_entity_ids={"foo.txt"}),
+                db_traces.select_tests(affected_entity_ids={"foo.txt"}),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
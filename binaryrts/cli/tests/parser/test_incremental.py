@@ -0,0 +1,104 @@
+import unittest
+from pathlib import Path
+from typing import Dict
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TEST_ID_SEP,
+)
+from binaryrts.parser.incremental import (
+    update_function_lookup_table,
+    remap_test_function_traces,
+)
+from binaryrts.util.fs import temp_path
+
+
+def create_previous_function_lookup_table() -> FunctionLookupTable:
+    return FunctionLookupTable(
+        table={
+            "deleted.cpp": [
+                CoveredFunction(0, "deleted.cpp", "foo()", 1, 3),
+                CoveredFunction(1, "deleted.cpp", "bar()", 5, 7),
+            ],
+            "src/unchanged.cpp": [
+                CoveredFunction(2, "src/unchanged.cpp", "baz()", 1, 3, namespace="ns"),
+            ],
+            "other.cpp": [
+                CoveredFunction(3, "other.cpp", "qux()", 1, 3),
+            ],
+        }
+    )
+
+
+class IncrementalUpdateTestCase(unittest.TestCase):
+    def test_update_function_lookup_table(self):
+        with temp_path() as tmp_dir:
+            root_dir: Path = Path(tmp_dir)
+            function_lookup_table, id_mapping = update_function_lookup_table(
+                previous_function_lookup_table=create_previous_function_lookup_table(),
+                changed_files={Path("deleted.cpp"), Path("new.cpp")},
+                root_dir=root_dir,
+            )
+        self.assertDictEqual({2: 0, 3: 1}, id_mapping)
+        self.assertEqual(
+            FunctionLookupTable(
+                table={
+                    "src/unchanged.cpp": [
+                        CoveredFunction(
+                            0, "src/unchanged.cpp", "baz()", 1, 3, namespace="ns"
+                        ),
+                    ],
+                    "other.cpp": [
+                        CoveredFunction(1, "other.cpp", "qux()", 1, 3),
+                    ],
+                }
+            ),
+            function_lookup_table,
+        )
+        self.assertEqual(2, function_lookup_table.max_id)
+        self.assertListEqual(
+            [0],
+            [
+                f.identifier
+                for f in function_lookup_table.find_functions(namespace="ns")
+            ],
+        )
+
+    def test_update_is_stable_without_changes(self):
+        previous_function_lookup_table: FunctionLookupTable = (
+            create_previous_function_lookup_table()
+        )
+        with temp_path() as tmp_dir:
+            function_lookup_table, id_mapping = update_function_lookup_table(
+                previous_function_lookup_table=previous_function_lookup_table,
+                changed_files=set(),
+                root_dir=Path(tmp_dir),
+            )
+        self.assertEqual(previous_function_lookup_table, function_lookup_table)
+        self.assertDictEqual({0: 0, 1: 1, 2: 2, 3: 3}, id_mapping)
+
+    def test_remap_test_function_traces(self):
+        id_mapping: Dict[int, int] = {2: 0, 3: 1}
+        self.assertEqual(
+            TestFunctionTraces(
+                table={
+                    f"module{TEST_ID_SEP}Foo{TEST_ID_SEP}Bar": {0},
+                    f"module{TEST_ID_SEP}Foo{TEST_ID_SEP}Baz": set(),
+                }
+            ),
+            remap_test_function_traces(
+                previous_test_function_traces=TestFunctionTraces(
+                    table={
+                        f"module{TEST_ID_SEP}Foo{TEST_ID_SEP}Bar": {1, 2},
+                        f"module{TEST_ID_SEP}Foo{TEST_ID_SEP}Baz": {0},
+                    }
+                ),
+                id_mapping=id_mapping,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
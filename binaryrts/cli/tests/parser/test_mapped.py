@@ -0,0 +1,158 @@
+import unittest
+from pathlib import Path
+from typing import List
+
+from binaryrts.parser.coverage import (
+    CoveredFunction,
+    FunctionLookupTable,
+    TestFunctionTraces,
+    TEST_ID_SEP,
+)
+from binaryrts.parser.mapped import (
+    MappedFunctionLookupTable,
+    MappedTestFunctionTraces,
+    save_function_lookup_table,
+    read_function_lookup_table,
+    save_test_function_traces,
+    read_test_function_traces,
+)
+from binaryrts.util.fs import temp_path
+from tests.parser.test_coverage import create_test_function_traces
+
+
+def create_function_lookup_table() -> FunctionLookupTable:
+    functions: List[CoveredFunction] = [
+        CoveredFunction(0, "foo.cpp", "foo()", 1, 3),
+        CoveredFunction(1, "foo.cpp", "bar(int)", 5, 10, namespace="ns"),
+        CoveredFunction(
+            2, "bar.cpp", "Bar::bar(int)", 1, 20, properties="const", class_name="Bar"
+        ),
+        CoveredFunction(3, "bar.cpp", "foo()", 22, 25, namespace="ns"),
+        CoveredFunction(4, "ünicode.cpp", "baz()", 1, 2),
+    ]
+    table = {}
+    for function in functions:
+        table.setdefault(function.file, []).append(function)
+    return FunctionLookupTable(table=table)
+
+
+class MappedFunctionLookupTableTestCase(unittest.TestCase):
+    def test_roundtrip(self):
+        lookup: FunctionLookupTable = create_function_lookup_table()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "lookup.bin"
+            save_function_lookup_table(filepath, lookup)
+            mapped_lookup: MappedFunctionLookupTable = read_function_lookup_table(
+                filepath
+            )
+            self.assertEqual(lookup, mapped_lookup)
+            self.assertListEqual(
+                lookup.all_functions_ordered_by_id,
+                list(mapped_lookup.all_functions_ordered_by_id),
+            )
+
+    def test_lookups(self):
+        lookup: FunctionLookupTable = create_function_lookup_table()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "lookup.bin"
+            save_function_lookup_table(filepath, lookup)
+            mapped_lookup: MappedFunctionLookupTable = read_function_lookup_table(
+                filepath
+            )
+            self.assertEqual(
+                lookup.get_function_by_identifier(2),
+                mapped_lookup.get_function_by_identifier(2),
+            )
+            self.assertListEqual(
+                lookup.find_functions_by_line(file="foo.cpp", line=6),
+                mapped_lookup.find_functions_by_line(file="foo.cpp", line=6),
+            )
+            self.assertListEqual(
+                lookup.find_functions(signature="foo()"),
+                mapped_lookup.find_functions(signature="foo()"),
+            )
+            self.assertListEqual(
+                lookup.find_functions(signature="foo()", namespace="ns"),
+                mapped_lookup.find_functions(signature="foo()", namespace="ns"),
+            )
+            self.assertListEqual(
+                lookup.find_functions_by_file_regex(".*bar.*"),
+                mapped_lookup.find_functions_by_file_regex(".*bar.*"),
+            )
+            self.assertListEqual([], mapped_lookup.find_functions(signature="qux()"))
+
+    def test_non_consecutive_identifiers(self):
+        lookup: FunctionLookupTable = FunctionLookupTable(
+            table={"foo.cpp": [CoveredFunction(1, "foo.cpp", "foo()", 1, 3)]}
+        )
+        with temp_path() as tmp_dir:
+            with self.assertRaises(Exception):
+                save_function_lookup_table(Path(tmp_dir) / "lookup.bin", lookup)
+
+    def test_read_only(self):
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "lookup.bin"
+            save_function_lookup_table(filepath, create_function_lookup_table())
+            mapped_lookup: MappedFunctionLookupTable = read_function_lookup_table(
+                filepath
+            )
+            # the base class's parsing of files does not fail on uninitialized attributes
+            mapped_lookup.prefetch_functions(files=[Path("foo.cpp")])
+            with self.assertRaisesRegex(Exception, "read-only"):
+                mapped_lookup.find_or_add_functions(file=Path("qux.cpp"), line=1)
+
+
+class MappedTestFunctionTracesTestCase(unittest.TestCase):
+    def test_roundtrip(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.bin"
+            save_test_function_traces(filepath, traces)
+            mapped_traces: MappedTestFunctionTraces = read_test_function_traces(
+                filepath
+            )
+            self.assertSetEqual(set(traces.table.keys()), set(mapped_traces.table))
+            for test_id, function_ids in traces.table.items():
+                self.assertSetEqual(function_ids, set(mapped_traces.table[test_id]))
+
+    def test_select_tests(self):
+        traces: TestFunctionTraces = create_test_function_traces()
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.bin"
+            save_test_function_traces(filepath, traces)
+            mapped_traces: MappedTestFunctionTraces = read_test_function_traces(
+                filepath
+            )
+            # the index is only read once tests are selected
+            self.assertIsNone(mapped_traces.index)
+            for affected_entity_ids in [{0}, {1}, {3, 7}, {0, 4, 6}, {42}]:
+                self.assertEqual(
+                    traces.select_tests(affected_entity_ids=affected_entity_ids),
+                    mapped_traces.select_tests(affected_entity_ids=affected_entity_ids),
+                )
+
+    def test_read_only(self):
+        with temp_path() as tmp_dir:
+            filepath: Path = Path(tmp_dir) / "traces.bin"
+            save_test_function_traces(filepath, create_test_function_traces())
+            mapped_traces: MappedTestFunctionTraces = read_test_function_traces(
+                filepath
+            )
+            with self.assertRaises(Exception):
+                mapped_traces.remove_test(
+                    f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo"
+                )
+            with self.assertRaises(Exception):
+                mapped_traces.add_test_function_dependency(
+                    test_module="module_a",
+                    test_suite="FooSuite",
+                    test_case="Foo",
+                    function=CoveredFunction(8, "foo.cpp", "foo()", 1, 3),
+                )
+            self.assertIn(
+                f"module_a{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Foo", mapped_traces.table
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
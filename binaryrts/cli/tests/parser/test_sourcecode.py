@@ -1,9 +1,16 @@
 import os
 import unittest
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
-from binaryrts.parser.sourcecode import CSourceCodeParser, FunctionDefinition
+from binaryrts.parser.sourcecode import (
+    CSourceCodeParser,
+    FunctionDefinition,
+    NonFunctionalCallAnalyzer,
+    ctags,
+    ctags_batch,
+    scan_files_for_symbols,
+)
 
 RESOURCES_DIR: Path = Path(os.path.dirname(__file__)) / "resources"
 SOURCE_FILE: Path = RESOURCES_DIR / "main.cpp"
@@ -224,6 +231,22 @@ class SourceCodeParserTestCase(unittest.TestCase):
         ]
         self.assertSetEqual(set(expected), set(actual))
 
+    def test_ctags_batch(self):
+        self.assertDictEqual(
+            {file: ctags(file=file) for file in [SOURCE_FILE, HEADER_FILE, COMPLEX_FILE]},
+            ctags_batch(files=[SOURCE_FILE, HEADER_FILE, COMPLEX_FILE]),
+        )
+
+    def test_get_functions_prefetched(self):
+        parser: CSourceCodeParser = CSourceCodeParser()
+        parser.prefetch(files=[SOURCE_FILE, HEADER_FILE])
+        self.assertEqual(2, len(parser.prefetched_ctags_outputs))
+        self.assertSetEqual(
+            set(CSourceCodeParser().get_functions(file=HEADER_FILE)),
+            set(parser.get_functions(file=HEADER_FILE)),
+        )
+        self.assertEqual(1, len(parser.prefetched_ctags_outputs))
+
     def test_strip_comments(self):
         self.assertEqual(
             """ \nint main() {\n\treturn 0;  \n}""",
@@ -260,6 +283,23 @@ class SourceCodeParserTestCase(unittest.TestCase):
             ),
         )
 
+    def test_get_raw_codes(self):
+        line_ranges: List[Tuple[int, int]] = [(1, 3), (2, 10), (8, 8), (100, 90)]
+        self.assertEqual(
+            [
+                CSourceCodeParser.get_raw_code(file=COMPLEX_FILE, start=start, end=end)
+                for start, end in line_ranges
+            ],
+            CSourceCodeParser.get_raw_codes(file=COMPLEX_FILE, line_ranges=line_ranges),
+        )
+        self.assertEqual(
+            CSourceCodeParser.get_raw_codes(file=COMPLEX_FILE, line_ranges=line_ranges),
+            CSourceCodeParser.get_raw_codes_from_lines(
+                lines=COMPLEX_FILE.read_text().splitlines(keepends=True),
+                line_ranges=line_ranges,
+            ),
+        )
+
     def test_extract_raw_signature(self):
         self.assertEqual(
             """(finalint*,std::string,const&int,char**,char[]*,double&)""",
@@ -275,5 +315,44 @@ class SourceCodeParserTestCase(unittest.TestCase):
         )
 
 
+class NonFunctionalCallAnalyzerTestCase(unittest.TestCase):
+    def test_get_call_sites_of_symbols(self):
+        call_analyzer: NonFunctionalCallAnalyzer = NonFunctionalCallAnalyzer(
+            root_dir=RESOURCES_DIR
+        )
+        symbol_names: List[str] = ["int", "return", "std::string", "missing"]
+        call_sites = call_analyzer.get_call_sites_of_symbols(symbol_names=symbol_names)
+        self.assertEqual(symbol_names, list(call_sites.keys()))
+        self.assertEqual([], call_sites["missing"])
+        self.assertTrue(len(call_sites["int"]) > 0)
+        for symbol_name in symbol_names:
+            self.assertEqual(
+                call_analyzer.get_call_sites(symbol_name=symbol_name),
+                call_sites[symbol_name],
+            )
+
+    def test_scan_files_for_symbols(self):
+        files: List[str] = [str(SOURCE_FILE), str(HEADER_FILE), str(COMPLEX_FILE)]
+        hits = scan_files_for_symbols((files, ["int", "missing", "std::string"]))
+        self.assertEqual(len(files), len(hits))
+        for file_hits in hits:
+            self.assertEqual(sorted(file_hits, key=lambda hit: hit[1]), file_hits)
+            self.assertNotIn(1, {symbol_idx for symbol_idx, _ in file_hits})
+        # chunks of files yield the same hits in the same order
+        self.assertEqual(
+            hits,
+            scan_files_for_symbols((files[:1], ["int", "missing", "std::string"]))
+            + scan_files_for_symbols((files[1:], ["int", "missing", "std::string"])),
+        )
+        self.assertEqual(
+            NonFunctionalCallAnalyzer(
+                root_dir=RESOURCES_DIR, n_processes=1
+            ).get_call_sites_of_symbols(symbol_names=["int", "return"]),
+            NonFunctionalCallAnalyzer(
+                root_dir=RESOURCES_DIR, n_processes=2
+            ).get_call_sites_of_symbols(symbol_names=["int", "return"]),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+import os
+import unittest
+from pathlib import Path
+from typing import List, Tuple
+
+from binaryrts.parser.sourcecode import NonFunctionalCallAnalyzer
+from binaryrts.parser.symbols import SymbolIndex, tokenize
+from binaryrts.util.cache import DiskCache
+from binaryrts.util.fs import temp_path
+
+
+class SymbolIndexTestCase(unittest.TestCase):
+    def test_tokenize(self):
+        tokens = tokenize("#define FOO 1\nint x = FOO+bar[FOO];\r\nFOO(x);\nreturn FOO")
+        self.assertEqual([1, 2], tokens["FOO"])
+        self.assertEqual([2, 3], tokens["x"])
+        self.assertNotIn("bar", tokens)
+
+    def test_find_equals_scan(self):
+        root_dir: Path = Path(__file__).parent / "resources"
+        symbol_index: SymbolIndex = SymbolIndex(root_dir=root_dir)
+        symbol_index.refresh()
+        call_analyzer: NonFunctionalCallAnalyzer = NonFunctionalCallAnalyzer(
+            root_dir=root_dir
+        )
+        for symbol_name in ["foo", "x", "std", "int", "return", "missing"]:
+            self.assertTrue(SymbolIndex.is_indexed(symbol_name))
+            self.assertEqual(
+                [
+                    (site.path, site.line_no)
+                    for site in call_analyzer.get_call_sites(symbol_name=symbol_name)
+                ],
+                [
+                    (file.resolve(), line_no)
+                    for file, line_no in symbol_index.find(symbol_name)
+                ],
+            )
+        self.assertFalse(SymbolIndex.is_indexed("a.b"))
+
+    def test_refresh(self):
+        with temp_path() as tmp_dir:
+            root_dir: Path = Path(tmp_dir) / "src"
+            root_dir.mkdir()
+            disk_cache: DiskCache = DiskCache(root=Path(tmp_dir) / "cache")
+            (root_dir / "a.h").write_text("#define FOO 1\n")
+            (root_dir / "b.cpp").write_text("int b() { return FOO; }\n")
+            symbol_index: SymbolIndex = SymbolIndex(
+                root_dir=root_dir, disk_cache=disk_cache
+            )
+            symbol_index.refresh()
+            self.assertEqual(
+                {(root_dir / "a.h", 1), (root_dir / "b.cpp", 1)},
+                set(symbol_index.find("FOO")),
+            )
+
+            (root_dir / "b.cpp").write_text("int b() {\n  return FOO + 1;\n}\n")
+            (root_dir / "c.cpp").write_text("int c() { return FOO; }\n")
+            os.utime(root_dir / "b.cpp", ns=(0, 0))
+            symbol_index.refresh()
+            found: List[Tuple[Path, int]] = symbol_index.find("FOO")
+            self.assertEqual(3, len(found))
+            self.assertIn((root_dir / "b.cpp", 2), found)
+            self.assertIn((root_dir / "c.cpp", 1), found)
+
+            # a new index takes over the tokens of unchanged files from the cache
+            (root_dir / "c.cpp").unlink()
+            cached_index: SymbolIndex = SymbolIndex(
+                root_dir=root_dir, disk_cache=disk_cache
+            )
+            cached_index.refresh()
+            self.assertEqual(
+                {(root_dir / "a.h", 1), (root_dir / "b.cpp", 2)},
+                set(cached_index.find("FOO")),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
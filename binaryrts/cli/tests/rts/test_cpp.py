@@ -282,6 +282,118 @@ class CppFunctionLevelRTSTestCase(unittest.TestCase):
                     selection_causes,
                 )
 
+    def test_selection_modification_in_parallel(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                git_client: GitClient = GitClient.from_repo(git_repo=local_repo)
+
+                (
+                    function_lookup_table,
+                    test_function_traces,
+                ) = setup_repo_init_lookup_traces(git_client=git_client)
+
+                # set up RTS algo
+                algo: CppFunctionLevelRTS = CppFunctionLevelRTS(
+                    git_client=git_client,
+                    function_lookup_table=function_lookup_table,
+                    test_function_traces=test_function_traces,
+                    output_dir=git_client.root,
+                    n_processes=2,
+                )
+
+                # checkout feature branch
+                target_branch: str = git_client.git_repo.active_branch.name
+                git_client.git_repo.git.checkout(b="feature/xxx")
+
+                # modify two files, such that both are diffed in separate processes
+                file = Path("src") / "foo.h"
+                file.write_text(
+                    file.read_text().replace(
+                        "return a > b", "int c = 0; \nreturn a > b"
+                    )
+                )
+                file = Path("src") / "test.cpp"
+                file.write_text(file.read_text() + "\n")
+
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Change Foo::Maximum")
+
+                included_tests, excluded_tests, selection_causes = algo.select_tests(
+                    from_revision=target_branch, to_revision="HEAD"
+                )
+                self.assertSetEqual(
+                    {f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}FooMax"},
+                    included_tests,
+                )
+                self.assertSetEqual(
+                    {
+                        f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}Max",
+                        f"sample_module{TEST_ID_SEP}FooSuite{TEST_ID_SEP}MaxMacro",
+                    },
+                    excluded_tests,
+                )
+
+    def test_selection_from_shared_analysis(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                git_client: GitClient = GitClient.from_repo(git_repo=local_repo)
+
+                (
+                    function_lookup_table,
+                    test_function_traces,
+                ) = setup_repo_init_lookup_traces(git_client=git_client)
+
+                def create_algo(**kwargs) -> CppFunctionLevelRTS:
+                    return CppFunctionLevelRTS(
+                        git_client=git_client,
+                        function_lookup_table=function_lookup_table,
+                        test_function_traces=test_function_traces,
+                        output_dir=git_client.root,
+                        **kwargs,
+                    )
+
+                # checkout feature branch
+                target_branch: str = git_client.git_repo.active_branch.name
+                git_client.git_repo.git.checkout(b="feature/xxx")
+
+                file = Path("src") / "foo.h"
+                file.write_text(
+                    file.read_text().replace(
+                        "return a > b", "int c = 0; \nreturn a > b"
+                    )
+                )
+                git_client.git_repo.git.add(".")
+                git_client.git_repo.git.commit(message="Change Foo::Maximum")
+
+                with create_algo().analyze_changes(
+                    from_revision=target_branch,
+                    to_revision="HEAD",
+                    include_non_functionals=True,
+                ) as change_analysis:
+                    for kwargs in [
+                        {},
+                        {"scope_analysis": True},
+                        {"overload_analysis": True, "virtual_analysis": True},
+                        {"non_functional_analysis": True},
+                        {"non_functional_retest_all": True},
+                    ]:
+                        self.assertEqual(
+                            create_algo(**kwargs).select_tests(
+                                from_revision=target_branch, to_revision="HEAD"
+                            ),
+                            create_algo(**kwargs).select_tests_from_analysis(
+                                change_analysis=change_analysis
+                            ),
+                        )
+
+                with create_algo().analyze_changes(
+                    from_revision=target_branch, to_revision="HEAD"
+                ) as change_analysis:
+                    with self.assertRaises(Exception):
+                        create_algo(
+                            non_functional_analysis=True
+                        ).select_tests_from_analysis(change_analysis=change_analysis)
+
     def test_selection_with_includes(self):
         with temp_repo() as (remote_repo_path, remote_repo):
             with temp_clone() as (local_repo_path, local_repo):
@@ -904,6 +1016,55 @@ int Bar::Maximum(int a, int b) {
                     selection_causes,
                 )
 
+    def test_non_functional_memo(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                git_client: GitClient = GitClient.from_repo(git_repo=local_repo)
+
+                (
+                    function_lookup_table,
+                    test_function_traces,
+                ) = setup_repo_init_lookup_traces(git_client=git_client)
+
+                algo: CppFunctionLevelRTS = CppFunctionLevelRTS(
+                    git_client=git_client,
+                    function_lookup_table=function_lookup_table,
+                    test_function_traces=test_function_traces,
+                    output_dir=git_client.root,
+                    non_functional_analysis=True,
+                )
+                self.assertSetEqual(
+                    {1, 3, 4},
+                    algo._get_ids_of_affected_functions_for_non_functionals(
+                        symbol_names=["MAX", "Max"],
+                        root_dir=git_client.root,
+                        file_relative_to=git_client.root,
+                    ),
+                )
+
+                # call sites below the same or a contained root directory are not searched again
+                (git_client.root / "src" / "test.cpp").unlink()
+                for root_dir in [git_client.root, git_client.root / "src"]:
+                    self.assertSetEqual(
+                        {4},
+                        algo._get_ids_of_affected_functions_for_non_functionals(
+                            symbol_names=["MAX"],
+                            root_dir=root_dir,
+                            file_relative_to=git_client.root,
+                        ),
+                    )
+
+                algo.non_functional_memo.clear()
+                algo.refreshed_symbol_indices.clear()
+                self.assertSetEqual(
+                    {1},
+                    algo._get_ids_of_affected_functions_for_non_functionals(
+                        symbol_names=["MAX", "Max"],
+                        root_dir=git_client.root / "src",
+                        file_relative_to=git_client.root,
+                    ),
+                )
+
     def test_selection_macro_override(self):
         with temp_repo() as (remote_repo_path, remote_repo):
             with temp_clone() as (local_repo_path, local_repo):
@@ -4,7 +4,7 @@ from pathlib import Path
 from typing import List
 
 from binaryrts.parser.sourcecode import CSourceCodeParser, FunctionDefinition
-from binaryrts.rts.diff import CodeDiffAnalyzer
+from binaryrts.rts.diff import CodeDiffAnalyzer, DiffHunks
 
 RESOURCES_DIR: Path = Path(os.path.dirname(__file__)) / "resources"
 
@@ -36,6 +36,33 @@ class CodeDiffAnalyzerTestCase(unittest.TestCase):
             changed_functions,
         )
 
+    def test_raw_code_from_file_content(self):
+        file: Path = RESOURCES_DIR / "diff" / "operator_v1.cpp"
+        analyzer = CodeDiffAnalyzer(parser=CSourceCodeParser())
+        analyzer.add_file_content(
+            file=file, content=file.read_text(encoding="utf-8").replace("==", "!=")
+        )
+        self.assertEqual(
+            CSourceCodeParser.get_raw_code(file=file, start=55, end=59).replace(
+                "==", "!="
+            ),
+            analyzer._get_raw_code(file=file, start=55, end=59),
+        )
+
+    def test_diff_hunks(self):
+        # line 3 changed, two lines inserted after line 10, lines 20-21 deleted
+        hunks = DiffHunks(hunks=[(20, 2, 21, 0), (3, 1, 3, 1), (10, 0, 11, 2)])
+        self.assertTrue(hunks.is_unchanged(old_range=(1, 2), new_range=(1, 2)))
+        self.assertFalse(hunks.is_unchanged(old_range=(2, 5), new_range=(2, 5)))
+        self.assertTrue(hunks.is_unchanged(old_range=(4, 10), new_range=(4, 10)))
+        self.assertFalse(hunks.is_unchanged(old_range=(9, 11), new_range=(9, 13)))
+        self.assertTrue(hunks.is_unchanged(old_range=(11, 19), new_range=(13, 21)))
+        # ranges that do not hold the same lines
+        self.assertFalse(hunks.is_unchanged(old_range=(11, 19), new_range=(11, 19)))
+        self.assertFalse(hunks.is_unchanged(old_range=(11, 19), new_range=(12, 21)))
+        self.assertFalse(hunks.is_unchanged(old_range=(19, 22), new_range=(21, 22)))
+        self.assertTrue(hunks.is_unchanged(old_range=(22, 30), new_range=(22, 30)))
+
     def test_added_override_virtual_function_without_analysis(self):
         old_revision: Path = RESOURCES_DIR / "diff" / "override_v1.cpp"
         new_revision: Path = RESOURCES_DIR / "diff" / "override_v2.cpp"
@@ -0,0 +1,47 @@
+import os
+import unittest
+from pathlib import Path
+
+from binaryrts.util.cache import DiskCache
+from binaryrts.util.fs import temp_path
+
+
+class DiskCacheTestCase(unittest.TestCase):
+    def test_get_and_put(self):
+        with temp_path() as tmp_dir:
+            cache: DiskCache = DiskCache(root=Path(tmp_dir) / "cache")
+            self.assertIsNone(cache.get("foo"))
+            cache.put("foo", "bar")
+            self.assertEqual("bar", cache.get("foo"))
+            # the cache is shared between instances
+            self.assertEqual("bar", DiskCache(root=Path(tmp_dir) / "cache").get("foo"))
+
+    def test_evict_least_recently_used(self):
+        with temp_path() as tmp_dir:
+            cache: DiskCache = DiskCache(root=Path(tmp_dir), max_size=25)
+            for idx, key in enumerate(["a", "b", "c"]):
+                cache.put(key, "x" * 10)
+                # make sure entries have distinct modification times
+                path: Path = cache._get_path(key)
+                os.utime(path, (idx, idx))
+                if key == "b":
+                    # access the first entry, which makes "b" the least recently used one
+                    cache.get("a")
+                    os.utime(cache._get_path("a"), (idx + 0.5, idx + 0.5))
+            self.assertEqual("x" * 10, cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual("x" * 10, cache.get("c"))
+
+    def test_managed_dir_is_not_evicted(self):
+        with temp_path() as tmp_dir:
+            cache: DiskCache = DiskCache(root=Path(tmp_dir), max_size=15)
+            managed_file: Path = cache.get_dir("tool") / "database"
+            managed_file.write_text("x" * 100)
+            cache.put("a", "x" * 10)
+            self.assertEqual(10, cache.size)
+            self.assertEqual("x" * 10, cache.get("a"))
+            self.assertTrue(managed_file.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import os
+import subprocess as sb
 import unittest
 from pathlib import Path
 
-from binaryrts.util.hash import hash_file, hash_string
+from binaryrts.util.hash import hash_file, hash_string, hash_git_blob
 
 RESOURCES_DIR: Path = Path(os.path.dirname(__file__)) / "resources"
 
@@ -18,6 +19,15 @@ class HashUtilTestCase(unittest.TestCase):
         second_hash: str = hash_string(string="int main()\n{\n\treturn 0;\n}")
         self.assertEqual(first_hash, second_hash)
 
+    def test_git_blob_file(self):
+        self.assertEqual(
+            sb.check_output(
+                ["git", "hash-object", (RESOURCES_DIR / "main.cpp").__str__()],
+                text=True,
+            ).strip(),
+            hash_git_blob(file_path=(RESOURCES_DIR / "main.cpp")),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,9 +1,13 @@
 import os
 import unittest
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
-from binaryrts.util.io import slice_file_into_chunks
+from binaryrts.util.io import (
+    slice_file_into_chunks,
+    slice_lines_into_chunks,
+    split_lines,
+)
 
 RESOURCES_DIR: Path = Path(os.path.dirname(__file__)) / "resources"
 
@@ -19,6 +23,31 @@ class IOUtilTestCase(unittest.TestCase):
         )
         self.assertEqual(expected, actual)
 
+    def test_slice_lines_into_chunks(self):
+        file: Path = RESOURCES_DIR / "main.cpp"
+        line_ranges: List[Tuple[int, int]] = [
+            (1, 1),
+            (11, 8),
+            (3, 5),
+            (10, 1000),
+            (4, 9),
+            (0, 2),
+        ]
+        self.assertEqual(
+            slice_file_into_chunks(file, line_ranges),
+            slice_lines_into_chunks(
+                split_lines(file.read_text(encoding="utf-8")), line_ranges
+            ),
+        )
+
+    def test_slice_file_into_no_chunks(self):
+        self.assertEqual([], slice_file_into_chunks(RESOURCES_DIR / "main.cpp", []))
+
+    def test_split_lines(self):
+        self.assertEqual([], split_lines(""))
+        self.assertEqual(["a\n", "\x0cb\n", "\n", "c"], split_lines("a\n\x0cb\n\nc"))
+        self.assertEqual(["a\n"], split_lines("a\n"))
+
 
 if __name__ == "__main__":
     unittest.main()
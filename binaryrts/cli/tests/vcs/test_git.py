@@ -1,6 +1,10 @@
+import time
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 
+from binaryrts.util.cache import DiskCache
+from binaryrts.util.fs import temp_path
 from binaryrts.vcs.base import Changelist, ChangelistItem, ChangelistItemAction
 from binaryrts.vcs.git import temp_repo, temp_clone, GitClient
 
@@ -239,6 +243,199 @@ class GitClientTestCase(unittest.TestCase):
                 )
                 self.assertEqual("Hello 🎉", previous_file_content)
 
+    def test_get_file_contents_at_revisions(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                client: GitClient = GitClient.from_repo(local_repo)
+
+                first_file: Path = Path("first_file")
+                second_file: Path = Path("second_file")
+                first_file.write_bytes("\ufeffHello\r\n🎉".encode("utf-8"))
+                second_file.write_text("foo", encoding="utf-8")
+                client.git_repo.git.add(".")
+                client.git_repo.git.commit(message="Commit 1")
+                second_file.write_text("bar", encoding="utf-8")
+                client.git_repo.git.add(".")
+                client.git_repo.git.commit(message="Commit 2")
+
+                self.assertListEqual(
+                    ["Hello\n🎉", "foo", "bar", "Hello\n🎉"],
+                    client.get_file_contents_at_revisions(
+                        requests=[
+                            ("HEAD", first_file),
+                            ("HEAD~1", second_file),
+                            ("HEAD", second_file),
+                            ("HEAD~1", first_file),
+                        ]
+                    ),
+                )
+                # the reader process is re-used, also after failed requests
+                with self.assertRaises(Exception):
+                    client.get_file_content_at_revision(
+                        revision="HEAD", filepath=Path("missing_file")
+                    )
+                self.assertEqual(
+                    "foo",
+                    GitClient.from_repo(local_repo).get_file_content_at_revision(
+                        revision="HEAD~1", filepath=second_file
+                    ),
+                )
+                # read errors do not wait for the writer, which is blocked on full pipes by then
+                client.blob_reader._get_process().stdout = SimpleNamespace(
+                    readline=lambda: time.sleep(0.5) or b""
+                )
+                with self.assertRaises(Exception):
+                    client.blob_reader.read(
+                        git_objects=[f"HEAD:{first_file}"] * 100_000
+                    )
+                self.assertEqual(
+                    ["foo"],
+                    client.get_file_contents_at_revisions(
+                        requests=[("HEAD~1", second_file)]
+                    ),
+                )
+                client.blob_reader.close()
+
+    def test_get_changed_files(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                client: GitClient = GitClient.from_repo(local_repo)
+                Path(".gitignore").write_text("generated.cpp\n")
+                Path("changed.cpp").write_text("int foo() { return 0; }")
+                Path("unchanged.cpp").write_text("int bar() { return 0; }")
+                client.git_repo.git.add(".")
+                client.git_repo.git.commit(message="Commit 1")
+
+                Path("changed.cpp").write_text("int foo() { return 1; }")
+                Path("untracked.cpp").write_text("int baz() { return 0; }")
+                Path("generated.cpp").write_text("int qux() { return 0; }")
+                self.assertSetEqual(
+                    {Path("changed.cpp"), Path("untracked.cpp")},
+                    client.get_changed_files(revision="HEAD"),
+                )
+                # git cannot tell whether ignored files changed
+                self.assertSetEqual(
+                    {
+                        Path("changed.cpp"),
+                        Path("untracked.cpp"),
+                        Path("generated.cpp"),
+                    },
+                    client.get_changed_files(
+                        revision="HEAD",
+                        files=[
+                            Path("unchanged.cpp"),
+                            Path("generated.cpp"),
+                            client.root / "changed.cpp",
+                        ],
+                    ),
+                )
+
+    def test_diff_hunks(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                client: GitClient = GitClient(root=local_repo_path, use_cache=False)
+
+                file: Path = Path("file.cpp")
+                file.write_text("a\nb\nc\nd\ne\n", encoding="utf-8")
+                client.git_repo.git.add(".")
+                client.git_repo.git.commit(message="Commit 1")
+                file.write_text("a\nB\nc\nd\nx\ny\ne\n", encoding="utf-8")
+                client.git_repo.git.add(".")
+                client.git_repo.git.commit(message="Commit 2")
+
+                changelist: Changelist = client.get_diff(
+                    from_revision="HEAD~1", to_revision="HEAD"
+                )
+                self.assertEqual(1, len(changelist.items))
+                self.assertEqual(
+                    ((2, 1, 2, 1), (4, 0, 5, 2)), changelist.items[0].hunks
+                )
+                self.assertEqual(
+                    client.rev_parse(revision="HEAD~1"),
+                    client.get_merge_base(from_revision="HEAD~1", to_revision="HEAD"),
+                )
+
+    def test_disk_cache(self):
+        with temp_repo() as (remote_repo_path, remote_repo):
+            with temp_clone() as (local_repo_path, local_repo):
+                with temp_path(change_dir=False) as cache_dir:
+                    disk_cache: DiskCache = DiskCache(root=Path(cache_dir))
+                    client: GitClient = GitClient(
+                        root=local_repo_path, disk_cache=disk_cache
+                    )
+
+                    file: Path = Path("file")
+                    file.write_text("foo", encoding="utf-8")
+                    client.git_repo.git.add(".")
+                    client.git_repo.git.commit(message="Commit 1")
+                    file.write_text("bar", encoding="utf-8")
+                    client.git_repo.git.add(".")
+                    client.git_repo.git.commit(message="Commit 2")
+
+                    expected_changelist: Changelist = Changelist(
+                        items=[
+                            ChangelistItem(
+                                filepath=file, action=ChangelistItemAction.MODIFIED
+                            )
+                        ]
+                    )
+                    self.assertEqual(
+                        expected_changelist,
+                        client.get_diff(from_revision="HEAD~1", to_revision="HEAD"),
+                    )
+                    self.assertEqual(
+                        "foo",
+                        client.get_file_content_at_revision(
+                            revision="HEAD~1", filepath=file
+                        ),
+                    )
+
+                    # a new client answers from the disk cache without reading objects
+                    cached_client: GitClient = GitClient(
+                        root=local_repo_path, disk_cache=disk_cache
+                    )
+                    self.assertEqual(
+                        expected_changelist,
+                        cached_client.get_diff(
+                            from_revision="HEAD~1", to_revision="HEAD"
+                        ),
+                    )
+                    self.assertEqual(
+                        "foo",
+                        cached_client.get_file_content_at_revision(
+                            revision="HEAD~1", filepath=file
+                        ),
+                    )
+                    self.assertIsNone(cached_client.blob_reader.process)
+
+                    # moving refs do not hit stale entries
+                    second_file: Path = Path("second_file")
+                    second_file.write_text("baz", encoding="utf-8")
+                    client.git_repo.git.add(".")
+                    client.git_repo.git.commit(message="Commit 3")
+                    moved_client: GitClient = GitClient(
+                        root=local_repo_path, disk_cache=disk_cache
+                    )
+                    self.assertEqual(
+                        Changelist(
+                            items=[
+                                ChangelistItem(
+                                    filepath=second_file,
+                                    action=ChangelistItemAction.ADDED,
+                                )
+                            ]
+                        ),
+                        moved_client.get_diff(
+                            from_revision="HEAD~1", to_revision="HEAD"
+                        ),
+                    )
+                    self.assertEqual(
+                        "bar",
+                        moved_client.get_file_content_at_revision(
+                            revision="HEAD~1", filepath=file
+                        ),
+                    )
+
 
 if __name__ == "__main__":
     unittest.main()